@@ -0,0 +1,168 @@
+"""Edge bundles: one stored record for a complete bipartite block of edges.
+
+Generators and batch wiring emit blocks where every source is linked to every
+target with the same handles and label, each edge named
+``<prefix>-<source>-<target>``. ``bundle_edges`` folds every contiguous run of
+such a block into a single record::
+
+    {"id": "bundle:e-spine-1-leaf-1",
+     "bundle": {"prefix": "e", "sources": [...], "targets": [...], "major": "source"},
+     "sourceHandle": "bottom-out", "targetHandle": "top-in", "label": "link"}
+
+and ``expand_edges`` restores the individual edges in their original order.
+Topologies are stored bundled; everything that reads or edits single edges
+works on the expanded list, and the next write folds whatever blocks are
+still complete.
+"""
+
+from __future__ import annotations
+
+from itertools import product
+
+BUNDLE_PREFIX = "bundle:"
+# Smaller blocks are left as plain edges.
+BUNDLE_MIN_EDGES = 4
+
+
+def _fold_key(edge) -> tuple | None:
+    """What edges of one bundle share, or ``None`` if ``edge`` cannot be rebuilt from a bundle."""
+    try:
+        source = edge["source"]
+        target = edge["target"]
+        edge_id = edge["id"]
+        handles = (edge["sourceHandle"], edge["targetHandle"])
+    except (KeyError, TypeError):
+        return None
+    labelled = "label" in edge
+    # Exactly the five required keys, plus ``label`` when present: nothing a bundle would drop.
+    if len(edge) != 5 + labelled or not isinstance(source, str) or not isinstance(target, str):
+        return None
+    suffix = f"-{source}-{target}"
+    if not isinstance(edge_id, str) or not edge_id.endswith(suffix) or len(edge_id) == len(suffix):
+        return None
+    return edge_id[: -len(suffix)], handles, labelled, edge.get("label")
+
+
+def _run_ends(edges: list, keys: list, major: str) -> list[int]:
+    """For each index, where the run of foldable edges sharing its key and ``major`` endpoint ends."""
+    ends = [0] * len(edges)
+    end = len(edges)
+    for index in range(len(edges) - 1, -1, -1):
+        if (
+            keys[index] is None
+            or index + 1 == end
+            or keys[index + 1] != keys[index]
+            or edges[index + 1][major] != edges[index][major]
+        ):
+            end = index + 1
+        ends[index] = end
+    return ends
+
+
+def _block(edges: list, keys: list, ends: list[int], start: int, major: str, minor: str) -> tuple[list, list] | None:
+    """The complete block starting at ``start``, walking ``major`` endpoints in the outer loop."""
+    key = keys[start]
+    end = ends[start]
+    width = end - start
+    if width < 2:
+        return None
+    minors = [edges[index][minor] for index in range(start, end)]
+    if len(set(minors)) != width:
+        return None
+    majors = [edges[start][major]]
+    seen = set(majors)
+    # Each further row is one whole run of the same key over the same minors in the same order.
+    while end < len(edges) and keys[end] == key and ends[end] - end >= width:
+        current = edges[end][major]
+        if current in seen or any(edges[end + offset][minor] != minors[offset] for offset in range(width)):
+            break
+        majors.append(current)
+        seen.add(current)
+        end += width
+    if len(majors) * width < BUNDLE_MIN_EDGES:
+        return None
+    return majors, minors
+
+
+def bundle_edges(edges: list) -> list:
+    """``edges`` with every contiguous complete bipartite block folded into one bundle record."""
+    keys = [_fold_key(edge) for edge in edges]
+    orientations = [
+        (major, minor, _run_ends(edges, keys, major)) for major, minor in (("source", "target"), ("target", "source"))
+    ]
+    folded: list = []
+    index = 0
+    while index < len(edges):
+        if keys[index] is None:
+            folded.append(edges[index])
+            index += 1
+            continue
+        candidates = []
+        for major, minor, ends in orientations:
+            block = _block(edges, keys, ends, index, major, minor)
+            if block is not None:
+                candidates.append((len(block[0]) * len(block[1]), major, block))
+        if not candidates:
+            folded.append(edges[index])
+            index += 1
+            continue
+        size, major, (majors, minors) = max(candidates, key=lambda candidate: candidate[0])
+        edge = edges[index]
+        sources, targets = (majors, minors) if major == "source" else (minors, majors)
+        record = {
+            "id": BUNDLE_PREFIX + edge["id"],
+            "bundle": {"prefix": keys[index][0], "sources": sources, "targets": targets, "major": major},
+            "sourceHandle": edge["sourceHandle"],
+            "targetHandle": edge["targetHandle"],
+        }
+        if "label" in edge:
+            record["label"] = edge["label"]
+        folded.append(record)
+        index += size
+    return folded
+
+
+def bundle_members(record: dict) -> list[dict]:
+    bundle = record["bundle"]
+    prefix = bundle["prefix"]
+    if bundle.get("major") == "target":
+        pairs = ((source, target) for target in bundle["targets"] for source in bundle["sources"])
+    else:
+        pairs = product(bundle["sources"], bundle["targets"])
+    members = []
+    for source, target in pairs:
+        edge = {
+            "id": f"{prefix}-{source}-{target}",
+            "source": source,
+            "target": target,
+            "sourceHandle": record.get("sourceHandle"),
+            "targetHandle": record.get("targetHandle"),
+        }
+        if "label" in record:
+            edge["label"] = record["label"]
+        members.append(edge)
+    return members
+
+
+def is_bundle(edge) -> bool:
+    return isinstance(edge, dict) and "bundle" in edge
+
+
+def expand_edges(edges: list) -> list:
+    """``edges`` with every bundle record replaced by its member edges; the same list if there are none."""
+    if not any(is_bundle(edge) for edge in edges):
+        return edges
+    expanded: list = []
+    for edge in edges:
+        if is_bundle(edge):
+            expanded.extend(bundle_members(edge))
+        else:
+            expanded.append(edge)
+    return expanded
+
+
+def edge_count(edges: list) -> int:
+    """Number of individual edges in a possibly bundled list."""
+    return sum(
+        len(edge["bundle"]["sources"]) * len(edge["bundle"]["targets"]) if is_bundle(edge) else 1 for edge in edges
+    )
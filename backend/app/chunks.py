@@ -0,0 +1,358 @@
+"""Content-addressed storage of topology graphs.
+
+A node or edge list is split into chunks of consecutive entities and every
+chunk is stored once in ``graph_chunks``, keyed by the SHA-256 of its text,
+however many topologies contain it. Chunk boundaries follow the structure of
+the graph: a new chunk starts where the id prefix (``pod-3-agg-``, ``g2-r``,
+``core-``) changes, and within a long run after entities whose id hashes to a
+boundary, so an edit only rewrites the chunk holding the edited entity. The
+ordered list of chunk hashes is itself a ``list`` chunk, and that root hash is
+all a ``topologies`` row stores; forking a topology copies two hashes.
+
+``ChunkedJSON`` keeps this invisible to the rest of the code: the
+``nodes_json``/``edges_json`` attributes still hold the JSON text, which is
+reassembled when a row is selected. The database concatenates the leaves,
+each tagged with its position in the list, and the leaves are put back in
+list order in Python, since SQLite does not define the order in which
+``group_concat`` visits rows. Chunks carry a reference
+count (list chunks per referencing column, leaf chunks per referencing list)
+and are deleted when it drops to zero.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple
+
+from sqlalchemy import (
+    String,
+    Text,
+    bindparam,
+    cast,
+    delete,
+    event,
+    func,
+    inspect,
+    literal,
+    or_,
+    select,
+    true,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import column, table
+from sqlalchemy.types import TypeDecorator
+
+from .bundles import is_bundle
+from .metrics import span
+
+# Average entities per chunk within one id-prefix run; longer runs are cut at four times this.
+CHUNK_ITEMS = int(os.getenv("TOPOLOGY_CHUNK_ITEMS", "64"))
+
+_GRAPH_COLUMNS = ("nodes_json", "edges_json")
+# Inserted and assembled chunks are joined with the separator ``json.dumps`` uses.
+_SEPARATOR = ", "
+# Separates positioned leaves in the concatenated column. JSON text cannot contain it: control
+# characters are escaped inside strings and are not whitespace outside them.
+_RECORD = "\x1e"
+# Hashes per ``IN`` list when loading chunks, well below SQLite's bound-parameter limit.
+_LOAD_BATCH = 500
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_TRAILING_NUMBER = re.compile(r"\d+$")
+_decoder = json.JSONDecoder()
+
+_chunks = table(
+    "graph_chunks",
+    column("hash", String),
+    column("kind", String),
+    column("data", Text),
+    column("size"),
+    column("refs"),
+)
+_topologies = table("topologies", column("id"), *(column(name, String) for name in _GRAPH_COLUMNS))
+
+
+class SplitGraph(NamedTuple):
+    root: str
+    listing: str
+    leaves: tuple[tuple[str, str], ...]
+    size: int
+    # Entities in the array, with an edge bundle counted as the edges it folds.
+    entities: int
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _group(item) -> str:
+    """Chunks never span two groups: edges group by source, nodes by id, both minus the trailing number."""
+    if not isinstance(item, dict):
+        return ""
+    key = item.get("source", item.get("id"))
+    return _TRAILING_NUMBER.sub("", key) if isinstance(key, str) else ""
+
+
+def _is_boundary(item) -> bool:
+    key = item.get("id") if isinstance(item, dict) else None
+    return key is not None and zlib.crc32(str(key).encode()) % CHUNK_ITEMS == 0
+
+
+def _entities(text: str):
+    """``(item, start, end)`` for each element of the JSON array ``text``, without decoding it twice."""
+    position = _WHITESPACE.match(text, 0).end()
+    if text[position : position + 1] != "[":
+        raise ValueError("Graph column must hold a JSON array")
+    position = _WHITESPACE.match(text, position + 1).end()
+    if text[position : position + 1] == "]":
+        return
+    while True:
+        item, end = _decoder.raw_decode(text, position)
+        yield item, position, end
+        position = _WHITESPACE.match(text, end).end()
+        separator = text[position : position + 1]
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError("Graph column must hold a JSON array")
+        position = _WHITESPACE.match(text, position + 1).end()
+
+
+# Listeners split a graph just before the statement binds it; caching the last few skips the second pass.
+@lru_cache(maxsize=4)
+def split_graph(text: str) -> SplitGraph:
+    """Split a JSON array into content-addressed chunks of consecutive entities."""
+    leaves: list[tuple[str, str]] = []
+    start = end = None
+    group = None
+    count = 0
+    entities = 0
+    for item, begin, finish in _entities(text):
+        entities += len(item["bundle"]["sources"]) * len(item["bundle"]["targets"]) if is_bundle(item) else 1
+        key = _group(item)
+        if start is not None and (key != group or count >= CHUNK_ITEMS * 4):
+            leaves.append(text[start:end])
+            start = None
+        if start is None:
+            start, group, count = begin, key, 0
+        end = finish
+        count += 1
+        if _is_boundary(item):
+            leaves.append(text[start:end])
+            start = None
+    if start is not None:
+        leaves.append(text[start:end])
+    hashed = tuple((_digest(data), data) for data in leaves)
+    listing = json.dumps([digest for digest, _ in hashed])
+    size = 2 + sum(len(data) for data in leaves) + len(_SEPARATOR) * max(len(leaves) - 1, 0)
+    return SplitGraph(_digest(listing), listing, hashed, size, entities)
+
+
+class ChunkedJSON(TypeDecorator):
+    """A JSON array stored as the root hash of its chunks and read back as the JSON text.
+
+    Rows must be written through the ORM (``track_chunks`` stores the chunks
+    before the statement runs); a Core statement that needs the raw hash
+    wraps the column in ``raw_root``.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else split_graph(value).root
+
+    def column_expression(self, column_expr):
+        lists = _chunks.alias("chunk_list")
+        leaves = _chunks.alias("chunk_leaf")
+        entries = func.json_each(lists.c.data).table_valued("key", "value").alias("chunk_entry")
+        # "<position>:<leaf>" records in whatever order SQLite aggregates them; see ``process_result_value``.
+        records = func.group_concat(cast(entries.c.key, Text) + literal(":") + leaves.c.data, _RECORD)
+        assembled = (
+            select(func.coalesce(records, ""))
+            .select_from(lists)
+            .join(entries, true())
+            .join(leaves, leaves.c.hash == entries.c.value)
+            .where(lists.c.hash == raw_root(column_expr))
+            .correlate_except(lists, leaves, entries)
+            .scalar_subquery()
+        )
+        return type_coerce(assembled, _PositionedLeaves())
+
+
+class _PositionedLeaves(TypeDecorator):
+    """The records ``ChunkedJSON.column_expression`` selects, joined back into the JSON array in list order."""
+
+    impl = Text
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return "[]"
+        records = value.split(_RECORD)
+        positions = [int(record[: record.index(":")]) for record in records]
+        if positions != list(range(len(records))):
+            records = [record for _, record in sorted(zip(positions, records))]
+        return f"[{_SEPARATOR.join(record[record.index(':') + 1 :] for record in records)}]"
+
+
+def raw_root(column_expr):
+    """The stored root hash of a ``ChunkedJSON`` column, instead of the reassembled text."""
+    return type_coerce(column_expr, String)
+
+
+def graph_size(column_expr):
+    """Length of the JSON text of a ``ChunkedJSON`` column, without assembling it."""
+    return select(_chunks.c.size).where(_chunks.c.hash == raw_root(column_expr)).scalar_subquery()
+
+
+async def load_chunks_async(db: AsyncSession, hashes: list[str]) -> dict[str, str]:
+    """``hash -> data`` of the given stored chunks; a list chunk's data is the JSON list of its leaf hashes."""
+    found: dict[str, str] = {}
+    unique = list(dict.fromkeys(hashes))
+    for start in range(0, len(unique), _LOAD_BATCH):
+        batch = unique[start : start + _LOAD_BATCH]
+        found.update((await db.execute(select(_chunks.c.hash, _chunks.c.data).where(_chunks.c.hash.in_(batch)))).all())
+    return found
+
+
+def _adjust(connection: Connection, counts: Counter, step: int) -> None:
+    if counts:
+        connection.execute(
+            update(_chunks).where(_chunks.c.hash == bindparam("key")).values(refs=_chunks.c.refs + bindparam("step")),
+            [{"key": digest, "step": step * count} for digest, count in counts.items()],
+        )
+
+
+def store_graph(connection: Connection, text: str) -> str:
+    """Store the chunks of ``text`` that are not stored yet and take a reference on its root.
+
+    Inserts are conflict-safe: another connection may store the same chunks
+    between this one's reads and writes. Leaves are referenced only by the
+    connection whose insert created the root.
+    """
+    split = split_graph(text)
+    created = connection.execute(
+        sqlite_insert(_chunks)
+        .values(hash=split.root, kind="list", data=split.listing, size=split.size, refs=0)
+        .on_conflict_do_nothing(index_elements=["hash"])
+    )
+    if created.rowcount and split.leaves:
+        counts = Counter(digest for digest, _ in split.leaves)
+        leaves = sqlite_insert(_chunks)
+        connection.execute(
+            leaves.on_conflict_do_update(index_elements=["hash"], set_={"refs": _chunks.c.refs + leaves.excluded.refs}),
+            [
+                {"hash": digest, "kind": "leaf", "data": data, "size": len(data), "refs": counts[digest]}
+                for digest, data in dict(split.leaves).items()
+            ],
+        )
+    retain_graph(connection, split.root)
+    return split.root
+
+
+def retain_graph(connection: Connection, root: str) -> None:
+    _adjust(connection, Counter({root: 1}), 1)
+
+
+def release_graph(connection: Connection, root: str) -> None:
+    """Drop a reference on a root; a root nothing references any more is deleted with its orphaned leaves."""
+    _adjust(connection, Counter({root: 1}), -1)
+    listing = connection.execute(
+        select(_chunks.c.data).where(_chunks.c.hash == root, _chunks.c.refs <= 0)
+    ).scalar_one_or_none()
+    if listing is None:
+        return
+    counts = Counter(json.loads(listing))
+    _adjust(connection, counts, -1)
+    connection.execute(delete(_chunks).where(_chunks.c.hash.in_([root, *counts]), _chunks.c.refs <= 0))
+
+
+def _stored_roots(connection: Connection, topology_id: int) -> dict:
+    row = connection.execute(
+        select(*(raw_root(_topologies.c[name]) for name in _GRAPH_COLUMNS)).where(_topologies.c.id == topology_id)
+    ).one()
+    return dict(zip(_GRAPH_COLUMNS, row))
+
+
+def _store_chunks(_mapper, connection: Connection, target) -> None:
+    state = inspect(target)
+    changed = [name for name in _GRAPH_COLUMNS if state.attrs[name].history.added]
+    if not changed:
+        return
+    with span("chunk"):
+        previous = _stored_roots(connection, target.id) if state.persistent else {}
+        for name in changed:
+            store_graph(connection, getattr(target, name))
+            # Released after the new reference is taken, so chunks the two versions share survive.
+            if previous.get(name) is not None:
+                release_graph(connection, previous[name])
+
+
+def _release_chunks(_mapper, connection: Connection, target) -> None:
+    for root in _stored_roots(connection, target.id).values():
+        release_graph(connection, root)
+
+
+def track_chunks(model) -> None:
+    """Store and release the chunks behind ``model``'s graph columns as its rows are written."""
+    if event.contains(model, "before_update", _store_chunks):
+        return
+    event.listen(model, "before_insert", _store_chunks)
+    event.listen(model, "before_update", _store_chunks)
+    event.listen(model, "before_delete", _release_chunks)
+
+
+def convert_inline_graphs(connection: Connection) -> int:
+    """Move graph columns still holding JSON text (written before chunking) into chunks."""
+    inline = [raw_root(_topologies.c[name]) for name in _GRAPH_COLUMNS]
+    rows = connection.execute(
+        select(_topologies.c.id, *inline).where(or_(*(func.substr(value, 1, 1) == "[" for value in inline)))
+    ).all()
+    for topology_id, *texts in rows:
+        roots = [store_graph(connection, text) for text in texts]
+        connection.execute(
+            update(_topologies).where(_topologies.c.id == topology_id).values(dict(zip(_GRAPH_COLUMNS, roots)))
+        )
+    return len(rows)
+
+
+def chunk_stats(connection: Connection) -> dict:
+    """Stored chunk counts and bytes, next to the bytes the same graphs would take inline."""
+    stored = connection.execute(
+        select(_chunks.c.kind, func.count(), func.coalesce(func.sum(func.length(_chunks.c.data)), 0)).group_by(
+            _chunks.c.kind
+        )
+    ).all()
+    inline = connection.execute(
+        select(*(func.coalesce(func.sum(graph_size(_topologies.c[name])), 0) for name in _GRAPH_COLUMNS)).select_from(
+            _topologies
+        )
+    ).one()
+    report = {"leaf_chunks": 0, "list_chunks": 0, "stored_bytes": 0, "inline_bytes": sum(inline)}
+    for kind, count, size in stored:
+        report[f"{kind}_chunks"] = count
+        report["stored_bytes"] += size
+    return report
+
+
+def main() -> None:
+    from .db import engine
+    from .migrations import migrate
+
+    migrate(engine)
+    with engine.connect() as connection:
+        print(json.dumps(chunk_stats(connection), indent=2))
+
+
+if __name__ == "__main__":
+    main()
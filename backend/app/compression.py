@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from .metrics import span
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("TOPOLOGY_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_CACHE_BYTES = int(os.getenv("TOPOLOGY_RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/vnd.topology",
+    "application/x-ndjson",
+    "application/graphml+xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def _gzip_stream():
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _brotli_stream():
+    compressor = brotli.Compressor(quality=5)
+    return compressor.process, compressor.finish
+
+
+def _zstd_stream():
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    return compressor.compress, compressor.flush
+
+
+# Server preference order; a codec is offered only if its module is installed.
+ENCODERS: dict[str, tuple] = {}
+if brotli is not None:
+    ENCODERS["br"] = (lambda data: brotli.compress(data, quality=5), _brotli_stream)
+if zstandard is not None:
+    ENCODERS["zstd"] = (lambda data: zstandard.ZstdCompressor(level=3).compress(data), _zstd_stream)
+ENCODERS["gzip"] = (lambda data: gzip.compress(data, compresslevel=6, mtime=0), _gzip_stream)
+
+
+def choose_encoding(accept_encoding: str | None) -> str:
+    """Pick the preferred available codec the client accepts, or ``identity``."""
+    if not accept_encoding:
+        return "identity"
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    candidates = [name for name in ENCODERS if accepted.get(name, wildcard) > 0]
+    if not candidates:
+        return "identity"
+    return max(candidates, key=lambda name: accepted.get(name, wildcard))
+
+
+@span("compress")
+def compress(body: bytes, encoding: str) -> bytes:
+    return ENCODERS[encoding][0](body)
+
+
+class ResponseCache:
+    """Byte-bounded LRU of encoded response bodies.
+
+    Keys include the topology version, so entries never need explicit
+    invalidation; stale versions simply age out.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[tuple, tuple[bytes, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: tuple) -> tuple[bytes, str] | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: tuple, body: bytes, encoding: str) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._items[key] = (body, encoding)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+response_cache = ResponseCache()
+
+
+def cached_encoded_body(key: tuple, accept_encoding: str | None) -> tuple[bytes, str] | None:
+    """Return what ``encoded_body`` would, if that needs neither rendering nor compression."""
+    encoding = choose_encoding(accept_encoding)
+    cached = response_cache.get((*key, encoding))
+    if cached is not None:
+        return cached
+    identity = response_cache.get((*key, "identity"))
+    if identity is not None and (encoding == "identity" or len(identity[0]) < COMPRESS_MIN_BYTES):
+        return identity
+    return None
+
+
+def encoded_body(key: tuple, accept_encoding: str | None, render) -> tuple[bytes, str]:
+    """Return ``(body, content_encoding)`` for ``key``, rendering and compressing at most once per version."""
+    cached = cached_encoded_body(key, accept_encoding)
+    if cached is not None:
+        return cached
+    encoding = choose_encoding(accept_encoding)
+    identity = response_cache.get((*key, "identity"))
+    if identity is None:
+        identity = (render(), "identity")
+        response_cache.put((*key, "identity"), *identity)
+    if encoding == "identity" or len(identity[0]) < COMPRESS_MIN_BYTES:
+        return identity
+    result = (compress(identity[0], encoding), encoding)
+    response_cache.put((*key, encoding), *result)
+    return result
+
+
+def _header(headers: list[tuple[bytes, bytes]], name: bytes) -> bytes | None:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """Compress responses above a size threshold with the best codec the client accepts.
+
+    Responses that already carry ``Content-Encoding`` (such as cached
+    precompressed topology bodies) pass through untouched. Streaming responses
+    are compressed incrementally.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding((request_headers.get(b"accept-encoding") or b"").decode("latin-1"))
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        stream = None
+
+        async def send_compressed(message):
+            nonlocal start_message, stream
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if start_message is not None:
+                headers = list(start_message.get("headers") or [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                skip = (
+                    _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                )
+                first = start_message
+                start_message = None
+                if skip:
+                    await send(first)
+                    await send(message)
+                    stream = False
+                    return
+                headers = [(key, value) for key, value in headers if key.lower() != b"content-length"]
+                headers.append((b"content-encoding", encoding.encode()))
+                vary = _header(headers, b"vary")
+                if vary is None:
+                    headers.append((b"vary", b"Accept-Encoding"))
+                elif b"accept-encoding" not in vary.lower():
+                    headers = [(key, value) for key, value in headers if key.lower() != b"vary"]
+                    headers.append((b"vary", vary + b", Accept-Encoding"))
+                if not more_body:
+                    compressed = compress(body, encoding)
+                    headers.append((b"content-length", str(len(compressed)).encode()))
+                    await send({**first, "headers": headers})
+                    await send({"type": "http.response.body", "body": compressed})
+                    stream = False
+                    return
+                await send({**first, "headers": headers})
+                stream = ENCODERS[encoding][1]()
+
+            if stream is False:
+                await send(message)
+                return
+            feed, finish = stream
+            more_body = message.get("more_body", False)
+            with span("compress"):
+                chunk = feed(message.get("body", b""))
+                if not more_body:
+                    chunk += finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
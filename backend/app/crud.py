@@ -1,21 +1,28 @@
 import json
 from datetime import datetime
 
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from .bundles import bundle_edges
+from .chunks import graph_size, raw_root, retain_graph
 from .models import Topology
 from .schemas import TopologyCreate, TopologyPayload
-from .topology_generators import generate_leaf_spine
 
 
 def _seed_topology() -> Topology:
+    # Generators are only needed here and by the generate endpoint; keep them off the import path.
+    from .topology_generators import generate_leaf_spine
+
     generated = generate_leaf_spine(2, 4, "switch", "switch")
     return Topology(
         name="Default Leaf-Spine 2x4",
         topo_type=generated.topo_type,
         topo_params_json=json.dumps(generated.params),
         nodes_json=json.dumps(generated.nodes),
-        edges_json=json.dumps(generated.edges),
+        edges_json=json.dumps(bundle_edges(generated.edges)),
         updated_at=datetime.utcnow(),
     )
 
@@ -35,6 +42,21 @@ def get_topology(db: Session, topology_id: int) -> Topology | None:
     return db.query(Topology).filter(Topology.id == topology_id).first()
 
 
+def get_topology_version(db: Session, topology_id: int) -> int | None:
+    return db.query(Topology.version).filter(Topology.id == topology_id).scalar()
+
+
+def list_recent_topology_ids(db: Session, limit: int) -> list[int]:
+    """Ids of the ``limit`` most recently updated topologies, newest first."""
+    return list(db.scalars(select(Topology.id).order_by(Topology.updated_at.desc()).limit(limit)))
+
+
+def list_largest_topologies(db: Session, limit: int) -> list[tuple[int, str, int]]:
+    """``(id, name, JSON length)`` of the ``limit`` largest topologies."""
+    stored = graph_size(Topology.nodes_json) + graph_size(Topology.edges_json)
+    return [tuple(row) for row in db.query(Topology.id, Topology.name, stored).order_by(stored.desc()).limit(limit)]
+
+
 def get_or_create_default(db: Session) -> Topology:
     topology = db.query(Topology).first()
     if topology:
@@ -52,7 +74,7 @@ def create_topology(db: Session, payload: TopologyCreate) -> Topology:
         topo_type=payload.topo_type,
         topo_params_json=json.dumps(payload.topo_params),
         nodes_json=json.dumps(payload.nodes),
-        edges_json=json.dumps(payload.edges),
+        edges_json=json.dumps(bundle_edges(payload.edges)),
         updated_at=datetime.utcnow(),
     )
     db.add(topology)
@@ -61,18 +83,129 @@ def create_topology(db: Session, payload: TopologyCreate) -> Topology:
     return topology
 
 
-def update_topology(db: Session, topology: Topology, payload: TopologyPayload) -> Topology:
-    topology.name = payload.name
-    topology.topo_type = payload.topo_type
-    topology.topo_params_json = json.dumps(payload.topo_params)
-    topology.nodes_json = json.dumps(payload.nodes)
-    topology.edges_json = json.dumps(payload.edges)
-    topology.updated_at = datetime.utcnow()
-    db.commit()
+def update_topology(db: Session, topology: Topology, payload: TopologyPayload, retries: int = 3) -> Topology:
+    for attempt in range(retries):
+        topology.name = payload.name
+        topology.topo_type = payload.topo_type
+        topology.topo_params_json = json.dumps(payload.topo_params)
+        topology.nodes_json = json.dumps(payload.nodes)
+        topology.edges_json = json.dumps(bundle_edges(payload.edges))
+        topology.updated_at = datetime.utcnow()
+        topology.version = (topology.version or 0) + 1
+        try:
+            db.commit()
+            break
+        except StaleDataError:
+            # A full replace does not depend on what it overwrites, so retry on top of the newer row.
+            db.rollback()
+            if attempt == retries - 1:
+                raise
     db.refresh(topology)
     return topology
 
 
+def fork_topology(db: Session, topology_id: int, name: str | None = None) -> dict | None:
+    """Copy a topology by referencing its graph chunks; the cost does not depend on the graph size.
+
+    The copy starts at version 1 with its own, empty revision history.
+    """
+    table = Topology.__table__
+    source = db.execute(
+        select(
+            table.c.name,
+            table.c.topo_type,
+            table.c.topo_params_json,
+            raw_root(table.c.nodes_json),
+            raw_root(table.c.edges_json),
+        ).where(table.c.id == topology_id)
+    ).first()
+    if source is None:
+        return None
+    source_name, topo_type, topo_params_json, nodes_root, edges_root = source
+    name = name or f"{source_name} (fork)"[:200]
+    updated_at = datetime.utcnow()
+    connection = db.connection()
+    retain_graph(connection, nodes_root)
+    retain_graph(connection, edges_root)
+    fork_id = connection.execute(
+        insert(table).values(
+            name=name,
+            topo_type=topo_type,
+            topo_params_json=topo_params_json,
+            nodes_json=raw_root(nodes_root),
+            edges_json=raw_root(edges_root),
+            updated_at=updated_at,
+            version=1,
+        )
+    ).inserted_primary_key[0]
+    db.commit()
+    return {"id": fork_id, "name": name, "updated_at": updated_at}
+
+
 def delete_topology(db: Session, topology: Topology) -> None:
     db.delete(topology)
     db.commit()
+
+
+# Async counterparts for the request paths that run on the event loop.
+
+
+async def list_topologies_async(db: AsyncSession) -> list[Topology]:
+    items = list((await db.scalars(select(Topology).order_by(Topology.id.asc()))).all())
+    if items:
+        return items
+    seed = _seed_topology()
+    db.add(seed)
+    await db.commit()
+    return [seed]
+
+
+async def get_topology_async(db: AsyncSession, topology_id: int) -> Topology | None:
+    return await db.get(Topology, topology_id)
+
+
+async def get_topology_version_async(db: AsyncSession, topology_id: int) -> int | None:
+    return await db.scalar(select(Topology.version).where(Topology.id == topology_id))
+
+
+async def get_topology_roots_async(db: AsyncSession, topology_id: int):
+    """Header columns and the chunk root hashes of a topology's graph, without assembling the graph."""
+    statement = select(
+        Topology.id,
+        Topology.name,
+        Topology.topo_type,
+        Topology.topo_params_json,
+        Topology.version,
+        raw_root(Topology.nodes_json).label("nodes_root"),
+        raw_root(Topology.edges_json).label("edges_root"),
+    ).where(Topology.id == topology_id)
+    return (await db.execute(statement)).first()
+
+
+async def get_or_create_default_async(db: AsyncSession) -> Topology:
+    topology = await db.scalar(select(Topology).limit(1))
+    if topology:
+        return topology
+    seed = _seed_topology()
+    db.add(seed)
+    await db.commit()
+    return seed
+
+
+async def create_topology_async(db: AsyncSession, payload: TopologyCreate) -> Topology:
+    topology = Topology(
+        name=payload.name,
+        topo_type=payload.topo_type,
+        topo_params_json=json.dumps(payload.topo_params),
+        nodes_json=json.dumps(payload.nodes),
+        edges_json=json.dumps(bundle_edges(payload.edges)),
+        updated_at=datetime.utcnow(),
+    )
+    db.add(topology)
+    await db.commit()
+    return topology
+
+
+async def delete_topology_async(db: AsyncSession, topology: Topology) -> None:
+    await db.delete(topology)
+    await db.commit()
@@ -1,21 +1,64 @@
 import os
 from pathlib import Path
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 BACKEND_DIR = Path(__file__).resolve().parents[1]
 DEFAULT_DB_PATH = BACKEND_DIR / "data" / "topology.db"
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DEFAULT_DB_PATH}")
+# The async request path needs an async driver; SQLite URLs switch to aiosqlite automatically.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or (
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if DATABASE_URL.startswith("sqlite://")
+    else DATABASE_URL
+)
 
 if DATABASE_URL.startswith("sqlite:///"):
     db_path = DATABASE_URL.removeprefix("sqlite:///")
     if db_path and db_path != ":memory:":
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("TOPOLOGY_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("TOPOLOGY_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+DB_POOL_SIZE = int(os.getenv("TOPOLOGY_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("TOPOLOGY_DB_MAX_OVERFLOW", "10"))
+
+if SQLITE_SYNCHRONOUS not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+    raise ValueError(f"Invalid TOPOLOGY_SQLITE_SYNCHRONOUS: {SQLITE_SYNCHRONOUS}")
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+# Graph storage (``app.chunks``) relies on SQLite's upserts and ``json_each``.
+if not is_sqlite or not ASYNC_DATABASE_URL.startswith("sqlite"):
+    raise ValueError(f"Only SQLite databases are supported, got {DATABASE_URL!r} / {ASYNC_DATABASE_URL!r}")
+is_memory = is_sqlite and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:")
+
+engine_options = {}
+if not is_memory:
+    engine_options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+
+connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000} if is_sqlite else {}
+
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **engine_options)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args, **engine_options)
+
+
+def _configure_sqlite(dbapi_connection, _connection_record):
+    # WAL lets readers run alongside the single writer, so several workers can share the file.
+    cursor = dbapi_connection.cursor()
+    if not is_memory:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.close()
+
+
+if is_sqlite:
+    event.listen(engine, "connect", _configure_sqlite)
+    event.listen(async_engine.sync_engine, "connect", _configure_sqlite)
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Keep attributes loaded after commit; an async session cannot lazily refresh them on attribute access.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
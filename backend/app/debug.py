@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import hmac
+import os
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException, Request
+
+# Shared secret for the debug surface; everything under it is disabled while unset.
+DEBUG_TOKEN = os.getenv("TOPOLOGY_DEBUG_TOKEN", "")
+# Requests under this prefix can opt into per-request debug captures.
+OPT_IN_PREFIX = "/api/topologies"
+
+
+def _matches(value: str | None) -> bool:
+    return bool(DEBUG_TOKEN) and value is not None and hmac.compare_digest(value.encode(), DEBUG_TOKEN.encode())
+
+
+def debug_flag(scope, name: str) -> bool:
+    """Whether a request opts into debug feature ``name``.
+
+    A trusted client sends the debug token as the ``X-Debug-<Name>`` header or
+    the ``debug_<name>`` query parameter.
+    """
+    if not DEBUG_TOKEN:
+        return False
+    header = f"x-debug-{name}".encode()
+    for key, value in scope.get("headers", []):
+        if key == header:
+            return _matches(value.decode("latin-1"))
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get(f"debug_{name}")
+    return _matches(values[-1] if values else None)
+
+
+def require_debug_token(request: Request) -> None:
+    """Dependency guarding the ``/api/debug`` endpoints."""
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Debug endpoints are disabled")
+    if not _matches(request.headers.get("x-debug-token") or request.query_params.get("debug_token")):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
@@ -0,0 +1,160 @@
+"""Differences between two stored topologies, computed from their chunks.
+
+Graphs are stored as content-addressed chunks (see ``app.chunks``), so a
+fork, or a generated baseline and its edited copy, share every chunk that
+the edits did not touch. A diff first compares the two lists of chunk
+hashes and decodes only the chunks that are not on both sides: an entity in
+a shared chunk is byte-for-byte the same in both graphs, and since ids are
+unique within a graph, its id cannot appear in any unshared chunk either.
+The entities of the unshared chunks are then joined by id in dicts, so a
+diff costs time linear in the changed chunks, not in the graphs.
+
+Node changes that only touch ``position`` are reported as ``moved``,
+separately from structural ``modified`` changes. Edges have no position.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Iterator
+
+from .bundles import bundle_members, is_bundle
+from .exporters import buffered
+from .metrics import span
+from .topology_ops import normalize_edges
+
+# Diffs with more changed entities than this are streamed instead of cached as one body.
+DIFF_STREAM_THRESHOLD = int(os.getenv("TOPOLOGY_DIFF_STREAM_THRESHOLD", "5000"))
+
+_KINDS = ("added", "removed", "modified", "moved")
+
+
+def unshared(before: list[str], after: list[str]) -> tuple[list[str], list[str]]:
+    """Leaf hashes of each list that the other list does not contain."""
+    before_set, after_set = set(before), set(after)
+    removed = [digest for digest in before if digest not in after_set]
+    added = [digest for digest in after if digest not in before_set]
+    return removed, added
+
+
+def leaves_to_load(before, after, chunks: dict[str, str]) -> list[str]:
+    """Leaf hashes ``diff_topologies`` needs, given the list chunks of both graphs in ``chunks``."""
+    leaves: list[str] = []
+    for root in ("nodes_root", "edges_root"):
+        removed, added = unshared(json.loads(chunks[getattr(before, root)]), json.loads(chunks[getattr(after, root)]))
+        leaves.extend(removed + added)
+    return leaves
+
+
+def _decode(leaves: list[str], chunks: dict[str, str]) -> list[dict]:
+    # A leaf holds consecutive array items joined by ", ", without the brackets.
+    return json.loads(f"[{', '.join(chunks[digest] for digest in leaves)}]")
+
+
+def _expand(records: list[dict]) -> list[dict]:
+    edges: list[dict] = []
+    for record in records:
+        if is_bundle(record):
+            edges.extend(bundle_members(record))
+        else:
+            edges.append(record)
+    return normalize_edges(edges)
+
+
+def changed_fields(before: dict, after: dict) -> list[str]:
+    """Keys whose values differ, with ``data`` keys listed one by one as ``data.<key>``."""
+    fields = []
+    for key in sorted(before.keys() | after.keys()):
+        old, new = before.get(key), after.get(key)
+        if old == new:
+            continue
+        if key == "data" and isinstance(old, dict) and isinstance(new, dict):
+            fields.extend(f"data.{name}" for name in sorted(old.keys() | new.keys()) if old.get(name) != new.get(name))
+        else:
+            fields.append(key)
+    return fields
+
+
+def compare_entities(before: list[dict], after: list[dict], moves: bool = False) -> dict:
+    """Keyed join of two entity lists: ``added``, ``removed``, ``modified`` and, with ``moves``, ``moved``."""
+    previous = {item["id"]: item for item in before}
+    diff: dict = {kind: [] for kind in _KINDS}
+    for item in after:
+        old = previous.pop(item["id"], None)
+        if old is None:
+            diff["added"].append(item)
+        elif old != item:
+            if moves and {**old, "position": None} == {**item, "position": None}:
+                diff["moved"].append({"id": item["id"], "before": old.get("position"), "after": item.get("position")})
+            else:
+                diff["modified"].append(
+                    {"id": item["id"], "fields": changed_fields(old, item), "before": old, "after": item}
+                )
+    diff["removed"] = list(previous.values())
+    if not moves:
+        del diff["moved"]
+    return diff
+
+
+def diff_topologies(before, after, chunks: dict[str, str]) -> dict:
+    """The diff from ``before`` to ``after``, rows of ``crud.get_topology_roots_async``.
+
+    ``chunks`` holds the list chunks of both graphs and every leaf that is not
+    shared between them.
+    """
+    with span("diff"):
+        topology = {}
+        for key in ("name", "topo_type"):
+            if getattr(before, key) != getattr(after, key):
+                topology[key] = {"before": getattr(before, key), "after": getattr(after, key)}
+        before_params, after_params = json.loads(before.topo_params_json), json.loads(after.topo_params_json)
+        if before_params != after_params:
+            topology["topo_params"] = {"before": before_params, "after": after_params}
+
+        sections = {}
+        shared = {}
+        for name, root in (("nodes", "nodes_root"), ("edges", "edges_root")):
+            before_leaves = json.loads(chunks[getattr(before, root)])
+            after_leaves = json.loads(chunks[getattr(after, root)])
+            removed, added = unshared(before_leaves, after_leaves)
+            shared[name] = len(after_leaves) - len(added)
+            old, new = _decode(removed, chunks), _decode(added, chunks)
+            if name == "edges":
+                old, new = _expand(old), _expand(new)
+            sections[name] = compare_entities(old, new, moves=name == "nodes")
+
+    return {
+        "a": {"id": before.id, "version": before.version},
+        "b": {"id": after.id, "version": after.version},
+        "summary": {
+            **{name: {kind: len(items) for kind, items in section.items()} for name, section in sections.items()},
+            "shared_chunks": shared,
+        },
+        "topology": topology,
+        **sections,
+    }
+
+
+def diff_size(diff: dict) -> int:
+    return sum(sum(counts.values()) for name, counts in diff["summary"].items() if name != "shared_chunks")
+
+
+def iter_diff_json(diff: dict) -> Iterator[str]:
+    """The diff as JSON text, one entity at a time; the header and ``summary`` come first."""
+    header = {key: diff[key] for key in ("a", "b", "summary", "topology")}
+    yield json.dumps(header)[:-1]
+    for name in ("nodes", "edges"):
+        yield f', "{name}": {{'
+        for index, (kind, items) in enumerate(diff[name].items()):
+            yield f'{", " if index else ""}"{kind}": ['
+            for position, item in enumerate(items):
+                yield f"{', ' if position else ''}{json.dumps(item)}"
+            yield "]"
+        yield "}"
+    yield "}"
+
+
+def stream_diff(diff: dict) -> Iterator[bytes]:
+    for piece in buffered(iter_diff_json(diff)):
+        yield piece.encode()
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+from collections.abc import Callable, Iterable, Iterator
+from xml.sax.saxutils import escape, quoteattr
+
+from .bundles import bundle_members, is_bundle
+from .models import Topology
+from .topology_ops import normalize_handle
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+EXPORT_MEDIA_TYPES = {
+    "graphml": "application/graphml+xml",
+    "dot": "text/vnd.graphviz",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+CSV_COLUMNS = [
+    "type",
+    "id",
+    "kind",
+    "label",
+    "tier",
+    "splitCount",
+    "layout",
+    "x",
+    "y",
+    "source",
+    "target",
+    "sourceHandle",
+    "targetHandle",
+]
+
+GRAPHML_NODE_KEYS = ["label", "kind", "tier", "layout", "splitCount", "x", "y"]
+GRAPHML_EDGE_KEYS = ["label", "sourceHandle", "targetHandle"]
+
+_decoder = json.JSONDecoder()
+
+
+def _dumps(value) -> str:
+    # Sorted keys and fixed separators keep exports byte-identical for identical input.
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def iter_json_array(text: str) -> Iterator:
+    """Yield the items of a JSON array string one at a time, without building the list."""
+    index = text.index("[") + 1
+    length = len(text)
+    while True:
+        while index < length and text[index] in " \t\r\n,":
+            index += 1
+        if index >= length or text[index] == "]":
+            return
+        item, index = _decoder.raw_decode(text, index)
+        yield item
+
+
+def _normalized_edges(text: str) -> Iterator[dict]:
+    for item in iter_json_array(text):
+        for edge in bundle_members(item) if is_bundle(item) else (item,):
+            edge["sourceHandle"] = normalize_handle(edge.get("sourceHandle"), "source")
+            edge["targetHandle"] = normalize_handle(edge.get("targetHandle"), "target")
+            yield edge
+
+
+def _node_fields(node: dict) -> dict:
+    data = node.get("data") or {}
+    position = node.get("position") or {}
+    return {
+        "label": data.get("label"),
+        "kind": data.get("kind"),
+        "tier": data.get("tier"),
+        "layout": data.get("layout"),
+        "splitCount": data.get("splitCount"),
+        "x": position.get("x"),
+        "y": position.get("y"),
+    }
+
+
+def buffered(parts: Iterable[str]) -> Iterator[str]:
+    """Join small string parts into pieces of about ``EXPORT_CHUNK_SIZE`` for streaming."""
+    buffer: list[str] = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+class ExportSource:
+    """The stored text columns of a topology, detached from the ORM session."""
+
+    def __init__(self, topology: Topology):
+        self.id = topology.id
+        self.name = topology.name
+        self.topo_type = topology.topo_type
+        self.topo_params_json = topology.topo_params_json
+        self.nodes_json = topology.nodes_json
+        self.edges_json = topology.edges_json
+
+    @property
+    def topo_params(self) -> dict:
+        return json.loads(self.topo_params_json)
+
+    def nodes(self) -> Iterator[dict]:
+        return iter_json_array(self.nodes_json)
+
+    def edges(self) -> Iterator[dict]:
+        return _normalized_edges(self.edges_json)
+
+    def etag(self, export_format: str) -> str:
+        digest = hashlib.sha256()
+        for part in (export_format, self.name, self.topo_type, self.topo_params_json, self.nodes_json, self.edges_json):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return f'"{digest.hexdigest()[:32]}"'
+
+
+def write_ndjson(source: ExportSource) -> Iterator[str]:
+    yield (
+        _dumps(
+            {"type": "topology", "name": source.name, "topo_type": source.topo_type, "topo_params": source.topo_params}
+        )
+        + "\n"
+    )
+    for node in source.nodes():
+        node.pop("type", None)
+        yield _dumps({"type": "node", **node}) + "\n"
+    for edge in source.edges():
+        edge.pop("type", None)
+        yield _dumps({"type": "edge", **edge}) + "\n"
+
+
+def write_csv(source: ExportSource) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def row(values: list) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(["" if value is None else value for value in values])
+        return buffer.getvalue()
+
+    yield row(CSV_COLUMNS)
+    for node in source.nodes():
+        fields = _node_fields(node)
+        yield row(["node", node["id"], *(fields[column] for column in CSV_COLUMNS[2:9]), None, None, None, None])
+    for edge in source.edges():
+        yield row(
+            [
+                "edge",
+                edge["id"],
+                None,
+                edge.get("label"),
+                None,
+                None,
+                None,
+                None,
+                None,
+                edge["source"],
+                edge["target"],
+                edge["sourceHandle"],
+                edge["targetHandle"],
+            ]
+        )
+
+
+def _graphml_value(value) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return escape(str(value))
+
+
+def write_graphml(source: ExportSource) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    yield '  <key id="topo_type" for="graph" attr.name="topo_type" attr.type="string"/>\n'
+    yield '  <key id="topo_params" for="graph" attr.name="topo_params" attr.type="string"/>\n'
+    yield '  <key id="name" for="graph" attr.name="name" attr.type="string"/>\n'
+    for key in GRAPHML_NODE_KEYS:
+        attr_type = "double" if key in {"x", "y"} else "int" if key in {"tier", "splitCount"} else "string"
+        yield f'  <key id="n_{key}" for="node" attr.name="{key}" attr.type="{attr_type}"/>\n'
+    for key in GRAPHML_EDGE_KEYS:
+        yield f'  <key id="e_{key}" for="edge" attr.name="{key}" attr.type="string"/>\n'
+    yield f'  <graph id={quoteattr(f"topology-{source.id}")} edgedefault="directed">\n'
+    yield f'    <data key="name">{escape(source.name)}</data>\n'
+    yield f'    <data key="topo_type">{escape(source.topo_type)}</data>\n'
+    yield f'    <data key="topo_params">{escape(_dumps(source.topo_params))}</data>\n'
+    for node in source.nodes():
+        fields = _node_fields(node)
+        yield f"    <node id={quoteattr(node['id'])}>"
+        for key in GRAPHML_NODE_KEYS:
+            if fields[key] is not None:
+                yield f'<data key="n_{key}">{_graphml_value(fields[key])}</data>'
+        yield "</node>\n"
+    for edge in source.edges():
+        source_attr = quoteattr(edge["source"])
+        target_attr = quoteattr(edge["target"])
+        yield f"    <edge id={quoteattr(edge['id'])} source={source_attr} target={target_attr}>"
+        for key in GRAPHML_EDGE_KEYS:
+            if edge.get(key) is not None:
+                yield f'<data key="e_{key}">{_graphml_value(edge[key])}</data>'
+        yield "</edge>\n"
+    yield "  </graph>\n"
+    yield "</graphml>\n"
+
+
+def _dot_id(value) -> str:
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{text}"'
+
+
+def _dot_attrs(attrs: dict) -> str:
+    items = [f"{key}={_dot_id(value)}" for key, value in attrs.items() if value is not None]
+    return f" [{', '.join(items)}]" if items else ""
+
+
+def write_dot(source: ExportSource) -> Iterator[str]:
+    yield f"digraph {_dot_id(source.name)} {{\n"
+    yield f"  graph{_dot_attrs({'topo_type': source.topo_type, 'topo_params': _dumps(source.topo_params)})};\n"
+    for node in source.nodes():
+        fields = _node_fields(node)
+        position = None
+        if fields["x"] is not None and fields["y"] is not None:
+            position = f"{fields['x']},{fields['y']}"
+        attrs = {
+            "label": fields["label"],
+            "kind": fields["kind"],
+            "tier": fields["tier"],
+            "layout": fields["layout"],
+            "splitCount": fields["splitCount"],
+            "pos": position,
+        }
+        yield f"  {_dot_id(node['id'])}{_dot_attrs(attrs)};\n"
+    for edge in source.edges():
+        attrs = {
+            "id": edge["id"],
+            "label": edge.get("label"),
+            "sourceHandle": edge["sourceHandle"],
+            "targetHandle": edge["targetHandle"],
+        }
+        yield f"  {_dot_id(edge['source'])} -> {_dot_id(edge['target'])}{_dot_attrs(attrs)};\n"
+    yield "}\n"
+
+
+EXPORT_WRITERS: dict[str, Callable[[ExportSource], Iterator[str]]] = {
+    "graphml": write_graphml,
+    "dot": write_dot,
+    "ndjson": write_ndjson,
+    "csv": write_csv,
+}
+
+
+def stream_export(source: ExportSource, export_format: str) -> Iterator[str]:
+    return buffered(EXPORT_WRITERS[export_format](source))
@@ -0,0 +1,180 @@
+"""Group hierarchy of a topology and level-of-detail views of it.
+
+A node's groups come from ``data.group`` when a user set one (``/`` nests,
+``row-a/rack-3`` is inside ``row-a``), otherwise from the generator that
+built the topology: fat-tree and core-and-pod pods plus their core, dragonfly
+groups and torus-3d layers. Nodes in neither stay ungrouped.
+
+``build_lod`` collapses every group that is not expanded into one aggregate
+node and every set of edges between the same two visible endpoints into one
+aggregate edge carrying the count, so a client downloads only the parts of
+the graph it has opened.
+"""
+
+from __future__ import annotations
+
+import re
+
+from .metrics import span
+from .topology_ops import normalize_edges
+
+# Aggregate node and edge ids carry these prefixes, so they never collide with stored ids.
+GROUP_PREFIX = "group:"
+AGGREGATE_EDGE_PREFIX = "agg:"
+
+_POD_GROUPS = ((re.compile(r"^(pod-\d+)-"), "{}"), (re.compile(r"^core-\d+$"), "core"))
+_GENERATOR_GROUPS: dict[str, tuple[tuple[re.Pattern, str], ...]] = {
+    "fat-tree": _POD_GROUPS,
+    "core-and-pod": _POD_GROUPS,
+    "dragonfly": ((re.compile(r"^(g\d+)-r\d+$"), "{}"),),
+    "torus-3d": ((re.compile(r"^n-\d+-\d+-(\d+)$"), "layer-{}"),),
+}
+_GROUP_LABELS = (
+    (re.compile(r"^pod-(\d+)$"), "Pod {}"),
+    (re.compile(r"^g(\d+)$"), "Group {}"),
+    (re.compile(r"^layer-(\d+)$"), "Layer {}"),
+    (re.compile(r"^core$"), "Core"),
+)
+
+
+def node_groups(node: dict, topo_type: str) -> tuple[str, ...]:
+    """Ids of the groups containing ``node``, outermost first."""
+    user = (node.get("data") or {}).get("group")
+    if isinstance(user, str):
+        parts = [part for part in user.split("/") if part]
+        if parts:
+            return tuple("/".join(parts[: depth + 1]) for depth in range(len(parts)))
+    node_id = str(node.get("id", ""))
+    for pattern, template in _GENERATOR_GROUPS.get(topo_type, ()):
+        match = pattern.match(node_id)
+        if match:
+            return (template.format(*match.groups()),)
+    return ()
+
+
+def group_label(group_id: str) -> str:
+    name = group_id.rsplit("/", 1)[-1]
+    for pattern, template in _GROUP_LABELS:
+        match = pattern.match(name)
+        if match:
+            return template.format(*match.groups())
+    return name
+
+
+@span("lod")
+def build_lod(body: dict, expand: set[str]) -> dict:
+    """A topology response reduced to the groups in ``expand`` plus aggregates of everything else.
+
+    ``groups`` lists the groups that are visible, collapsed or expanded. Their
+    ``nodes`` and ``edges`` count every node and every edge with both ends
+    inside the group, at any depth. Expanding a group whose parent is
+    collapsed has no effect.
+    """
+    topo_type = body["topo_type"]
+    paths = {node["id"]: node_groups(node, topo_type) for node in body["nodes"]}
+    groups: dict[str, dict] = {}
+    for path in paths.values():
+        for depth, group_id in enumerate(path):
+            group = groups.get(group_id)
+            if group is None:
+                group = groups[group_id] = {
+                    "id": group_id,
+                    "label": group_label(group_id),
+                    "parent": path[depth - 1] if depth else None,
+                    "nodes": 0,
+                    "edges": 0,
+                }
+            group["nodes"] += 1
+
+    def visible(node_id: str) -> str:
+        for group_id in paths.get(node_id, ()):
+            if group_id not in expand:
+                return GROUP_PREFIX + group_id
+        return node_id
+
+    nodes: list[dict] = []
+    aggregates: dict[str, dict] = {}
+    for node in body["nodes"]:
+        shown = visible(node["id"])
+        if shown == node["id"]:
+            nodes.append(node)
+            continue
+        aggregate = aggregates.get(shown)
+        if aggregate is None:
+            aggregate = aggregates[shown] = {"members": 0, "x": 0.0, "y": 0.0, "tier": None}
+            nodes.append({"id": shown})
+        position = node.get("position") or {}
+        aggregate["members"] += 1
+        aggregate["x"] += position.get("x", 0)
+        aggregate["y"] += position.get("y", 0)
+        tier = (node.get("data") or {}).get("tier")
+        if isinstance(tier, int) and (aggregate["tier"] is None or tier > aggregate["tier"]):
+            aggregate["tier"] = tier
+    for index, node in enumerate(nodes):
+        aggregate = aggregates.get(node["id"])
+        if aggregate is None:
+            continue
+        group_id = node["id"].removeprefix(GROUP_PREFIX)
+        members = aggregate["members"]
+        nodes[index] = {
+            "id": node["id"],
+            "type": "group",
+            "position": {"x": aggregate["x"] / members, "y": aggregate["y"] / members},
+            "data": {"label": groups[group_id]["label"], "kind": "group", "tier": aggregate["tier"], "group": group_id},
+        }
+
+    edges: list[dict] = []
+    bundles: dict[tuple[str, str], dict] = {}
+    for edge in body["edges"]:
+        source_path = paths.get(edge["source"], ())
+        target_path = paths.get(edge["target"], ())
+        for source_group, target_group in zip(source_path, target_path):
+            if source_group != target_group:
+                break
+            groups[source_group]["edges"] += 1
+        source = visible(edge["source"])
+        target = visible(edge["target"])
+        if source == edge["source"] and target == edge["target"]:
+            edges.append(edge)
+            continue
+        if source == target:
+            continue  # inside one collapsed group
+        key = (source, target) if source < target else (target, source)
+        bundle = bundles.get(key)
+        if bundle is None:
+            bundle = bundles[key] = {
+                "id": f"{AGGREGATE_EDGE_PREFIX}{key[0]}|{key[1]}",
+                "source": source,
+                "target": target,
+                "label": "",
+                "data": {"count": 0},
+            }
+            edges.append(bundle)
+        bundle["data"]["count"] += 1
+    for bundle in bundles.values():
+        bundle["label"] = str(bundle["data"]["count"])
+
+    shown_groups = [
+        {**group, "expanded": group["id"] in expand}
+        for group in groups.values()
+        if _ancestors_expanded(group, groups, expand)
+    ]
+    return {
+        "id": body["id"],
+        "name": body["name"],
+        "topo_type": topo_type,
+        "version": body["version"],
+        "updated_at": body["updated_at"],
+        "groups": shown_groups,
+        "nodes": nodes,
+        "edges": normalize_edges(edges),
+    }
+
+
+def _ancestors_expanded(group: dict, groups: dict[str, dict], expand: set[str]) -> bool:
+    parent = group["parent"]
+    while parent is not None:
+        if parent not in expand:
+            return False
+        parent = groups[parent]["parent"]
+    return True
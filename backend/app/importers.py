@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import math
+from collections.abc import AsyncIterator
+from uuid import uuid4
+
+from .topology_ops import (
+    DEFAULT_TIER,
+    EDGE_HANDLES,
+    KIND_LABEL,
+    build_edge,
+    clamp_patch_split,
+    is_non_tree_topology,
+    normalize_handle,
+)
+
+IMPORT_FORMATS = {"ndjson", "csv"}
+IMPORT_CHUNK_ROWS = 1000
+MAX_IMPORT_ERRORS = 1000
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _as_int(row: dict, field: str) -> int | None:
+    value = row.get(field)
+    if _blank(value):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError) as exc:
+        raise ImportRowError(f"{field} must be an integer") from exc
+
+
+def _as_float(row: dict, field: str) -> float | None:
+    value = row.get(field)
+    if _blank(value):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError) as exc:
+        raise ImportRowError(f"{field} must be a number") from exc
+    if not math.isfinite(number):
+        raise ImportRowError(f"{field} must be a finite number")
+    return number
+
+
+def _as_handle(row: dict, field: str, role: str) -> str | None:
+    value = row.get(field)
+    if _blank(value):
+        return None
+    if not isinstance(value, str) or normalize_handle(value.strip(), role) not in EDGE_HANDLES:
+        raise ImportRowError(f"Unknown {field} {value!r}")
+    return normalize_handle(value.strip(), role)
+
+
+def _row_type(row: dict) -> str:
+    # React Flow documents use ``type`` for the renderer ("custom"), so only
+    # "node"/"edge"/"topology" are taken as explicit row types; anything else is inferred.
+    row_type = str(row.get("type") or "").strip().lower()
+    if row_type in {"node", "edge", "topology"}:
+        return row_type
+    return "edge" if not _blank(row.get("source")) or not _blank(row.get("target")) else "node"
+
+
+class TopologyImporter:
+    """Validates and normalizes inventory rows into node and edge dicts, chunk by chunk.
+
+    Rows are checked against the topology being imported into: node ids must not
+    collide with existing or earlier rows, and edge endpoints are resolved against
+    the combined node set once the whole stream has been read.
+    """
+
+    def __init__(
+        self,
+        *,
+        existing_nodes: list[dict],
+        existing_edges: list[dict],
+        topo_type: str,
+        edge_label: str | None,
+    ):
+        self.topo_type = topo_type
+        self.edge_label = edge_label
+        self.node_ids = {node["id"] for node in existing_nodes}
+        self.edge_ids = {edge["id"] for edge in existing_edges}
+        self.kind_counts: dict[str, int] = {}
+        for node in existing_nodes:
+            kind = (node.get("data") or {}).get("kind")
+            self.kind_counts[kind] = self.kind_counts.get(kind, 0) + 1
+        self.base_index = len(existing_nodes)
+        self.nodes: list[dict] = []
+        self.edges: list[tuple[int, dict]] = []
+        self.rows = 0
+        self.error_count = 0
+        self.errors: list[dict] = []
+        self.progress: list[dict] = []
+        self._pending: list[tuple[int, dict | ImportRowError]] = []
+
+    def add_error(self, row_number: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def _node(self, row: dict) -> dict:
+        kind = str(row.get("kind") or "rack").strip()
+        if kind not in KIND_LABEL:
+            raise ImportRowError(f"Unsupported kind '{kind}'")
+        node_id = str(row["id"]).strip() if not _blank(row.get("id")) else f"node-{uuid4().hex[:12]}"
+        if node_id in self.node_ids:
+            raise ImportRowError(f"Duplicate node id '{node_id}'")
+        tier = _as_int(row, "tier")
+        if tier is None:
+            tier = DEFAULT_TIER.get(kind, DEFAULT_TIER["server"])
+        if tier < 1:
+            raise ImportRowError("tier must be >= 1")
+        layout = row.get("layout")
+        if _blank(layout):
+            layout = "grid" if is_non_tree_topology(self.topo_type) else "tree"
+        elif layout not in {"tree", "grid"}:
+            raise ImportRowError("layout must be 'tree' or 'grid'")
+
+        position = row.get("position")
+        if isinstance(position, dict):
+            x = _as_float(position, "x")
+            y = _as_float(position, "y")
+        else:
+            x = _as_float(row, "x")
+            y = _as_float(row, "y")
+        index = self.base_index + len(self.nodes)
+        same_kind = self.kind_counts.get(kind, 0) + 1
+        node = {
+            "id": node_id,
+            "type": "custom",
+            "position": {
+                "x": x if x is not None else 100 + index * 40,
+                "y": y if y is not None else 100 + index * 30,
+            },
+            "data": {
+                "label": str(row["label"]) if not _blank(row.get("label")) else f"{KIND_LABEL[kind]} {same_kind}",
+                "kind": kind,
+                "tier": tier,
+                "layout": layout,
+            },
+        }
+        if kind == "patch":
+            node["data"]["splitCount"] = clamp_patch_split(_as_int(row, "splitCount"))
+        self.kind_counts[kind] = same_kind
+        self.node_ids.add(node_id)
+        return node
+
+    def _edge(self, row: dict) -> dict:
+        if _blank(row.get("source")) or _blank(row.get("target")):
+            raise ImportRowError("Edge rows need source and target")
+        edge_id = str(row["id"]).strip() if not _blank(row.get("id")) else None
+        if edge_id is not None and edge_id in self.edge_ids:
+            raise ImportRowError(f"Duplicate edge id '{edge_id}'")
+        source_handle = _as_handle(row, "sourceHandle", "source")
+        target_handle = _as_handle(row, "targetHandle", "target")
+        label = row.get("label")
+        edge = build_edge(
+            source=str(row["source"]).strip(),
+            target=str(row["target"]).strip(),
+            label=self.edge_label if _blank(label) else str(label),
+            edge_id=edge_id,
+            source_handle=source_handle,
+            target_handle=target_handle,
+        )
+        self.edge_ids.add(edge["id"])
+        return edge
+
+    def add_row(self, row_number: int, row: dict | ImportRowError) -> None:
+        self._pending.append((row_number, row))
+        if len(self._pending) >= IMPORT_CHUNK_ROWS:
+            self.flush_chunk()
+
+    def add_bad_row(self, row_number: int, message: str) -> None:
+        """Count a row the reader could not turn into fields, in its chunk."""
+        self.add_row(row_number, ImportRowError(message))
+
+    def flush_chunk(self) -> None:
+        if not self._pending:
+            return
+        nodes_before = len(self.nodes)
+        edges_before = len(self.edges)
+        errors_before = self.error_count
+        for row_number, row in self._pending:
+            if isinstance(row, ImportRowError):
+                self.rows += 1
+                self.add_error(row_number, str(row))
+                continue
+            row_type = _row_type(row)
+            if row_type == "topology":
+                # Header rows written by the exporters; metadata is not imported.
+                continue
+            self.rows += 1
+            try:
+                if row_type == "node":
+                    self.nodes.append(self._node(row))
+                else:
+                    self.edges.append((row_number, self._edge(row)))
+            except ImportRowError as exc:
+                self.add_error(row_number, str(exc))
+        self.progress.append(
+            {
+                "rows": self.rows,
+                "nodes": len(self.nodes) - nodes_before,
+                "edges": len(self.edges) - edges_before,
+                "errors": self.error_count - errors_before,
+            }
+        )
+        self._pending = []
+
+    def finish(self) -> tuple[list[dict], list[dict]]:
+        """Flush the last chunk and drop edges whose endpoints never appeared."""
+        self.flush_chunk()
+        edges: list[dict] = []
+        for row_number, edge in self.edges:
+            missing = [endpoint for endpoint in (edge["source"], edge["target"]) if endpoint not in self.node_ids]
+            if missing:
+                self.add_error(row_number, f"Unknown node '{missing[0]}'")
+                continue
+            edges.append(edge)
+        return self.nodes, edges
+
+    def report(self, nodes_added: int, edges_added: int) -> dict:
+        return {
+            "rows": self.rows,
+            "nodes_added": nodes_added,
+            "edges_added": edges_added,
+            "error_count": self.error_count,
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "progress": self.progress,
+        }
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """Yield ``(line_number, text)`` from a byte stream without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    line_number = 0
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield line_number + 1, buffer.rstrip("\r")
+
+
+async def feed_ndjson(importer: TopologyImporter, lines: AsyncIterator[tuple[int, str]]) -> None:
+    async for line_number, line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            importer.add_bad_row(line_number, f"Invalid JSON: {exc.msg}")
+            continue
+        if not isinstance(row, dict):
+            importer.add_bad_row(line_number, "Each line must be a JSON object")
+            continue
+        if isinstance(row.get("data"), dict):
+            # Accept React Flow shaped nodes as well as flat inventory rows.
+            row = {**row["data"], **{key: value for key, value in row.items() if key != "data"}}
+        importer.add_row(line_number, row)
+
+
+async def feed_csv(importer: TopologyImporter, lines: AsyncIterator[tuple[int, str]]) -> None:
+    # Records are parsed line by line, so quoted fields cannot contain newlines.
+    header: list[str] | None = None
+    async for line_number, line in lines:
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        if len(values) != len(header):
+            importer.add_bad_row(line_number, f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        importer.add_row(line_number, dict(zip(header, values)))
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .crud import get_topology_version, get_topology_version_async
+
+
+class DataVersionWatch:
+    """Cheap "has anything been committed?" signal shared by all workers.
+
+    ``PRAGMA data_version`` on a dedicated connection changes whenever any other
+    connection, in this process or another one, commits to the database. It
+    reads only the WAL index header, so it is much cheaper than a table lookup.
+    Returns ``True`` from ``changed`` on every call for non-SQLite engines.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.supported = engine.dialect.name == "sqlite"
+        self._connection = None
+        self._last: int | None = None
+        self._lock = threading.Lock()
+
+    def changed(self) -> bool:
+        if not self.supported:
+            return True
+        with self._lock:
+            if self._connection is None:
+                self._connection = self.engine.raw_connection()
+                # Held for the life of the process, so keep it out of the pool's accounting.
+                self._connection.detach()
+            value = self._connection.execute("PRAGMA data_version").fetchone()[0]
+            changed = value != self._last
+            self._last = value
+            return changed
+
+
+class TopologyVersions:
+    """Per-process cache of topology version numbers.
+
+    The version column is what keys every other in-process cache (encoded
+    response bodies and the like), so keeping it fresh is the only
+    invalidation those caches need. The whole map is dropped as soon as the
+    data-version signal reports a commit from any worker.
+    """
+
+    def __init__(self, engine: Engine):
+        self.watch = DataVersionWatch(engine)
+        self._versions: dict[int, int] = {}
+
+    def _current(self) -> dict[int, int]:
+        if self.watch.changed():
+            self._versions = {}
+        return self._versions
+
+    def get(self, db: Session, topology_id: int) -> int | None:
+        versions = self._current()
+        version = versions.get(topology_id)
+        if version is None:
+            version = get_topology_version(db, topology_id)
+            if version is not None:
+                versions[topology_id] = version
+        return version
+
+    async def get_async(self, db: AsyncSession, topology_id: int) -> int | None:
+        versions = self._current()
+        version = versions.get(topology_id)
+        if version is None:
+            version = await get_topology_version_async(db, topology_id)
+            if version is not None:
+                versions[topology_id] = version
+        return version
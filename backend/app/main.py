@@ -1,64 +1,180 @@
-from fastapi import Depends, FastAPI, HTTPException
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Literal
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from .bundles import expand_edges
+from .chunks import load_chunks_async
+from .compression import (
+    ENCODERS,
+    CompressionMiddleware,
+    cached_encoded_body,
+    choose_encoding,
+    encoded_body,
+    response_cache,
+)
 from .crud import (
-    create_topology,
-    delete_topology,
+    create_topology_async,
+    delete_topology_async,
+    fork_topology,
     get_or_create_default,
+    get_or_create_default_async,
     get_topology,
-    list_topologies,
+    get_topology_async,
+    get_topology_roots_async,
+    get_topology_version,
+    list_largest_topologies,
+    list_recent_topology_ids,
+    list_topologies_async,
     update_topology,
 )
-from .db import SessionLocal, engine
-from .models import Base
+from .db import AsyncSessionLocal, SessionLocal, async_engine, engine
+from .debug import require_debug_token
+from .hierarchy import build_lod
+from .invalidation import TopologyVersions
+from .memory import MemoryTracingMiddleware, deep_sizeof, graph_footprint, memory_samples, process_memory
+from .metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, instrument_database, registry
+from .migrations import migrate
+from .ports import PORT_KEYS, PortMap, cable_edge, cabled_ports, release_edge_ports
+from .profiling import ProfilingMiddleware, profile_store
+from .revisions import (
+    chain_reaches,
+    list_revisions_async,
+    load_revision_chain_async,
+    load_revisions_since_async,
+    revision_to_response,
+    track_revisions,
+)
+from .rules import RULES, RuleEngine
 from .schemas import (
     ArrangeRequest,
     BatchNodeCreate,
     EdgeCreate,
     EdgeUpdate,
+    ForkRequest,
     GenerateTopologyRequest,
+    ImportReport,
     LayoutRequest,
+    LodResponse,
     NodeCreate,
     NodeUpdate,
+    PortAllocateRequest,
+    PortFreeRequest,
+    PortsResponse,
+    RevisionSummary,
+    SweepRequest,
+    SweepResponse,
     TopologyCreate,
+    TopologyDiffResponse,
     TopologyPayload,
     TopologyResponse,
     TopologySummary,
+    ViolationsResponse,
 )
+from .singleflight import SingleFlight
 from .topology_ops import (
     DEFAULT_PATCH_SPLIT,
     DEFAULT_TIER,
+    EDGE_HANDLES,
     KIND_LABEL,
     MAX_PATCH_SPLIT,
     MIN_PATCH_SPLIT,
+    GraphDelta,
     apply_auto_layout,
     arrange_nodes,
     build_edge,
     build_node,
     clamp_patch_split,
+    diff_graph,
+    normalize_edges,
     read_topology_graph,
     topology_to_response,
     write_topology_graph,
 )
-from .topology_generators import (
-    generate_butterfly,
-    generate_core_and_pod,
-    generate_dragonfly,
-    generate_expanded_clos,
-    generate_fat_tree,
-    generate_leaf_spine,
-    generate_mesh,
-    generate_ring,
-    generate_star,
-    generate_three_tier,
-    generate_torus_2d,
-    generate_torus_3d,
+from .validation import graph_errors
+from .wire import (
+    COLUMNAR_MEDIA_TYPE,
+    encode_topology_body,
+    minimal_response,
+    negotiate_topology,
+    wants_columnar,
+    wants_minimal,
 )
+from .write_buffer import WriteBuffer
+
+logger = logging.getLogger(__name__)
+
+# Off for workers started by ``app.server``, which migrates once before forking them.
+MIGRATE_ON_STARTUP = os.getenv("TOPOLOGY_MIGRATE_ON_STARTUP", "1") != "0"
+# How many of the most recently updated topologies to encode into the response cache at startup.
+WARMUP_TOPOLOGIES = int(os.getenv("TOPOLOGY_WARMUP", "0"))
+
+instrument_database(engine, async_engine.sync_engine)
+track_revisions()
+
+write_buffer = WriteBuffer(SessionLocal)
+topology_versions = TopologyVersions(engine)
+single_flight = SingleFlight()
+rule_engine = RuleEngine()
+
+
+def topology_body_key(topology_id: int, version: int, media_type: str, bundled: bool) -> tuple:
+    return (topology_id, version, media_type, bundled)
+
+
+def warm_up(count: int) -> list[int]:
+    """Encode and compress the ``count`` most recently updated topologies into the response cache.
 
-Base.metadata.create_all(bind=engine)
+    Their first GET is then a cache hit, as it would be after any other read.
+    Only the plain JSON body is warmed, with the codec a client accepting every
+    encoding would get.
+    """
+    accept_encoding = ", ".join(ENCODERS)
+    with SessionLocal() as db:
+        topology_ids = list_recent_topology_ids(db, count)
+        for topology_id in topology_ids:
+            topology = get_topology(db, topology_id)
+            encoded_body(
+                topology_body_key(topology.id, topology.version, "application/json", False),
+                accept_encoding,
+                lambda: encode_topology_body(topology_to_response(topology), False),
+            )
+    return topology_ids
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    started = time.perf_counter()
+    if MIGRATE_ON_STARTUP:
+        await run_in_threadpool(migrate, engine)
+    if WARMUP_TOPOLOGIES > 0:
+        topology_ids = await run_in_threadpool(warm_up, WARMUP_TOPOLOGIES)
+        # Opens the async pool and fills the version cache the first GETs consult.
+        async with AsyncSessionLocal() as db:
+            for topology_id in topology_ids:
+                await topology_versions.get_async(db, topology_id)
+        logger.info("warmed %d topologies in %.0f ms", len(topology_ids), (time.perf_counter() - started) * 1000)
+    yield
+    # Make buffered autosaves durable before the process exits.
+    await run_in_threadpool(write_buffer.close)
+    await async_engine.dispose()
 
-app = FastAPI(title="Topology Viewer API")
+
+app = FastAPI(title="Topology Viewer API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -67,6 +183,16 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MemoryTracingMiddleware)
+# Outermost, so compression time is part of the request it belongs to.
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(StaleDataError)
+async def concurrent_write_handler(_request: Request, _exc: StaleDataError):
+    return JSONResponse(status_code=409, content={"detail": "Topology was modified concurrently, retry the request"})
 
 
 def get_db():
@@ -74,20 +200,143 @@ def get_db():
     try:
         yield db
     finally:
+        for buffer, topology_id in db.info.pop("write_holds", ()):
+            buffer.release(topology_id)
         db.close()
 
 
+def hold_buffered_writes(db: Session, topology_id: int) -> bool:
+    """Commit the topology's buffered autosave and hold new ones until the request ends; whether one was committed.
+
+    A ``PUT`` answered while this request changes the row would otherwise
+    name the version this request's commit takes.
+    """
+    holds = db.info.setdefault("write_holds", [])
+    if (write_buffer, topology_id) in holds:
+        return False
+    flushed = write_buffer.acquire(topology_id)
+    holds.append((write_buffer, topology_id))
+    return flushed
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def get_topology_or_404(db: Session, topology_id: int):
+    # Everything that loads the row works on committed state, so buffered autosaves go first.
+    hold_buffered_writes(db, topology_id)
     topology = get_topology(db, topology_id)
     if not topology:
         raise HTTPException(status_code=404, detail="Topology not found")
     return topology
 
 
-def commit_topology(db: Session, topology):
+async def get_topology_or_404_async(db: AsyncSession, topology_id: int):
+    if write_buffer.get(topology_id) is not None:
+        await run_in_threadpool(write_buffer.flush, topology_id)
+    topology = await get_topology_async(db, topology_id)
+    if not topology:
+        raise HTTPException(status_code=404, detail="Topology not found")
+    return topology
+
+
+async def topology_body_response(request: Request, topology) -> Response:
+    """Encode a topology in a worker thread, so a large graph does not stall the event loop."""
+    columnar = wants_columnar(request)
+    body = await run_in_threadpool(lambda: encode_topology_body(topology_to_response(topology), columnar))
+    if columnar:
+        return Response(content=body, media_type=COLUMNAR_MEDIA_TYPE, headers={"Vary": "Accept"})
+    return Response(content=body, media_type="application/json")
+
+
+def commit_topology(db: Session, topology, request: Request, delta: Callable[[], GraphDelta]):
+    if wants_minimal(request):
+        # Stamp from the in-memory row before commit expires it, so no refresh is needed.
+        body = {"id": topology.id, "version": topology.version, "updated_at": topology.updated_at}
+        db.commit()
+        return minimal_response({**body, **delta().as_dict()})
     db.commit()
     db.refresh(topology)
-    return topology_to_response(topology)
+    return negotiate_topology(request, topology_to_response(topology))
+
+
+def mutation_flight_key(kind: str, db: Session, topology_id: int, request: Request, payload) -> tuple:
+    """Single-flight key of a mutation: identical requests against the same version share one commit.
+
+    The response shape the client negotiated is part of the key, since waiters get the leader's response.
+    """
+    hold_buffered_writes(db, topology_id)
+    version = topology_versions.get(db, topology_id)
+    return (kind, topology_id, version, payload.model_dump_json(), wants_minimal(request), wants_columnar(request))
+
+
+async def cached_topology_response(
+    request: Request, db: AsyncSession, topology_id: int, at: int | None = None, bundled: bool = False
+) -> Response:
+    """Serve a stored topology from the encoded-body cache, keyed by its version.
+
+    On a hit only the version is looked up, from memory unless some worker has
+    committed since, so repeated GETs of an unchanged topology skip the query,
+    JSON decoding, re-encoding and compression. ``at`` selects an earlier
+    revision, which is the same document the topology had at that version.
+    ``bundled`` serves edge bundles folded, which only the JSON encoding has.
+    """
+    pending = write_buffer.get(topology_id)
+    version = pending.version if pending is not None else await topology_versions.get_async(db, topology_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+    historic = at is not None and at != version
+    if historic:
+        if at > version:
+            raise HTTPException(status_code=404, detail="Revision not found")
+        pending, version = None, at
+    columnar = wants_columnar(request) and not bundled
+    media_type = COLUMNAR_MEDIA_TYPE if columnar else "application/json"
+    etag = f'W/"{topology_id}-{version}{"-c" if columnar else ""}{"-b" if bundled else ""}"'
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if pending is not None:
+        # Unflushed autosave: serve it from memory so readers see their own writes.
+        body = await run_in_threadpool(lambda: encode_topology_body(pending.to_response(bundled), columnar))
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    key = topology_body_key(topology_id, version, media_type, bundled)
+    accept_encoding = request.headers.get("accept-encoding")
+    cached = cached_encoded_body(key, accept_encoding)
+
+    async def render() -> tuple[bytes, str]:
+        # Shared by every caller with this key, so it must not use the first caller's session.
+        async with AsyncSessionLocal() as flight_db:
+            if historic:
+                chain = await load_revision_chain_async(flight_db, topology_id, version)
+                if not chain_reaches(chain, version):
+                    raise HTTPException(status_code=404, detail="Revision not found")
+                return await run_in_threadpool(
+                    encoded_body,
+                    key,
+                    accept_encoding,
+                    lambda: encode_topology_body(revision_to_response(topology_id, chain, bundled), columnar),
+                )
+            topology = await get_topology_or_404_async(flight_db, topology_id)
+            # Decoding, re-encoding and compressing are CPU-bound; keep them off the event loop.
+            # The row may have moved on since ``version`` was read, so cache the body under the version it shows.
+            return await run_in_threadpool(
+                encoded_body,
+                topology_body_key(topology_id, topology.version, media_type, bundled),
+                accept_encoding,
+                lambda: encode_topology_body(topology_to_response(topology, bundled), columnar),
+            )
+
+    if cached is None:
+        # Tabs opening the same topology at once share one render.
+        cached = await single_flight.run_async(("read", *key, choose_encoding(accept_encoding)), render)
+    body, encoding = cached
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
 
 
 @app.get("/api/health")
@@ -95,6 +344,72 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/api/metrics")
+def read_metrics():
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/api/debug/profiles", dependencies=[Depends(require_debug_token)])
+def read_profiles():
+    return profile_store.list()
+
+
+@app.get("/api/debug/profiles/{profile_id}", dependencies=[Depends(require_debug_token)])
+def read_profile(
+    profile_id: str,
+    profile_format: Literal["pstats", "text"] = Query(default="pstats", alias="format"),
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(default=50, ge=1, le=1000),
+):
+    if profile_format == "text":
+        text = profile_store.text(profile_id, sort, limit)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return Response(content=text, media_type="text/plain; charset=utf-8")
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(
+        content=path.read_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+    )
+
+
+@app.get("/api/debug/memory", dependencies=[Depends(require_debug_token)])
+def read_memory_report(limit: int = Query(default=10, ge=0, le=100), db: Session = Depends(get_db)):
+    topologies = []
+    for topology_id, name, stored_bytes in list_largest_topologies(db, limit):
+        pending = write_buffer.get(topology_id)
+        if pending is not None:
+            nodes, edges = pending.nodes, normalize_edges(pending.edges)
+        else:
+            topology = get_topology(db, topology_id)
+            if topology is None:
+                continue
+            _, nodes, edges = read_topology_graph(topology)
+        footprint = graph_footprint(nodes, edges)
+        topologies.append({"id": topology_id, "name": name, "stored_bytes": stored_bytes, **footprint})
+    buffered = write_buffer.pending()
+    return {
+        "process": process_memory(),
+        "caches": {
+            "response_cache": {
+                "entries": len(response_cache),
+                "bytes": response_cache.size,
+                "max_bytes": response_cache.max_bytes,
+            },
+            "write_buffer": {
+                "pending": len(buffered),
+                "conflicts": write_buffer.conflicts,
+                "estimated_bytes": sum(deep_sizeof(item.nodes) + deep_sizeof(item.edges) for item in buffered),
+            },
+        },
+        "topologies": topologies,
+        "requests": memory_samples.report(),
+    }
+
+
 @app.get("/api/meta")
 def read_api_meta():
     return {
@@ -129,195 +444,403 @@ def read_api_meta():
             "distribute-horizontal",
             "distribute-vertical",
         ],
-        "edge_handles": [
-            "top-out",
-            "bottom-out",
-            "left-out",
-            "right-out",
-            "top-in",
-            "bottom-in",
-            "left-in",
-            "right-in",
-        ],
+        "edge_handles": list(EDGE_HANDLES),
+        "rules": [item.as_dict() for item in RULES],
     }
 
 
+@app.post("/api/sweep", response_model=SweepResponse)
+def sweep_topology_params(payload: SweepRequest):
+    from .sweep import MAX_EXACT_SWEEP_COMBINATIONS, MAX_SWEEP_COMBINATIONS, run_sweep
+
+    try:
+        return run_sweep(
+            payload.topo_type,
+            payload.ranges,
+            payload.params,
+            exact=payload.exact,
+            max_combinations=MAX_EXACT_SWEEP_COMBINATIONS if payload.exact else MAX_SWEEP_COMBINATIONS,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @app.get("/api/topology", response_model=TopologyResponse)
-def read_topology(db: Session = Depends(get_db)):
-    topology = get_or_create_default(db)
-    return topology_to_response(topology)
+async def read_topology(request: Request, db: AsyncSession = Depends(get_async_db)):
+    topology = await get_or_create_default_async(db)
+    if write_buffer.get(topology.id) is not None and await run_in_threadpool(write_buffer.flush, topology.id):
+        await db.refresh(topology)
+    return await topology_body_response(request, topology)
 
 
 @app.put("/api/topology", response_model=TopologyResponse)
-def write_topology(payload: TopologyPayload, db: Session = Depends(get_db)):
+def write_topology(payload: TopologyPayload, request: Request, db: Session = Depends(get_db)):
     topology = get_or_create_default(db)
+    if hold_buffered_writes(db, topology.id):
+        db.refresh(topology)
     topology = update_topology(db, topology, payload)
-    return topology_to_response(topology)
+    return negotiate_topology(request, topology_to_response(topology))
 
 
 @app.get("/api/topologies", response_model=list[TopologySummary])
-def read_topologies(db: Session = Depends(get_db)):
-    items = list_topologies(db)
-    return [{"id": item.id, "name": item.name, "updated_at": item.updated_at} for item in items]
+async def read_topologies(db: AsyncSession = Depends(get_async_db)):
+    summaries = []
+    for item in await list_topologies_async(db):
+        current = write_buffer.get(item.id) or item
+        summaries.append({"id": item.id, "name": current.name, "updated_at": current.updated_at})
+    return summaries
 
 
 @app.post("/api/topologies", response_model=TopologyResponse)
-def create_topology_endpoint(payload: TopologyCreate, db: Session = Depends(get_db)):
-    topology = create_topology(db, payload)
-    return topology_to_response(topology)
+async def create_topology_endpoint(payload: TopologyCreate, request: Request, db: AsyncSession = Depends(get_async_db)):
+    topology = await create_topology_async(db, payload)
+    return await topology_body_response(request, topology)
 
 
 @app.get("/api/topologies/{topology_id}", response_model=TopologyResponse)
-def read_topology_by_id(topology_id: int, db: Session = Depends(get_db)):
-    topology = get_topology_or_404(db, topology_id)
-    return topology_to_response(topology)
+async def read_topology_by_id(
+    topology_id: int,
+    request: Request,
+    at: int | None = Query(default=None, ge=1),
+    bundles: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await cached_topology_response(request, db, topology_id, at, bundles)
+
+
+@app.get("/api/topologies/{topology_id}/lod", response_model=LodResponse)
+async def read_topology_lod(
+    topology_id: int,
+    request: Request,
+    expand: list[str] = Query(default=[]),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Collapsed view of a topology; cached per version and set of expanded groups like the full document."""
+    if write_buffer.get(topology_id) is not None:
+        await run_in_threadpool(write_buffer.flush, topology_id)
+    version = await topology_versions.get_async(db, topology_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+    expanded = set(expand)
+    accept_encoding = request.headers.get("accept-encoding")
+    cached = cached_encoded_body((topology_id, version, "lod", *sorted(expanded)), accept_encoding)
+    if cached is None:
+        topology = await get_topology_or_404_async(db, topology_id)
+        cached = await run_in_threadpool(
+            encoded_body,
+            (topology_id, topology.version, "lod", *sorted(expanded)),
+            accept_encoding,
+            lambda: encode_topology_body(build_lod(topology_to_response(topology), expanded), False),
+        )
+    body, encoding = cached
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/topologies/{topology_id}/render.svg")
+async def render_topology_svg(
+    topology_id: int,
+    request: Request,
+    width: int = Query(default=1200, ge=16, le=8192),
+    height: int = Query(default=800, ge=16, le=8192),
+    lod: Literal["auto", "full", "groups"] = "auto",
+    expand: list[str] = Query(default=[]),
+    tile: int = Query(default=12, ge=2, le=256),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """SVG overview of a topology, simplified to what fits in ``width`` x ``height``; cached per version."""
+    from .render import render_svg
+
+    if write_buffer.get(topology_id) is not None:
+        await run_in_threadpool(write_buffer.flush, topology_id)
+    version = await topology_versions.get_async(db, topology_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+    expanded = set(expand)
+    key = (topology_id, version, "svg", width, height, lod, tile, *sorted(expanded))
+    etag = f'W/"svg-{topology_id}-{version}-{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    accept_encoding = request.headers.get("accept-encoding")
+    cached = cached_encoded_body(key, accept_encoding)
+
+    async def render() -> tuple[bytes, str]:
+        async with AsyncSessionLocal() as flight_db:
+            topology = await get_topology_or_404_async(flight_db, topology_id)
+            body = topology_to_response(topology)
+        return await run_in_threadpool(
+            encoded_body,
+            (topology_id, topology.version, *key[2:]),
+            accept_encoding,
+            lambda: render_svg(body, width, height, lod, expanded, tile),
+        )
+
+    if cached is None:
+        cached = await single_flight.run_async(("svg", *key, choose_encoding(accept_encoding)), render)
+    body, encoding = cached
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="image/svg+xml", headers=headers)
+
+
+@app.get("/api/topologies/{topology_id}/revisions", response_model=list[RevisionSummary])
+async def read_topology_revisions(
+    topology_id: int,
+    limit: int = Query(default=100, ge=1, le=1000),
+    before: int | None = Query(default=None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if write_buffer.get(topology_id) is None and await topology_versions.get_async(db, topology_id) is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+    return await list_revisions_async(db, topology_id, limit, before)
+
+
+@app.get("/api/topologies/{topology_id}/violations", response_model=ViolationsResponse)
+async def read_topology_violations(
+    topology_id: int,
+    severity: Literal["error", "warning"] | None = None,
+    limit: int = Query(default=1000, ge=0, le=100000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Rule violations at the current version, re-checked only where revisions since the last check touched."""
+    if write_buffer.get(topology_id) is not None:
+        await run_in_threadpool(write_buffer.flush, topology_id)
+    version = await topology_versions.get_async(db, topology_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+
+    async def check():
+        state = rule_engine.get(topology_id)
+        async with AsyncSessionLocal() as flight_db:
+            if state is not None and state.version < version:
+                revisions = await load_revisions_since_async(flight_db, topology_id, state.version, version)
+                state = await run_in_threadpool(rule_engine.advance, topology_id, state, revisions)
+            # A flight for a later version may have advanced the shared state past this one already.
+            report = state.report() if state is not None else None
+            if report is None or report.version < version:
+                topology = await get_topology_or_404_async(flight_db, topology_id)
+                document = {
+                    "topo_type": topology.topo_type,
+                    "topo_params": json.loads(topology.topo_params_json),
+                    "nodes": json.loads(topology.nodes_json),
+                    "edges": json.loads(topology.edges_json),
+                }
+                state = await run_in_threadpool(rule_engine.evaluate, topology_id, topology.version, document)
+                report = state.report()
+        return report
+
+    report = await single_flight.run_async(("violations", topology_id, version), check)
+    violations = report.violations
+    if severity is not None:
+        violations = [violation for violation in violations if violation["severity"] == severity]
+    return {
+        "id": topology_id,
+        "version": report.version,
+        "errors": report.errors,
+        "warnings": len(report.violations) - report.errors,
+        "checked": report.checked,
+        "violations": violations[:limit],
+    }
+
+
+@app.get("/api/topologies/{topology_id}/diff/{other_id}", response_model=TopologyDiffResponse)
+async def diff_topology(topology_id: int, other_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """What changed from this topology to ``other_id``; only the graph chunks they do not share are decoded."""
+    from .diff import DIFF_STREAM_THRESHOLD, diff_size, diff_topologies, iter_diff_json, leaves_to_load, stream_diff
+
+    rows = []
+    for diff_id in (topology_id, other_id):
+        if write_buffer.get(diff_id) is not None:
+            await run_in_threadpool(write_buffer.flush, diff_id)
+        row = await get_topology_roots_async(db, diff_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Topology not found")
+        rows.append(row)
+    before, after = rows
+    etag = f'W/"diff-{before.id}-{before.version}-{after.id}-{after.version}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    key = ("diff", before.id, before.version, after.id, after.version)
+    accept_encoding = request.headers.get("accept-encoding")
+    cached = cached_encoded_body(key, accept_encoding)
+    if cached is None:
+        chunks = await load_chunks_async(db, [before.nodes_root, before.edges_root, after.nodes_root, after.edges_root])
+        chunks.update(await load_chunks_async(db, leaves_to_load(before, after, chunks)))
+        diff = await run_in_threadpool(diff_topologies, before, after, chunks)
+        if diff_size(diff) > DIFF_STREAM_THRESHOLD:
+            return StreamingResponse(stream_diff(diff), media_type="application/json", headers=headers)
+        cached = await run_in_threadpool(
+            encoded_body, key, accept_encoding, lambda: "".join(iter_diff_json(diff)).encode()
+        )
+    body, encoding = cached
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.post("/api/topologies/{topology_id}/fork", response_model=TopologySummary)
+def fork_topology_endpoint(topology_id: int, payload: ForkRequest | None = None, db: Session = Depends(get_db)):
+    write_buffer.flush(topology_id)
+    fork = fork_topology(db, topology_id, payload.name if payload else None)
+    if fork is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+    return fork
 
 
 @app.put("/api/topologies/{topology_id}", response_model=TopologyResponse)
-def write_topology_by_id(topology_id: int, payload: TopologyPayload, db: Session = Depends(get_db)):
+def write_topology_by_id(topology_id: int, payload: TopologyPayload, request: Request, db: Session = Depends(get_db)):
+    if write_buffer.enabled:
+        pending = write_buffer.put(topology_id, payload, lambda: get_topology_version(db, topology_id))
+        if pending is None:
+            raise HTTPException(status_code=404, detail="Topology not found")
+        return negotiate_topology(request, pending.to_response())
     topology = get_topology_or_404(db, topology_id)
     topology = update_topology(db, topology, payload)
-    return topology_to_response(topology)
+    return negotiate_topology(request, topology_to_response(topology))
 
 
 @app.delete("/api/topologies/{topology_id}")
-def delete_topology_by_id(topology_id: int, db: Session = Depends(get_db)):
-    topology = get_topology_or_404(db, topology_id)
-    delete_topology(db, topology)
+async def delete_topology_by_id(topology_id: int, db: AsyncSession = Depends(get_async_db)):
+    await run_in_threadpool(write_buffer.discard, topology_id)
+    topology = await get_topology_or_404_async(db, topology_id)
+    await delete_topology_async(db, topology)
+    rule_engine.discard(topology_id)
     return {"status": "deleted"}
 
 
 @app.post("/api/topologies/{topology_id}/generate", response_model=TopologyResponse)
-def generate_topology(topology_id: int, payload: GenerateTopologyRequest, db: Session = Depends(get_db)):
-    topology = get_topology_or_404(db, topology_id)
+def generate_topology(
+    topology_id: int,
+    payload: GenerateTopologyRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    from .topology_generators import generate_by_type
 
-    topo_type = payload.topo_type
-    params = payload.params or {}
-    edge_label = params.get("edge_label", "link")
-    try:
-        if topo_type == "leaf-spine":
-            result = generate_leaf_spine(
-                params.get("spines", 2),
-                params.get("leaves", 4),
-                params.get("spine_kind", "switch"),
-                params.get("leaf_kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "fat-tree":
-            result = generate_fat_tree(
-                params.get("k", 4),
-                params.get("core_kind", "switch"),
-                params.get("agg_kind", "switch"),
-                params.get("edge_kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "three-tier":
-            result = generate_three_tier(
-                params.get("core", 2),
-                params.get("aggregation", 4),
-                params.get("access", 6),
-                params.get("core_kind", "switch"),
-                params.get("agg_kind", "switch"),
-                params.get("access_kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "expanded-clos":
-            result = generate_expanded_clos(
-                params.get("tiers", 4),
-                params.get("nodes_per_tier", 4),
-                params.get("kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "core-and-pod":
-            result = generate_core_and_pod(
-                params.get("cores", 2),
-                params.get("pods", 2),
-                params.get("pod_leaves", 4),
-                params.get("pod_aggs", 2),
-                params.get("core_kind", "switch"),
-                params.get("agg_kind", "switch"),
-                params.get("leaf_kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "torus-2d":
-            result = generate_torus_2d(
-                params.get("rows", 3),
-                params.get("cols", 3),
-                params.get("kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "torus-3d":
-            result = generate_torus_3d(
-                params.get("x", 3),
-                params.get("y", 3),
-                params.get("z", 3),
-                params.get("kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "dragonfly":
-            result = generate_dragonfly(
-                params.get("groups", 3),
-                params.get("routers_per_group", 4),
-                params.get("kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "butterfly":
-            result = generate_butterfly(
-                params.get("stages", 4),
-                params.get("width", 4),
-                params.get("kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "mesh":
-            result = generate_mesh(
-                params.get("rows", 3),
-                params.get("cols", 3),
-                params.get("kind", "switch"),
-                edge_label,
-            )
-        elif topo_type == "ring":
-            result = generate_ring(params.get("count", 6), params.get("kind", "switch"), edge_label)
-        elif topo_type == "star":
-            result = generate_star(params.get("count", 6), params.get("kind", "switch"), edge_label)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported topology type")
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    def run():
+        topology = get_topology_or_404(db, topology_id)
+
+        try:
+            result = generate_by_type(payload.topo_type, payload.params)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        previous = (topology.nodes_json, topology.edges_json)
+        topology.name = payload.name or topology.name
+        write_topology_graph(
+            topology,
+            topo_type=result.topo_type,
+            topo_params=result.params,
+            nodes=result.nodes,
+            edges=result.edges,
+        )
+
+        def delta() -> GraphDelta:
+            before_nodes = json.loads(previous[0])
+            before_edges = normalize_edges(expand_edges(json.loads(previous[1])))
+            delta = diff_graph(before_nodes, result.nodes, before_edges, normalize_edges(result.edges))
+            delta.topology = {"name": topology.name, "topo_type": result.topo_type, "topo_params": result.params}
+            return delta
+
+        return commit_topology(db, topology, request, delta)
+
+    return single_flight.run(mutation_flight_key("generate", db, topology_id, request, payload), run)
+
+
+@app.get("/api/topologies/{topology_id}/export")
+async def export_topology(
+    topology_id: int,
+    request: Request,
+    export_format: Literal["graphml", "dot", "ndjson", "csv"] = Query(default="graphml", alias="format"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    from .exporters import EXPORT_MEDIA_TYPES, ExportSource, stream_export
+
+    source = ExportSource(await get_topology_or_404_async(db, topology_id))
+    etag = source.etag(export_format)
+    headers = {
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="topology-{topology_id}.{export_format}"',
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        stream_export(source, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers,
+    )
+
+
+@app.post("/api/topologies/{topology_id}/import", response_model=ImportReport)
+async def import_topology_rows(
+    topology_id: int,
+    request: Request,
+    import_format: Literal["ndjson", "csv"] | None = Query(default=None, alias="format"),
+    mode: Literal["append", "replace"] = "append",
+    db: Session = Depends(get_db),
+):
+    from .importers import TopologyImporter, feed_csv, feed_ndjson, iter_lines
 
-    topology.name = payload.name or topology.name
-    write_topology_graph(
-        topology,
-        topo_type=result.topo_type,
-        topo_params=result.params,
-        nodes=result.nodes,
-        edges=result.edges,
+    topology = await run_in_threadpool(get_topology_or_404, db, topology_id)
+    topo_params, nodes, edges = await run_in_threadpool(read_topology_graph, topology)
+    if mode == "replace":
+        nodes, edges = [], []
+    if import_format is None:
+        import_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+    importer = TopologyImporter(
+        existing_nodes=nodes,
+        existing_edges=edges,
+        topo_type=topology.topo_type,
+        edge_label=topo_params.get("edge_label", "link"),
     )
-    return commit_topology(db, topology)
+    feed = feed_csv if import_format == "csv" else feed_ndjson
+    await feed(importer, iter_lines(request.stream()))
+
+    def write_import() -> dict:
+        new_nodes, new_edges = importer.finish()
+        nodes.extend(new_nodes)
+        edges.extend(new_edges)
+        # Rows are checked one by one; this applies the rules a PUT of the whole graph would meet.
+        errors = graph_errors(nodes, edges)
+        if errors:
+            raise RequestValidationError(
+                [{"type": "graph", "loc": ("body", *loc), "msg": message, "input": None} for loc, message in errors]
+            )
+        write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
+        db.commit()
+        return {"id": topology.id, "updated_at": topology.updated_at, **importer.report(len(new_nodes), len(new_edges))}
+
+    return await run_in_threadpool(write_import)
 
 
 @app.post("/api/topologies/{topology_id}/nodes", response_model=TopologyResponse)
-def create_node_endpoint(topology_id: int, payload: NodeCreate, db: Session = Depends(get_db)):
+def create_node_endpoint(topology_id: int, payload: NodeCreate, request: Request, db: Session = Depends(get_db)):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
-    nodes.append(
-        build_node(
-            existing_nodes=nodes,
-            kind=payload.kind,
-            label=payload.label,
-            tier=payload.tier,
-            split_count=payload.splitCount,
-            position=payload.position.model_dump() if payload.position else None,
-            layout=payload.layout,
-            node_id=payload.id,
-            topo_type=topology.topo_type,
-        )
+    node = build_node(
+        existing_nodes=nodes,
+        kind=payload.kind,
+        label=payload.label,
+        tier=payload.tier,
+        split_count=payload.splitCount,
+        position=payload.position.model_dump() if payload.position else None,
+        layout=payload.layout,
+        group=payload.group,
+        node_id=payload.id,
+        topo_type=topology.topo_type,
     )
+    nodes.append(node)
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    return commit_topology(db, topology, request, lambda: GraphDelta(created_nodes=[node]))
 
 
 @app.post("/api/topologies/{topology_id}/nodes/batch", response_model=TopologyResponse)
-def create_nodes_batch(topology_id: int, payload: BatchNodeCreate, db: Session = Depends(get_db)):
+def create_nodes_batch(topology_id: int, payload: BatchNodeCreate, request: Request, db: Session = Depends(get_db)):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
     count = max(1, int(payload.count))
@@ -337,6 +860,7 @@ def create_nodes_batch(topology_id: int, payload: BatchNodeCreate, db: Session =
         )
     nodes.extend(new_nodes)
 
+    new_edges = []
     if payload.connect_to_lower_tier:
         lower_tiers = [
             node_tier
@@ -348,7 +872,7 @@ def create_nodes_batch(topology_id: int, payload: BatchNodeCreate, db: Session =
             lower_nodes = [node for node in existing_nodes if (node.get("data") or {}).get("tier") == lower_tier]
             for new_node in new_nodes:
                 for lower_node in lower_nodes:
-                    edges.append(
+                    new_edges.append(
                         build_edge(
                             source=new_node["id"],
                             target=lower_node["id"],
@@ -356,13 +880,20 @@ def create_nodes_batch(topology_id: int, payload: BatchNodeCreate, db: Session =
                             edge_id=f"e-custom-{new_node['id']}-{lower_node['id']}",
                         )
                     )
+    edges.extend(new_edges)
 
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    return commit_topology(db, topology, request, lambda: GraphDelta(created_nodes=new_nodes, created_edges=new_edges))
 
 
 @app.patch("/api/topologies/{topology_id}/nodes/{node_id}", response_model=TopologyResponse)
-def update_node_endpoint(topology_id: int, node_id: str, payload: NodeUpdate, db: Session = Depends(get_db)):
+def update_node_endpoint(
+    topology_id: int,
+    node_id: str,
+    payload: NodeUpdate,
+    request: Request,
+    db: Session = Depends(get_db),
+):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
     target = next((node for node in nodes if node["id"] == node_id), None)
@@ -382,51 +913,76 @@ def update_node_endpoint(topology_id: int, node_id: str, payload: NodeUpdate, db
         data["tier"] = int(updates.pop("tier"))
     if "layout" in updates:
         data["layout"] = updates.pop("layout")
+    if "group" in updates:
+        group = updates.pop("group")
+        if group:
+            data["group"] = group
+        else:
+            data.pop("group", None)
     if payload.splitCount is not None or data.get("kind") == "patch" or previous_kind == "patch":
+        highest_used = port_map_or_400({**target, "data": {**data, "kind": "patch"}}).highest_used
         if data.get("kind") == "patch":
             data["splitCount"] = clamp_patch_split(payload.splitCount if payload.splitCount is not None else data.get("splitCount"))
+            if data["splitCount"] < highest_used:
+                detail = f"Port {highest_used} is in use; free it before shrinking the panel"
+                raise HTTPException(status_code=400, detail=detail)
+        elif highest_used:
+            raise HTTPException(status_code=400, detail="Free the panel's ports before changing its kind")
         else:
             data.pop("splitCount", None)
 
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    return commit_topology(db, topology, request, lambda: GraphDelta(updated_nodes=[target]))
 
 
 @app.delete("/api/topologies/{topology_id}/nodes/{node_id}", response_model=TopologyResponse)
-def delete_node_endpoint(topology_id: int, node_id: str, db: Session = Depends(get_db)):
+def delete_node_endpoint(topology_id: int, node_id: str, request: Request, db: Session = Depends(get_db)):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
     next_nodes = [node for node in nodes if node["id"] != node_id]
     if len(next_nodes) == len(nodes):
         raise HTTPException(status_code=404, detail="Node not found")
     next_edges = [edge for edge in edges if edge["source"] != node_id and edge["target"] != node_id]
+    removed = [edge for edge in edges if edge["source"] == node_id or edge["target"] == node_id]
+    panels = release_ports_or_400(next_nodes, removed)
     write_topology_graph(topology, topo_params=topo_params, nodes=next_nodes, edges=next_edges)
-    return commit_topology(db, topology)
+
+    def delta() -> GraphDelta:
+        return GraphDelta(updated_nodes=panels, deleted_nodes=[node_id], deleted_edges=[edge["id"] for edge in removed])
+
+    return commit_topology(db, topology, request, delta)
 
 
 @app.post("/api/topologies/{topology_id}/edges", response_model=TopologyResponse)
-def create_edge_endpoint(topology_id: int, payload: EdgeCreate, db: Session = Depends(get_db)):
+def create_edge_endpoint(topology_id: int, payload: EdgeCreate, request: Request, db: Session = Depends(get_db)):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
     node_ids = {node["id"] for node in nodes}
     if payload.source not in node_ids or payload.target not in node_ids:
         raise HTTPException(status_code=400, detail="Edge source/target must reference existing nodes")
-    edges.append(
-        build_edge(
-            source=payload.source,
-            target=payload.target,
-            label=payload.label,
-            edge_id=payload.id,
-            source_handle=payload.sourceHandle,
-            target_handle=payload.targetHandle,
-        )
+    edge = build_edge(
+        source=payload.source,
+        target=payload.target,
+        label=payload.label,
+        edge_id=payload.id,
+        source_handle=payload.sourceHandle,
+        target_handle=payload.targetHandle,
     )
+    requested = {role: port for role, port in (("source", payload.sourcePort), ("target", payload.targetPort)) if port}
+    panels = cable_ports_or_400(nodes, edges, edge, requested)
+    edges.append(edge)
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    return commit_topology(db, topology, request, lambda: GraphDelta(updated_nodes=panels, created_edges=[edge]))
 
 
 @app.patch("/api/topologies/{topology_id}/edges/{edge_id}", response_model=TopologyResponse)
-def update_edge_endpoint(topology_id: int, edge_id: str, payload: EdgeUpdate, db: Session = Depends(get_db)):
+def update_edge_endpoint(
+    topology_id: int,
+    edge_id: str,
+    payload: EdgeUpdate,
+    request: Request,
+    db: Session = Depends(get_db),
+):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
     target = next((edge for edge in edges if edge["id"] == edge_id), None)
@@ -439,34 +995,146 @@ def update_edge_endpoint(topology_id: int, edge_id: str, payload: EdgeUpdate, db
         target["sourceHandle"] = updates["sourceHandle"]
     if "targetHandle" in updates:
         target["targetHandle"] = updates["targetHandle"]
+    requested = {role: updates[key] for role, key in PORT_KEYS.items() if key in updates}
+    panels = cable_ports_or_400(nodes, edges, target, requested)
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    return commit_topology(
+        db, topology, request, lambda: GraphDelta(updated_nodes=panels, updated_edges=normalize_edges([target]))
+    )
 
 
 @app.delete("/api/topologies/{topology_id}/edges/{edge_id}", response_model=TopologyResponse)
-def delete_edge_endpoint(topology_id: int, edge_id: str, db: Session = Depends(get_db)):
+def delete_edge_endpoint(topology_id: int, edge_id: str, request: Request, db: Session = Depends(get_db)):
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
     next_edges = [edge for edge in edges if edge["id"] != edge_id]
     if len(next_edges) == len(edges):
         raise HTTPException(status_code=404, detail="Edge not found")
+    panels = release_ports_or_400(nodes, [edge for edge in edges if edge["id"] == edge_id])
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=next_edges)
-    return commit_topology(db, topology)
+    return commit_topology(db, topology, request, lambda: GraphDelta(updated_nodes=panels, deleted_edges=[edge_id]))
 
 
-@app.post("/api/topologies/{topology_id}/layout", response_model=TopologyResponse)
-def layout_topology(topology_id: int, payload: LayoutRequest, db: Session = Depends(get_db)):
+def port_map_or_400(node: dict) -> PortMap:
+    try:
+        return PortMap.of(node)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def cable_ports_or_400(nodes: list[dict], edges: list[dict], edge: dict, requested: dict) -> list[dict]:
+    if not requested:
+        return []
+    try:
+        return cable_edge({node["id"]: node for node in nodes}, edges, edge, requested)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def release_ports_or_400(nodes: list[dict], edges: list[dict]) -> list[dict]:
+    if not any(edge.get(key) is not None for edge in edges for key in PORT_KEYS.values()):
+        return []
+    try:
+        return release_edge_ports({node["id"]: node for node in nodes}, edges)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def find_panel_or_404(nodes: list[dict], node_id: str) -> tuple[dict, PortMap]:
+    node = next((node for node in nodes if node["id"] == node_id), None)
+    if node is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return node, port_map_or_400(node)
+
+
+def ports_response(node_id: str, version: int, port_map: PortMap, **extra) -> dict:
+    return {"node": node_id, "version": version, **port_map.summary(), **extra}
+
+
+@app.get("/api/topologies/{topology_id}/nodes/{node_id}/ports", response_model=PortsResponse)
+async def read_node_ports(
+    topology_id: int,
+    node_id: str,
+    state: Literal["all", "free", "used"] = "all",
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=0, le=1024),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """A window of a panel's ports; only the ports in the window are materialized."""
+    topology = await get_topology_or_404_async(db, topology_id)
+
+    def window() -> dict:
+        # Decoding a large graph would block the event loop.
+        _topo_params, nodes, edges = read_topology_graph(topology)
+        _node, ports = find_panel_or_404(nodes, node_id)
+        cabled = cabled_ports(edges, node_id)
+        states = [
+            {"port": port, "used": ports.is_used(port), "edge": cabled.get(port)}
+            for port in islice(ports.iter_ports(state, offset), limit)
+        ]
+        return ports_response(node_id, topology.version, ports, ports=states)
+
+    return await run_in_threadpool(window)
+
+
+@app.post("/api/topologies/{topology_id}/nodes/{node_id}/ports/allocate", response_model=PortsResponse)
+def allocate_node_ports(topology_id: int, node_id: str, payload: PortAllocateRequest, db: Session = Depends(get_db)):
+    """Reserve the given ports, or the ``count`` lowest free ones, ahead of cabling them."""
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
-    nodes = apply_auto_layout(nodes, edges, topology.topo_type, topo_params, payload.end_gap)
+    node, ports = find_panel_or_404(nodes, node_id)
+    try:
+        if payload.ports is None:
+            changed = ports.allocate(payload.count)
+        else:
+            changed = sorted(set(payload.ports))
+            for port in changed:
+                ports.reserve(port)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    ports.store(node)
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    db.commit()
+    return ports_response(node_id, topology.version, ports, changed=changed)
 
 
-@app.post("/api/topologies/{topology_id}/arrange", response_model=TopologyResponse)
-def arrange_topology_nodes(topology_id: int, payload: ArrangeRequest, db: Session = Depends(get_db)):
+@app.post("/api/topologies/{topology_id}/nodes/{node_id}/ports/free", response_model=PortsResponse)
+def free_node_ports(topology_id: int, node_id: str, payload: PortFreeRequest, db: Session = Depends(get_db)):
+    """Free allocated ports; a port an edge is cabled to is freed by deleting or re-cabling the edge."""
     topology = get_topology_or_404(db, topology_id)
     topo_params, nodes, edges = read_topology_graph(topology)
-    nodes = arrange_nodes(nodes, payload.node_ids, payload.mode)
+    node, ports = find_panel_or_404(nodes, node_id)
+    changed = sorted(set(payload.ports))
+    cabled = cabled_ports(edges, node_id)
+    try:
+        for port in changed:
+            if port in cabled:
+                raise ValueError(f"Port {port} is cabled to edge {cabled[port]}")
+            ports.release(port)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    ports.store(node)
     write_topology_graph(topology, topo_params=topo_params, nodes=nodes, edges=edges)
-    return commit_topology(db, topology)
+    db.commit()
+    return ports_response(node_id, topology.version, ports, changed=changed)
+
+
+@app.post("/api/topologies/{topology_id}/layout", response_model=TopologyResponse)
+def layout_topology(topology_id: int, payload: LayoutRequest, request: Request, db: Session = Depends(get_db)):
+    def run():
+        topology = get_topology_or_404(db, topology_id)
+        topo_params, nodes, edges = read_topology_graph(topology)
+        next_nodes = apply_auto_layout(nodes, edges, topology.topo_type, topo_params, payload.end_gap)
+        write_topology_graph(topology, topo_params=topo_params, nodes=next_nodes, edges=edges)
+        return commit_topology(db, topology, request, lambda: diff_graph(nodes, next_nodes))
+
+    return single_flight.run(mutation_flight_key("layout", db, topology_id, request, payload), run)
+
+
+@app.post("/api/topologies/{topology_id}/arrange", response_model=TopologyResponse)
+def arrange_topology_nodes(topology_id: int, payload: ArrangeRequest, request: Request, db: Session = Depends(get_db)):
+    topology = get_topology_or_404(db, topology_id)
+    topo_params, nodes, edges = read_topology_graph(topology)
+    next_nodes = arrange_nodes(nodes, payload.node_ids, payload.mode)
+    write_topology_graph(topology, topo_params=topo_params, nodes=next_nodes, edges=edges)
+    return commit_topology(db, topology, request, lambda: diff_graph(nodes, next_nodes))
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import UTC, datetime
+
+from .debug import OPT_IN_PREFIX, debug_flag
+from .metrics import current_timing
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+# Traced requests kept for ``/api/debug/memory``.
+MEMORY_SAMPLES = int(os.getenv("TOPOLOGY_MEMORY_SAMPLES", "50"))
+
+# tracemalloc is process-wide, so traced requests run one at a time.
+_tracing = threading.Lock()
+
+
+def deep_sizeof(value) -> int:
+    """Bytes held by a decoded JSON value: containers, keys and leaves, each object counted once."""
+    seen: set[int] = set()
+    total = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return total
+
+
+def graph_footprint(nodes: list[dict], edges: list[dict]) -> dict:
+    """Estimated in-memory size of one decoded topology graph."""
+    node_bytes = deep_sizeof(nodes)
+    edge_bytes = deep_sizeof(edges)
+    return {
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "estimated_bytes": node_bytes + edge_bytes,
+        "bytes_per_node": node_bytes // len(nodes) if nodes else 0,
+        "bytes_per_edge": edge_bytes // len(edges) if edges else 0,
+    }
+
+
+def process_memory() -> dict:
+    """Resident set size of this worker, now and at its peak, where the platform reports it."""
+    report: dict = {"pid": os.getpid(), "rss_bytes": None, "peak_rss_bytes": None}
+    try:
+        with open("/proc/self/statm") as statm:
+            report["rss_bytes"] = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        report["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    return report
+
+
+class MemorySamples:
+    """Recent traced requests plus the largest peak seen per endpoint."""
+
+    def __init__(self, size: int = MEMORY_SAMPLES):
+        self.recent: deque[dict] = deque(maxlen=size)
+        self.largest: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, sample: dict) -> None:
+        key = f"{sample['method']} {sample['endpoint']}"
+        with self._lock:
+            self.recent.appendleft(sample)
+            largest = self.largest.get(key)
+            if largest is None or sample["peak_bytes"] > largest["peak_bytes"]:
+                self.largest[key] = sample
+
+    def report(self) -> dict:
+        with self._lock:
+            return {"largest_by_endpoint": dict(sorted(self.largest.items())), "recent": list(self.recent)}
+
+
+memory_samples = MemorySamples()
+
+
+class MemoryTracingMiddleware:
+    """Measure peak Python allocation of opted-in ``/api/topologies`` requests with tracemalloc.
+
+    A request opts in with the debug token (see ``debug_flag``). The peak so
+    far is returned in ``X-Debug-Memory-Peak`` and the final figure is kept
+    in ``memory_samples``. Requests that arrive while another one is traced
+    are served untraced.
+    """
+
+    def __init__(self, app, samples: MemorySamples = memory_samples):
+        self.app = app
+        self.samples = samples
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(OPT_IN_PREFIX)
+            or not debug_flag(scope, "memory")
+            or not _tracing.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._trace(scope, receive, send)
+        finally:
+            _tracing.release()
+
+    async def _trace(self, scope, receive, send):
+        status = 500
+
+        async def send_with_peak(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                peak = tracemalloc.get_traced_memory()[1] - baseline
+                headers = [*message.get("headers", []), (b"x-debug-memory-peak", str(peak).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        # Respect a trace started elsewhere (PYTHONTRACEMALLOC); only reset its peak.
+        owned = not tracemalloc.is_tracing()
+        if owned:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_peak)
+        finally:
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+            if owned:
+                tracemalloc.stop()
+            timing = current_timing()
+            route = scope.get("route")
+            self.samples.add(
+                {
+                    "created_at": datetime.now(UTC).isoformat(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "endpoint": getattr(route, "path", None) or "unmatched",
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "peak_bytes": peak,
+                    "nodes": timing.nodes if timing is not None else None,
+                    "edges": timing.edges if timing is not None else None,
+                }
+            )
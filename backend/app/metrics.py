@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RequestTiming:
+    """Exclusive time per stage for one request; a stage nested in another is not counted twice."""
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.nodes: int | None = None
+        self.edges: int | None = None
+        self._children: list[float] = []
+
+    def enter(self) -> float:
+        self._children.append(0.0)
+        return time.perf_counter()
+
+    def exit(self, stage: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        child = self._children.pop() if self._children else 0.0
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - child
+        if self._children:
+            self._children[-1] += elapsed
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a hot-path stage of the current request; a no-op outside requests."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = timing.enter()
+    try:
+        yield
+    finally:
+        timing.exit(stage, started)
+
+
+def current_timing() -> RequestTiming | None:
+    return _current.get()
+
+
+def record_graph(nodes: int, edges: int) -> None:
+    timing = _current.get()
+    if timing is not None:
+        timing.nodes = nodes
+        timing.edges = edges
+
+
+def _enter_db(info: dict) -> None:
+    timing = _current.get()
+    if timing is not None:
+        info.setdefault("request_timing", []).append((timing, timing.enter()))
+
+
+def _exit_db(info: dict) -> None:
+    stack = info.get("request_timing")
+    if stack:
+        timing, started = stack.pop()
+        timing.exit("db", started)
+
+
+def instrument_database(*engines: Engine) -> None:
+    """Count statements and commits as the ``db`` stage of the current request."""
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", lambda conn, *_: _enter_db(conn.info))
+        event.listen(engine, "after_cursor_execute", lambda conn, *_: _exit_db(conn.info))
+    # COMMIT itself is not a cursor statement; time the whole commit, flush included.
+    event.listen(Session, "before_commit", lambda session: _enter_db(session.info))
+    event.listen(Session, "after_commit", lambda session: _exit_db(session.info))
+    event.listen(Session, "after_rollback", lambda session: _exit_db(session.info))
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Per-process stage latency histograms, graph-size gauges and single-flight counters, as Prometheus text."""
+
+    def __init__(self):
+        self._histograms: dict[tuple[str, str, str], _Histogram] = {}
+        self._graph: dict[tuple[str, str], tuple[int, int]] = {}
+        # Per kind of work: [calls that ran, calls that waited for an identical one instead].
+        self._flights: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def count_flight(self, kind: str, coalesced: bool) -> None:
+        with self._lock:
+            counts = self._flights.setdefault(kind, [0, 0])
+            counts[coalesced] += 1
+
+    def observe(self, method: str, endpoint: str, timing: RequestTiming, total: float) -> None:
+        with self._lock:
+            for stage, seconds in (*timing.stages.items(), ("total", total)):
+                key = (method, endpoint, stage)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = _Histogram()
+                histogram.observe(seconds)
+            if timing.nodes is not None:
+                self._graph[(method, endpoint)] = (timing.nodes, timing.edges or 0)
+
+    def render(self) -> str:
+        lines = [
+            "# HELP topology_request_stage_seconds Time spent per request stage.",
+            "# TYPE topology_request_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            graph = sorted(self._graph.items())
+            flights = sorted((kind, tuple(counts)) for kind, counts in self._flights.items())
+            for (method, endpoint, stage), histogram in histograms:
+                labels = f'method="{method}",endpoint="{_escape(endpoint)}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'topology_request_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'topology_request_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"topology_request_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}")
+                lines.append(f"topology_request_stage_seconds_count{{{labels}}} {histogram.count}")
+        for name, index, help_text in (
+            ("topology_request_graph_nodes", 0, "Nodes in the topology handled by the latest request."),
+            ("topology_request_graph_edges", 1, "Edges in the topology handled by the latest request."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for (method, endpoint), sizes in graph:
+                lines.append(f'{name}{{method="{method}",endpoint="{_escape(endpoint)}"}} {sizes[index]}')
+        for name, index, help_text in (
+            ("topology_singleflight_executed_total", 0, "Expensive computations that ran."),
+            ("topology_singleflight_coalesced_total", 1, "Requests that shared an identical running computation."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for kind, counts in flights:
+                lines.append(f'{name}{{kind="{_escape(kind)}"}} {counts[index]}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Time each HTTP request, add a ``Server-Timing`` header and feed ``registry``.
+
+    Stages recorded before the response starts appear in the header; the
+    histograms also see work done while a streaming body is sent.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timing = RequestTiming()
+        token = _current.set(timing)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                header = timing.server_timing(time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            self.registry.observe(scope["method"], endpoint, timing, time.perf_counter() - started)
@@ -0,0 +1,30 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .chunks import convert_inline_graphs
+from .models import Base
+
+
+def migrate(engine: Engine) -> None:
+    """Create missing tables and add columns introduced since the database was created.
+
+    Only additive changes are handled: new columns must be nullable or carry a
+    ``server_default`` so existing rows stay valid. Graphs stored inline before
+    chunked storage are moved into ``graph_chunks``.
+    """
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                statement = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                if column.server_default is not None:
+                    statement += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    statement += " NOT NULL"
+                connection.execute(text(statement))
+        convert_inline_graphs(connection)
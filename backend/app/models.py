@@ -1,8 +1,10 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
 from sqlalchemy.orm import declarative_base
 
+from .chunks import ChunkedJSON, track_chunks
+
 Base = declarative_base()
 
 
@@ -13,6 +15,48 @@ class Topology(Base):
     name = Column(String(200), nullable=False, default="Default")
     topo_type = Column(String(50), nullable=False, default="custom")
     topo_params_json = Column(Text, nullable=False, default="{}")
-    nodes_json = Column(Text, nullable=False)
-    edges_json = Column(Text, nullable=False)
+    # Root hashes of the graph chunks, read and written as the JSON text (see ``app.chunks``).
+    nodes_json = Column(ChunkedJSON, nullable=False)
+    edges_json = Column(ChunkedJSON, nullable=False)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Writes set the next version themselves; flushes only match the version they loaded, so a
+    # concurrent write from another worker raises StaleDataError instead of being silently lost.
+    __mapper_args__ = {"version_id_col": version, "version_id_generator": False}
+
+
+track_chunks(Topology)
+
+
+class GraphChunk(Base):
+    """A run of graph entities (``leaf``) or the ordered hashes of a graph's runs (``list``), stored once."""
+
+    __tablename__ = "graph_chunks"
+
+    hash = Column(String(64), primary_key=True)
+    kind = Column(String(10), nullable=False)
+    data = Column(Text, nullable=False)
+    # Length of the JSON text the chunk stands for; for a list, the whole reassembled array.
+    size = Column(Integer, nullable=False, default=0)
+    refs = Column(Integer, nullable=False, default=0)
+
+
+class TopologyRevision(Base):
+    """One stored revision of a topology: a full snapshot or a delta from the revision before it."""
+
+    __tablename__ = "topology_revisions"
+
+    id = Column(Integer, primary_key=True)
+    topology_id = Column(Integer, nullable=False)
+    # The topology version this revision reproduces.
+    revision = Column(Integer, nullable=False)
+    kind = Column(String(10), nullable=False)
+    # Deltas applied since the last snapshot, 0 for a snapshot.
+    chain = Column(Integer, nullable=False, default=0)
+    payload_json = Column(Text, nullable=False)
+    node_count = Column(Integer, nullable=False, default=0)
+    edge_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_topology_revisions_topology_revision", "topology_id", "revision", unique=True),)
@@ -0,0 +1,190 @@
+"""Ports of patch panels.
+
+A panel has ports ``1..splitCount``. Only the used ones are stored, as
+ranges in the node's data (``"ports": {"used": [[1, 24], [40, 40]]}``). In
+memory they form a bitmap held in one integer, so counting, testing and
+finding the lowest free port are integer operations rather than a scan over
+ports. Individual port records are only built for the window a query asks
+for.
+
+A port is used either because an edge is cabled to it (the edge's
+``sourcePort``/``targetPort``) or because it was allocated ahead of cabling.
+Cabling an edge to an allocated port claims that port for the edge.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Iterator
+
+from .topology_ops import clamp_patch_split
+
+PORT_KEYS = {"source": "sourcePort", "target": "targetPort"}
+_RUN = re.compile("1+")
+
+
+class PortMap:
+    """Used ports of one panel; bit ``n - 1`` of ``mask`` is set while port ``n`` is used."""
+
+    def __init__(self, size: int, mask: int = 0):
+        self.size = size
+        self.mask = mask
+
+    @classmethod
+    def of(cls, node: dict) -> PortMap:
+        data = node.get("data") or {}
+        if data.get("kind") != "patch":
+            raise ValueError(f"Node {node.get('id')} is not a patch panel and has no ports")
+        ports = cls(clamp_patch_split(data.get("splitCount")))
+        for entry in (data.get("ports") or {}).get("used", ()):
+            start, end = entry if isinstance(entry, list | tuple) and len(entry) == 2 else (None, None)
+            if not isinstance(start, int) or not isinstance(end, int) or not 1 <= start <= end:
+                raise ValueError(f"Node {node.get('id')} has a malformed port range: {entry!r}")
+            ports.mask |= ((1 << (end - start + 1)) - 1) << (start - 1)
+        return ports
+
+    def store(self, node: dict) -> None:
+        data = node.setdefault("data", {})
+        if self.mask:
+            data["ports"] = {"used": self.ranges()}
+        else:
+            data.pop("ports", None)
+
+    def ranges(self) -> list[list[int]]:
+        # Runs of set bits, found by the regex engine on the binary digits (lowest port first).
+        bits = bin(self.mask)[:1:-1]
+        return [[run.start() + 1, run.end()] for run in _RUN.finditer(bits)]
+
+    @property
+    def used(self) -> int:
+        return self.mask.bit_count()
+
+    @property
+    def highest_used(self) -> int:
+        return self.mask.bit_length()
+
+    def is_used(self, port: int) -> bool:
+        return bool(self.mask >> (port - 1) & 1)
+
+    def next_free(self) -> int | None:
+        # The lowest clear bit is the lowest set bit of mask + 1.
+        lowest = (self.mask + 1) & ~self.mask
+        port = lowest.bit_length()
+        return port if port <= self.size else None
+
+    def _check(self, port: int) -> None:
+        if not 1 <= port <= self.size:
+            raise ValueError(f"Port {port} is out of range 1..{self.size}")
+
+    def reserve(self, port: int) -> None:
+        self._check(port)
+        if self.is_used(port):
+            raise ValueError(f"Port {port} is already in use")
+        self.mask |= 1 << (port - 1)
+
+    def is_allocated(self, port: int, edges: Iterable[dict], node_id: str) -> bool:
+        """Whether ``port`` is used without any of ``edges`` being cabled to it; raises if it is cabled."""
+        self._check(port)
+        if not self.is_used(port):
+            return False
+        cabled = cabled_ports(edges, node_id)
+        if port in cabled:
+            raise ValueError(f"Port {port} is already cabled to edge {cabled[port]}")
+        return True
+
+    def release(self, port: int) -> None:
+        self._check(port)
+        self.mask &= ~(1 << (port - 1))
+
+    def allocate(self, count: int) -> list[int]:
+        """Reserve the ``count`` lowest free ports."""
+        if self.size - self.used < count:
+            raise ValueError(f"Only {self.size - self.used} of {self.size} ports are free")
+        allocated = []
+        for _ in range(count):
+            port = self.next_free()
+            self.mask |= 1 << (port - 1)
+            allocated.append(port)
+        return allocated
+
+    def iter_ports(self, state: str, offset: int = 0) -> Iterator[int]:
+        """Port numbers in ``state`` (``used``, ``free`` or ``all``), in order, skipping the first ``offset``."""
+        if state == "all":
+            yield from range(offset + 1, self.size + 1)
+            return
+        mask = self.mask if state == "used" else ~self.mask & ((1 << self.size) - 1)
+        bits = bin(mask)[:1:-1]
+        for run in _RUN.finditer(bits):
+            length = run.end() - run.start()
+            if offset >= length:
+                offset -= length
+                continue
+            yield from range(run.start() + 1 + offset, run.end() + 1)
+            offset = 0
+
+    def summary(self) -> dict:
+        return {
+            "size": self.size,
+            "used": self.used,
+            "free": self.size - self.used,
+            "next_free": self.next_free(),
+            "ranges": self.ranges(),
+        }
+
+
+def cabled_ports(edges: Iterable[dict], node_id: str) -> dict[int, str]:
+    """Port number to edge id, for the edges cabled to ports of ``node_id``."""
+    cabled = {}
+    for edge in edges:
+        for role, key in PORT_KEYS.items():
+            port = edge.get(key)
+            if port is not None and edge.get(role) == node_id:
+                cabled[port] = edge["id"]
+    return cabled
+
+
+def cable_edge(
+    nodes_by_id: dict[str, dict], edges: list[dict], edge: dict, requested: dict[str, int | str | None]
+) -> list[dict]:
+    """Move the ends of ``edge`` named in ``requested`` to the given ports and record them on it.
+
+    ``requested`` maps ``source``/``target`` to a port number, ``"auto"`` for the
+    lowest free port, or ``None`` to uncable that end. A given port may be
+    free or allocated, but not cabled to another of ``edges``. The port an end
+    was on before is freed. Returns the panels whose ports changed.
+    """
+    changed = []
+    for role, port in requested.items():
+        key = PORT_KEYS[role]
+        node = nodes_by_id[edge[role]]
+        if port is None and edge.get(key) is None:
+            continue
+        ports = PortMap.of(node)
+        if edge.get(key) is not None:
+            ports.release(edge.pop(key))
+        if port == "auto":
+            (port,) = ports.allocate(1)
+        elif port is not None and not ports.is_allocated(port, edges, node["id"]):
+            ports.reserve(port)
+        ports.store(node)
+        if port is not None:
+            edge[key] = port
+        if node not in changed:
+            changed.append(node)
+    return changed
+
+
+def release_edge_ports(nodes_by_id: dict[str, dict], edges: Iterable[dict]) -> list[dict]:
+    """Free the ports the given edges were cabled to; returns the panels whose ports changed."""
+    changed = []
+    for edge in edges:
+        for role, key in PORT_KEYS.items():
+            node = nodes_by_id.get(edge.get(role))
+            if edge.get(key) is None or node is None:
+                continue
+            ports = PortMap.of(node)
+            ports.release(edge[key])
+            ports.store(node)
+            if node not in changed:
+                changed.append(node)
+    return changed
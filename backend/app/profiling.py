@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import re
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+
+from .db import BACKEND_DIR
+from .debug import OPT_IN_PREFIX, debug_flag
+from .metrics import current_timing
+
+PROFILE_DIR = Path(os.getenv("TOPOLOGY_PROFILE_DIR", str(BACKEND_DIR / "data" / "profiles")))
+# Oldest captures are deleted beyond this many.
+PROFILE_KEEP = int(os.getenv("TOPOLOGY_PROFILE_KEEP", "50"))
+
+_PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{12}-[a-z0-9-]+$")
+# Since Python 3.12 cProfile instruments every thread of the interpreter, so captures run one at a time.
+_capturing = threading.Lock()
+
+
+class ProfileStore:
+    """cProfile captures on disk: ``<id>.prof`` (pstats) next to ``<id>.json`` (metadata)."""
+
+    def __init__(self, directory: Path = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    @staticmethod
+    def new_id(method: str, path: str) -> str:
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+        slug = re.sub(r"[^a-z0-9]+", "-", f"{method} {path.removeprefix('/api/')}".lower()).strip("-")
+        return f"{stamp}-{slug[:80]}"
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, meta: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.directory / f"{profile_id}.prof")
+        (self.directory / f"{profile_id}.json").write_text(json.dumps({"id": profile_id, **meta}))
+        self._prune()
+
+    def list(self) -> list[dict]:
+        if not self.directory.is_dir():
+            return []
+        entries = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                entries.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # pruned or half-written by another worker
+        return entries
+
+    def path(self, profile_id: str) -> Path | None:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.prof"
+        return path if path.is_file() else None
+
+    def text(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> str | None:
+        path = self.path(profile_id)
+        if path is None:
+            return None
+        import pstats  # only reports need it
+
+        stream = io.StringIO()
+        pstats.Stats(str(path), stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def _prune(self) -> None:
+        for stale in sorted(self.directory.glob("*.json"))[: -self.keep or None]:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix(".prof").unlink(missing_ok=True)
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """Run opted-in ``/api/topologies`` requests under cProfile and keep the capture.
+
+    A request opts in with the debug token (see ``debug_flag``); the response
+    carries ``X-Debug-Profile-Id`` when it was captured. Requests that arrive
+    while another capture is running are served unprofiled.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(OPT_IN_PREFIX)
+            or not debug_flag(scope, "profile")
+            or not _capturing.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._capture(scope, receive, send)
+        finally:
+            _capturing.release()
+
+    async def _capture(self, scope, receive, send):
+        profile_id = self.store.new_id(scope["method"], scope["path"])
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [*message.get("headers", []), (b"x-debug-profile-id", profile_id.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler owns the interpreter (someone is profiling the whole server).
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            timing = current_timing()
+            route = scope.get("route")
+            meta = {
+                "created_at": datetime.now(UTC).isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "endpoint": getattr(route, "path", None) or "unmatched",
+                "status": status,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "nodes": timing.nodes if timing is not None else None,
+                "edges": timing.edges if timing is not None else None,
+            }
+            await run_in_threadpool(self.store.save, profile_id, profiler, meta)
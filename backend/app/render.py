@@ -0,0 +1,232 @@
+"""Static SVG overviews of topologies, drawn from stored node positions.
+
+``write_svg`` yields the document a few elements at a time and never builds
+a tree of it. Edges are drawn as a handful of ``<path>`` elements holding
+many segments each, rather than one element per edge.
+
+Dense graphs are simplified by how much fits on screen rather than drawn in
+full:
+
+- with ``lod="groups"`` (or ``"auto"`` above ``RENDER_MAX_NODES`` nodes)
+  the collapsed level-of-detail view of ``app.hierarchy`` is drawn, with one
+  box per group and one line per pair of connected groups
+- above ``RENDER_MAX_NODES`` drawn nodes, nodes are aggregated into square
+  tiles of ``tile`` pixels, shaded by the kind most of their nodes have and
+  by how many they hold
+- above ``RENDER_MAX_EDGES`` drawn edges, edges are bundled by the pair of
+  tiles their ends fall in, one line per pair, wider the more edges it carries
+
+Nodes that were never laid out (all at one position, as generators leave
+them) are placed with the backend auto-layout first.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from collections import Counter
+from collections.abc import Iterator
+from xml.sax.saxutils import escape
+
+from .exporters import buffered
+from .hierarchy import build_lod
+from .metrics import span
+from .topology_ops import FALLBACK_NODE_HEIGHT, FALLBACK_NODE_WIDTH, apply_auto_layout
+
+RENDER_MAX_NODES = int(os.getenv("TOPOLOGY_RENDER_MAX_NODES", "2000"))
+RENDER_MAX_EDGES = int(os.getenv("TOPOLOGY_RENDER_MAX_EDGES", "5000"))
+
+# The editor's palette, so thumbnails look like the canvas.
+KIND_COLORS = {
+    "rack": "#0ea5e9",
+    "switch": "#f59e0b",
+    "server": "#10b981",
+    "asic": "#7c3aed",
+    "patch": "#0f766e",
+    "group": "#475569",
+}
+DEFAULT_COLOR = "#64748b"
+EDGE_COLOR = "#94a3b8"
+PADDING = 16
+# Segments per ``<path>`` element.
+_PATH_SEGMENTS = 512
+# Labels are drawn only when a node is at least this wide on screen.
+_LABEL_MIN_WIDTH = 48
+
+
+def _kind(node: dict) -> str:
+    return (node.get("data") or {}).get("kind") or ""
+
+
+def _weight(edge: dict) -> int | None:
+    # Edges of the collapsed view carry how many edges they stand for; a user's own ``count`` may be anything.
+    count = (edge.get("data") or {}).get("count")
+    return count if type(count) is int and count >= 1 else None
+
+
+def _box(node: dict) -> tuple[float, float, float, float]:
+    position = node.get("position") or {}
+    return (
+        float(position.get("x") or 0),
+        float(position.get("y") or 0),
+        float(node.get("width") or FALLBACK_NODE_WIDTH),
+        float(node.get("height") or FALLBACK_NODE_HEIGHT),
+    )
+
+
+def _anchor(box: tuple[float, float, float, float], handle: str | None) -> tuple[float, float]:
+    x, y, width, height = box
+    side = (handle or "").split("-", 1)[0]
+    if side == "top":
+        return x + width / 2, y
+    if side == "left":
+        return x, y + height / 2
+    if side == "right":
+        return x + width, y + height / 2
+    return x + width / 2, y + height
+
+
+def _laid_out(nodes: list[dict]) -> bool:
+    positions = {(_box(node)[0], _box(node)[1]) for node in nodes}
+    return len(positions) > 1 or len(nodes) <= 1
+
+
+def _paths(segments: Iterator[str], attributes: str) -> Iterator[str]:
+    batch: list[str] = []
+    for segment in segments:
+        batch.append(segment)
+        if len(batch) >= _PATH_SEGMENTS:
+            yield f'<path d="{"".join(batch)}"{attributes}/>\n'
+            batch = []
+    if batch:
+        yield f'<path d="{"".join(batch)}"{attributes}/>\n'
+
+
+def write_svg(
+    body: dict,
+    width: int,
+    height: int,
+    lod: str = "auto",
+    expand: set[str] | None = None,
+    tile: int = 12,
+) -> Iterator[str]:
+    """The SVG document of a topology response (``topology_to_response``), in pieces."""
+    nodes, edges = body["nodes"], body["edges"]
+    if not _laid_out(nodes):
+        nodes = apply_auto_layout(nodes, edges, body["topo_type"], body["topo_params"])
+    if lod == "groups" or (lod == "auto" and len(nodes) > RENDER_MAX_NODES):
+        view = build_lod({**body, "nodes": nodes}, expand or set())
+        nodes, edges = view["nodes"], view["edges"]
+
+    boxes = {node["id"]: _box(node) for node in nodes}
+    left = min((box[0] for box in boxes.values()), default=0.0)
+    top = min((box[1] for box in boxes.values()), default=0.0)
+    right = max((box[0] + box[2] for box in boxes.values()), default=1.0)
+    bottom = max((box[1] + box[3] for box in boxes.values()), default=1.0)
+    scale = min((width - 2 * PADDING) / max(right - left, 1.0), (height - 2 * PADDING) / max(bottom - top, 1.0))
+    # Centre the drawing in whichever dimension it does not fill.
+    offset_x = (width - (right - left) * scale) / 2 - left * scale
+    offset_y = (height - (bottom - top) * scale) / 2 - top * scale
+
+    def point(x: float, y: float) -> tuple[float, float]:
+        return x * scale + offset_x, y * scale + offset_y
+
+    def tile_of(x: float, y: float) -> tuple[int, int]:
+        return int(x // tile), int(y // tile)
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="sans-serif">\n'
+    )
+    yield f"<title>{escape(str(body.get('name', '')))}</title>\n"
+    yield f'<rect width="{width}" height="{height}" fill="#ffffff"/>\n'
+
+    stroke = max(0.3, min(1.5, scale * 2))
+    if len(edges) <= RENDER_MAX_EDGES:
+        plain = []
+        weighted = []
+        for edge in edges:
+            source, target = boxes.get(edge["source"]), boxes.get(edge["target"])
+            if source is None or target is None:
+                continue
+            x1, y1 = point(*_anchor(source, edge.get("sourceHandle")))
+            x2, y2 = point(*_anchor(target, edge.get("targetHandle")))
+            segment = f"M{x1:.1f} {y1:.1f}L{x2:.1f} {y2:.1f}"
+            count = _weight(edge)
+            (weighted if count else plain).append((segment, count))
+        yield from _paths(
+            (segment for segment, _ in plain), f' fill="none" stroke="{EDGE_COLOR}" stroke-width="{stroke:.2f}"'
+        )
+        for segment, count in weighted:
+            line_width = stroke * (1 + math.log2(count))
+            yield f'<path d="{segment}" fill="none" stroke="{EDGE_COLOR}" stroke-width="{line_width:.2f}"/>\n'
+    else:
+        bundles: Counter = Counter()
+        for edge in edges:
+            source, target = boxes.get(edge["source"]), boxes.get(edge["target"])
+            if source is None or target is None:
+                continue
+            ends = sorted(
+                (
+                    tile_of(*point(source[0] + source[2] / 2, source[1] + source[3] / 2)),
+                    tile_of(*point(target[0] + target[2] / 2, target[1] + target[3] / 2)),
+                )
+            )
+            if ends[0] != ends[1]:
+                bundles[tuple(ends)] += _weight(edge) or 1
+        # Bundles of similar weight share one path element.
+        by_width: dict[float, list[str]] = {}
+        for (start, end), count in bundles.items():
+            segment = (
+                f"M{(start[0] + 0.5) * tile:.1f} {(start[1] + 0.5) * tile:.1f}"
+                f"L{(end[0] + 0.5) * tile:.1f} {(end[1] + 0.5) * tile:.1f}"
+            )
+            by_width.setdefault(round(stroke * (1 + math.log2(count)), 1), []).append(segment)
+        for line_width, segments in sorted(by_width.items()):
+            yield from _paths(
+                iter(segments),
+                f' fill="none" stroke="{EDGE_COLOR}" stroke-opacity="0.5" stroke-width="{line_width:.1f}"',
+            )
+
+    if len(nodes) <= RENDER_MAX_NODES:
+        for node in nodes:
+            x, y, node_width, node_height = boxes[node["id"]]
+            sx, sy = point(x, y)
+            kind = _kind(node)
+            color = KIND_COLORS.get(kind, DEFAULT_COLOR)
+            dash = ' stroke-dasharray="4 2"' if kind == "group" else ""
+            yield (
+                f'<rect x="{sx:.1f}" y="{sy:.1f}" width="{node_width * scale:.1f}" height="{node_height * scale:.1f}" '
+                f'rx="{min(6.0, 6 * scale):.1f}" fill="{color}" fill-opacity="0.2" stroke="{color}"{dash}/>\n'
+            )
+            if node_width * scale >= _LABEL_MIN_WIDTH:
+                label = (node.get("data") or {}).get("label") or node["id"]
+                font = min(14.0, node_height * scale / 3)
+                yield (
+                    f'<text x="{sx + node_width * scale / 2:.1f}" y="{sy + node_height * scale / 2:.1f}" '
+                    f'font-size="{font:.1f}" text-anchor="middle" dominant-baseline="central">'
+                    f"{escape(str(label))}</text>\n"
+                )
+    else:
+        tiles: dict[tuple[int, int], Counter] = {}
+        for node in nodes:
+            x, y, node_width, node_height = boxes[node["id"]]
+            key = tile_of(*point(x + node_width / 2, y + node_height / 2))
+            tiles.setdefault(key, Counter())[_kind(node)] += 1
+        densest = max(sum(kinds.values()) for kinds in tiles.values())
+        for (column, row), kinds in tiles.items():
+            kind, _ = kinds.most_common(1)[0]
+            opacity = 0.35 + 0.65 * math.log1p(sum(kinds.values())) / math.log1p(densest)
+            yield (
+                f'<rect x="{column * tile}" y="{row * tile}" width="{tile}" height="{tile}" '
+                f'fill="{KIND_COLORS.get(kind, DEFAULT_COLOR)}" fill-opacity="{opacity:.2f}">'
+                f"<title>{escape(f'{sum(kinds.values())} nodes')}</title></rect>\n"
+            )
+    yield "</svg>\n"
+
+
+def render_svg(body: dict, width: int, height: int, lod: str, expand: set[str], tile: int) -> bytes:
+    """``write_svg`` as one UTF-8 body, for the response cache."""
+    with span("svg"):
+        return b"".join(piece.encode() for piece in buffered(write_svg(body, width, height, lod, expand, tile)))
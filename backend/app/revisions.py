@@ -0,0 +1,354 @@
+"""Revision history of topologies: periodic full snapshots with compact deltas in between.
+
+Every committed write of a ``Topology`` row records one ``TopologyRevision``
+in the same transaction, whichever code path made it. A revision is a full
+snapshot when it starts a chain (every ``REVISION_SNAPSHOT_INTERVAL``
+revisions, or when the previous state is unknown) and otherwise a delta
+from the revision before it. Reading any revision therefore decodes one
+snapshot and at most ``REVISION_SNAPSHOT_INTERVAL - 1`` deltas.
+
+Recording a revision costs time in what changed: the snapshot-or-delta
+choice compares column lengths, a delta decodes only the lists that
+changed, and entity counts come from the chunk split the write already made
+(see ``app.chunks``) or carry over from the revision before.
+
+Run ``python -m app.revisions`` to compact the history of every topology.
+Compaction also runs for one topology whenever it records a snapshot.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .bundles import edge_count, expand_edges
+from .chunks import split_graph
+from .metrics import record_graph, span
+from .models import Topology, TopologyRevision
+from .topology_ops import diff_entities, normalize_edges
+
+# Deltas chained after a snapshot before the next full snapshot; bounds the cost of reading a revision.
+REVISION_SNAPSHOT_INTERVAL = int(os.getenv("TOPOLOGY_REVISION_SNAPSHOT_INTERVAL", "20"))
+# Newest revisions that stay readable; older revisions are pruned, snapshots included.
+REVISION_KEEP = int(os.getenv("TOPOLOGY_REVISION_KEEP", "200"))
+
+_COLUMNS = ("name", "topo_type", "topo_params_json", "nodes_json", "edges_json")
+_topologies = Topology.__table__
+_revisions = TopologyRevision.__table__
+
+
+def _ids(items: list) -> list | None:
+    """Entity ids in order, or ``None`` if they cannot key a delta (missing or duplicated)."""
+    ids = [item.get("id") if isinstance(item, dict) else None for item in items]
+    if None in ids or len(set(ids)) != len(ids):
+        return None
+    return ids
+
+
+def _apply_entities(items: list[dict], part: dict) -> list[dict]:
+    deleted = set(part.get("deleted", ()))
+    updated = {item["id"]: item for item in part.get("updated", ())}
+    result = [updated.get(item["id"], item) for item in items if item["id"] not in deleted]
+    result.extend(part.get("created", ()))
+    order = part.get("order")
+    if order is not None:
+        by_id = {item["id"]: item for item in result}
+        result = [by_id[item_id] for item_id in order]
+    return result
+
+
+def _entity_delta(before: list[dict], after: list[dict]) -> dict | None:
+    """Created, updated and deleted entities by id, plus the full id order if it changed otherwise."""
+    before_ids = _ids(before)
+    after_ids = _ids(after)
+    if before_ids is None or after_ids is None:
+        return None
+    created, updated, deleted = diff_entities(before, after)
+    part: dict = {}
+    if created:
+        part["created"] = created
+    if updated:
+        part["updated"] = updated
+    if deleted:
+        part["deleted"] = deleted
+    if [item["id"] for item in _apply_entities(before, part)] != after_ids:
+        part["order"] = after_ids
+    return part
+
+
+def apply_delta(document: dict, delta: dict) -> dict:
+    """The document of the next revision, given this one and the delta between them."""
+    result = {**document}
+    for key in ("name", "topo_type", "topo_params"):
+        if key in delta:
+            result[key] = delta[key]
+    for key in ("nodes", "edges"):
+        if key in delta:
+            result[key] = _apply_entities(document[key], delta[key])
+    return result
+
+
+def _column_values(connection: Connection, target: Topology) -> tuple[dict, dict]:
+    """Column values before and after the flush of ``target``; a ``None`` before value is unknown."""
+    state = inspect(target)
+    before: dict = {}
+    after: dict = {}
+    unloaded = []
+    for column in _COLUMNS:
+        history = state.attrs[column].history
+        if history.added:
+            after[column] = history.added[0]
+            before[column] = history.deleted[0] if history.deleted else None
+        elif history.unchanged:
+            before[column] = after[column] = history.unchanged[0]
+        else:
+            unloaded.append(column)
+    if unloaded:
+        # Unloaded columns were not written by this flush, so the stored value is both before and after.
+        row = connection.execute(
+            select(*(_topologies.c[column] for column in unloaded)).where(_topologies.c.id == target.id)
+        ).one()
+        for column, value in zip(unloaded, row):
+            before[column] = after[column] = value
+    return before, after
+
+
+def _delta_payload(before: dict, after: dict) -> str | None:
+    delta: dict = {}
+    if before["name"] != after["name"]:
+        delta["name"] = after["name"]
+    if before["topo_type"] != after["topo_type"]:
+        delta["topo_type"] = after["topo_type"]
+    if before["topo_params_json"] != after["topo_params_json"]:
+        delta["topo_params"] = json.loads(after["topo_params_json"])
+    for key in ("nodes", "edges"):
+        column = f"{key}_json"
+        if before[column] == after[column]:
+            continue
+        with span("decode"):
+            part = _entity_delta(json.loads(before[column]), json.loads(after[column]))
+        if part is None:
+            return None
+        if part:
+            delta[key] = part
+    return json.dumps(delta)
+
+
+def _snapshot_payload(values: dict) -> str:
+    # The columns already hold JSON, so splice them in rather than decoding and re-encoding.
+    return (
+        f'{{"name": {json.dumps(values["name"])}, "topo_type": {json.dumps(values["topo_type"])}, '
+        f'"topo_params": {values["topo_params_json"]}, "nodes": {values["nodes_json"]}, '
+        f'"edges": {values["edges_json"]}}}'
+    )
+
+
+def _snapshot_size(values: dict) -> int:
+    """Length of ``_snapshot_payload(values)`` give or take the escaping of the name, without building it."""
+    return 80 + sum(len(values[column]) for column in _COLUMNS)
+
+
+def _entity_counts(before: dict, after: dict, latest) -> tuple[int, int]:
+    """Node and edge counts of ``after``; unchanged lists keep the counts of ``latest``, the revision before."""
+    counts = []
+    for column, stored in (("nodes_json", "node_count"), ("edges_json", "edge_count")):
+        if latest is not None and before[column] is not None and before[column] == after[column]:
+            counts.append(getattr(latest, stored))
+        else:
+            # The chunk listener split this text moments ago, so this is normally a cache hit.
+            counts.append(split_graph(after[column]).entities)
+    return counts[0], counts[1]
+
+
+def _remember_version(_mapper, _connection: Connection, target: Topology) -> None:
+    # The version column's history is reset by the time after_update runs.
+    history = inspect(target).attrs.version.history
+    if history.deleted:
+        inspect(target).info["previous_version"] = history.deleted[0]
+
+
+def _record_revision(_mapper, connection: Connection, target: Topology) -> None:
+    with span("revision"):
+        before, after = _column_values(connection, target)
+        previous_version = inspect(target).info.pop("previous_version", None)
+        latest = connection.execute(
+            select(_revisions.c.revision, _revisions.c.chain, _revisions.c.node_count, _revisions.c.edge_count)
+            .where(_revisions.c.topology_id == target.id)
+            .order_by(_revisions.c.revision.desc())
+            .limit(1)
+        ).first()
+        if latest is not None and latest.revision != previous_version:
+            latest = None
+
+        payload = None
+        chain = 0
+        if latest is not None and latest.chain + 1 < REVISION_SNAPSHOT_INTERVAL and None not in before.values():
+            payload = _delta_payload(before, after)
+            chain = latest.chain + 1
+        kind = "delta"
+        # A delta about as large as the document saves nothing and only lengthens the chain.
+        if payload is None or len(payload) * 2 >= _snapshot_size(after):
+            kind, chain, payload = "snapshot", 0, _snapshot_payload(after)
+        node_total, edge_total = _entity_counts(before, after, latest)
+
+        revision = target.version or 1
+        connection.execute(
+            insert(_revisions).values(
+                topology_id=target.id,
+                revision=revision,
+                kind=kind,
+                chain=chain,
+                payload_json=payload,
+                node_count=node_total,
+                edge_count=edge_total,
+                created_at=target.updated_at,
+            )
+        )
+        if kind == "snapshot":
+            _compact(connection, target.id, revision)
+
+
+def _delete_revisions(_mapper, connection: Connection, target: Topology) -> None:
+    connection.execute(delete(_revisions).where(_revisions.c.topology_id == target.id))
+
+
+def _compact(connection: Connection, topology_id: int, latest_revision: int, keep: int = REVISION_KEEP) -> int:
+    """Drop revisions older than the newest ``keep``, except the snapshot the oldest kept one needs."""
+    cutoff = connection.execute(
+        select(func.max(_revisions.c.revision)).where(
+            _revisions.c.topology_id == topology_id,
+            _revisions.c.kind == "snapshot",
+            _revisions.c.revision <= latest_revision - keep + 1,
+        )
+    ).scalar()
+    if cutoff is None:
+        return 0
+    result = connection.execute(
+        delete(_revisions).where(_revisions.c.topology_id == topology_id, _revisions.c.revision < cutoff)
+    )
+    return result.rowcount
+
+
+def track_revisions() -> None:
+    """Record a revision for every insert and update of a topology, and drop them with it."""
+    if event.contains(Topology, "after_update", _record_revision):
+        return
+    event.listen(Topology, "after_insert", _record_revision)
+    event.listen(Topology, "before_update", _remember_version)
+    event.listen(Topology, "after_update", _record_revision)
+    event.listen(Topology, "after_delete", _delete_revisions)
+
+
+def compact_revisions(db: Session, keep: int = REVISION_KEEP) -> int:
+    """Compact the history of every topology; returns the number of revisions removed."""
+    connection = db.connection()
+    latest = connection.execute(
+        select(_revisions.c.topology_id, func.max(_revisions.c.revision)).group_by(_revisions.c.topology_id)
+    ).all()
+    removed = sum(_compact(connection, topology_id, revision, keep) for topology_id, revision in latest)
+    db.commit()
+    return removed
+
+
+async def list_revisions_async(db: AsyncSession, topology_id: int, limit: int, before: int | None = None) -> list[dict]:
+    statement = (
+        select(
+            TopologyRevision.revision,
+            TopologyRevision.kind,
+            TopologyRevision.created_at,
+            TopologyRevision.node_count,
+            TopologyRevision.edge_count,
+            func.length(TopologyRevision.payload_json),
+        )
+        .where(TopologyRevision.topology_id == topology_id)
+        .order_by(TopologyRevision.revision.desc())
+        .limit(limit)
+    )
+    if before is not None:
+        statement = statement.where(TopologyRevision.revision < before)
+    return [
+        {"revision": revision, "kind": kind, "created_at": created_at, "nodes": nodes, "edges": edges, "bytes": size}
+        for revision, kind, created_at, nodes, edges, size in (await db.execute(statement)).all()
+    ]
+
+
+async def load_revision_chain_async(db: AsyncSession, topology_id: int, revision: int) -> list[TopologyRevision]:
+    """The latest snapshot at or before ``revision`` followed by the deltas up to ``revision``."""
+    start = (
+        select(func.max(TopologyRevision.revision))
+        .where(
+            TopologyRevision.topology_id == topology_id,
+            TopologyRevision.kind == "snapshot",
+            TopologyRevision.revision <= revision,
+        )
+        .scalar_subquery()
+    )
+    statement = (
+        select(TopologyRevision)
+        .where(
+            TopologyRevision.topology_id == topology_id,
+            TopologyRevision.revision >= start,
+            TopologyRevision.revision <= revision,
+        )
+        .order_by(TopologyRevision.revision.asc())
+    )
+    return list((await db.scalars(statement)).all())
+
+
+async def load_revisions_since_async(db: AsyncSession, topology_id: int, after: int, revision: int) -> list[tuple]:
+    """``(revision, kind, payload_json)`` of the revisions after ``after`` up to ``revision``, oldest first."""
+    statement = (
+        select(TopologyRevision.revision, TopologyRevision.kind, TopologyRevision.payload_json)
+        .where(
+            TopologyRevision.topology_id == topology_id,
+            TopologyRevision.revision > after,
+            TopologyRevision.revision <= revision,
+        )
+        .order_by(TopologyRevision.revision.asc())
+    )
+    return [tuple(row) for row in (await db.execute(statement)).all()]
+
+
+def chain_reaches(chain: list[TopologyRevision], revision: int) -> bool:
+    """Whether ``chain`` is an unbroken snapshot-plus-deltas run ending at ``revision``."""
+    if not chain or chain[0].kind != "snapshot" or chain[-1].revision != revision:
+        return False
+    return all(row.kind == "delta" and row.chain == index for index, row in enumerate(chain[1:], start=1))
+
+
+def revision_to_response(topology_id: int, chain: list[TopologyRevision], bundled: bool = False) -> dict:
+    """The topology as it was at the last revision of ``chain``, in the shape of ``topology_to_response``."""
+    with span("decode"):
+        document = json.loads(chain[0].payload_json)
+        for row in chain[1:]:
+            document = apply_delta(document, json.loads(row.payload_json))
+        edges = document["edges"] if bundled else expand_edges(document["edges"])
+    record_graph(len(document["nodes"]), edge_count(edges))
+    return {
+        "id": topology_id,
+        "name": document["name"],
+        "topo_type": document["topo_type"],
+        "topo_params": document["topo_params"],
+        "nodes": document["nodes"],
+        "edges": normalize_edges(edges),
+        "updated_at": chain[-1].created_at,
+        "version": chain[-1].revision,
+    }
+
+
+def main() -> None:
+    from .db import SessionLocal, engine
+    from .migrations import migrate
+
+    migrate(engine)
+    with SessionLocal() as session:
+        print(f"removed {compact_revisions(session)} revisions")
+
+
+if __name__ == "__main__":
+    main()
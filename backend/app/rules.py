@@ -0,0 +1,510 @@
+"""Topology rules, re-checked incrementally as the graph changes.
+
+A rule checks one subject: the topology as a whole, one node, one edge, or
+one pair of connected nodes. Besides its subject a rule declares what else it
+reads:
+
+- ``topology``: the topology type and parameters
+- ``edges``: for a node, the edges attached to it; for a pair, the edges between the two nodes
+- ``endpoints``: for an edge, its source and target nodes
+
+A change then only dirties the subjects of the rules that read what changed.
+Moving a node re-checks that node and its own edges, and adding a link
+re-checks that link, its two endpoints and their pair. Changing the
+parameters re-checks every subject, but only of the rules that read them.
+
+``RuleEngine`` keeps, per topology, the graph indexes and the current
+violations at one version. It catches up from the stored revisions (see
+``app.revisions``), so whatever code path or worker made a write, the
+engine applies the same delta. It decodes a full document only when it
+holds no state for the topology yet, or when the revisions in between are
+gone.
+
+A state is advanced in place under its lock, so catching up costs time in
+the change, not the graph. Readers take a ``RuleReport`` under the same lock
+and never see a state between two versions. A state whose catch-up fails
+part-way is marked broken and dropped, and the next check starts over from
+the document.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+
+from .bundles import bundle_members, is_bundle
+from .metrics import span
+from .topology_ops import clamp_patch_split
+
+# Topologies whose rule state stays in memory; the least recently checked one is dropped first.
+MAX_TRACKED_TOPOLOGIES = int(os.getenv("TOPOLOGY_RULE_CACHE", "16"))
+
+SEVERITY_ORDER = {"error": 0, "warning": 1}
+
+# Tiered fabrics, where every link joins two adjacent tiers.
+TIERED_TYPES = {"leaf-spine", "fat-tree", "three-tier", "expanded-clos", "core-and-pod"}
+
+# Lower bounds of the count parameters, as the generators clamp them; fat-tree ``k`` has a rule of its own.
+PARAM_MINIMUMS = {
+    "leaf-spine": {"spines": 1, "leaves": 1},
+    "three-tier": {"core": 1, "aggregation": 1, "access": 1},
+    "expanded-clos": {"tiers": 2, "nodes_per_tier": 1},
+    "core-and-pod": {"cores": 1, "pods": 1, "pod_leaves": 1, "pod_aggs": 1},
+    "torus-2d": {"rows": 2, "cols": 2},
+    "torus-3d": {"x": 2, "y": 2, "z": 2},
+    "dragonfly": {"groups": 2, "routers_per_group": 2},
+    "butterfly": {"stages": 2, "width": 2},
+    "mesh": {"rows": 2, "cols": 2},
+    "ring": {"count": 3},
+    "star": {"count": 3},
+}
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    scope: str
+    severity: str
+    reads: frozenset
+    description: str
+    check: Callable
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "scope": self.scope,
+            "severity": self.severity,
+            "reads": sorted(self.reads),
+            "description": self.description,
+        }
+
+
+RULES: list[Rule] = []
+
+
+def rule(rule_id: str, scope: str, severity: str = "error", reads: Iterable[str] = ()):
+    """Register ``check(graph, subject)``, which returns a message for a violation or ``None``."""
+
+    def register(check: Callable) -> Callable:
+        description = (check.__doc__ or "").strip()
+        RULES.append(Rule(rule_id, scope, severity, frozenset(reads), description, check))
+        return check
+
+    return register
+
+
+def pair_of(edge: dict) -> tuple[str, str]:
+    source, target = edge["source"], edge["target"]
+    return (source, target) if source <= target else (target, source)
+
+
+class Changes:
+    """What a batch of revisions touched, as rule dependencies see it."""
+
+    def __init__(self):
+        self.topology = False
+        self.nodes: set[str] = set()
+        self.edges: set[str] = set()
+        # Endpoints of added or removed edges, whose attached edges changed.
+        self.edge_nodes: set[str] = set()
+        self.pairs: set[tuple[str, str]] = set()
+
+    def edge(self, edge: dict) -> None:
+        self.edges.add(edge["id"])
+        self.edge_nodes.update((edge["source"], edge["target"]))
+        self.pairs.add(pair_of(edge))
+
+
+class RuleGraph:
+    """Nodes and expanded edges of one topology, indexed the way rules look them up."""
+
+    def __init__(self, topo_type: str, params: dict):
+        self.topo_type = topo_type
+        self.params = params
+        self.nodes: dict[str, dict] = {}
+        self.edges: dict[str, dict] = {}
+        # Stored edge records with bundles folded, as revisions name them.
+        self.records: dict[str, dict] = {}
+        self.incident: dict[str, set[str]] = {}
+        self.pairs: dict[tuple[str, str], set[str]] = {}
+
+    def degree(self, node_id: str) -> int:
+        return len(self.incident.get(node_id, ()))
+
+    def endpoints(self, edge: dict) -> tuple[dict, dict]:
+        return self.nodes.get(edge["source"]) or {}, self.nodes.get(edge["target"]) or {}
+
+    def set_node(self, node: dict, changes: Changes) -> None:
+        self.nodes[node["id"]] = node
+        changes.nodes.add(node["id"])
+
+    def remove_node(self, node_id: str, changes: Changes) -> None:
+        if self.nodes.pop(node_id, None) is not None:
+            changes.nodes.add(node_id)
+
+    def _add_edge(self, edge: dict, changes: Changes) -> None:
+        self.edges[edge["id"]] = edge
+        self.incident.setdefault(edge["source"], set()).add(edge["id"])
+        self.incident.setdefault(edge["target"], set()).add(edge["id"])
+        self.pairs.setdefault(pair_of(edge), set()).add(edge["id"])
+        changes.edge(edge)
+
+    def _remove_edge(self, edge_id: str, changes: Changes) -> None:
+        edge = self.edges.pop(edge_id, None)
+        if edge is None:
+            return
+        for node_id in (edge["source"], edge["target"]):
+            attached = self.incident.get(node_id)
+            if attached is not None:
+                attached.discard(edge_id)
+                if not attached:
+                    del self.incident[node_id]
+        pair = pair_of(edge)
+        self.pairs[pair].discard(edge_id)
+        if not self.pairs[pair]:
+            del self.pairs[pair]
+        changes.edge(edge)
+
+    def set_record(self, record: dict, changes: Changes) -> None:
+        """Add or replace a stored edge record; only the members that differ count as changed."""
+        old = self.records.get(record["id"])
+        before = {edge["id"]: edge for edge in _members(old)} if old is not None else {}
+        self.records[record["id"]] = record
+        after = _members(record)
+        kept = {edge["id"] for edge in after}
+        for edge_id in before.keys() - kept:
+            self._remove_edge(edge_id, changes)
+        for edge in after:
+            previous = before.get(edge["id"])
+            if previous is None or previous != edge:
+                if previous is not None:
+                    self._remove_edge(edge["id"], changes)
+                self._add_edge(edge, changes)
+
+    def remove_record(self, record_id: str, changes: Changes) -> None:
+        record = self.records.pop(record_id, None)
+        if record is not None:
+            for edge in _members(record):
+                self._remove_edge(edge["id"], changes)
+
+    def set_topology(self, topo_type: str, params: dict, changes: Changes) -> None:
+        if topo_type != self.topo_type or params != self.params:
+            self.topo_type, self.params = topo_type, params
+            changes.topology = True
+
+    def apply_delta(self, delta: dict, changes: Changes) -> None:
+        """Apply one delta revision (``app.revisions.apply_delta`` format)."""
+        if "topo_type" in delta or "topo_params" in delta:
+            self.set_topology(delta.get("topo_type", self.topo_type), delta.get("topo_params", self.params), changes)
+        nodes = delta.get("nodes", {})
+        for node_id in nodes.get("deleted", ()):
+            self.remove_node(node_id, changes)
+        for node in (*nodes.get("updated", ()), *nodes.get("created", ())):
+            self.set_node(node, changes)
+        edges = delta.get("edges", {})
+        for record_id in edges.get("deleted", ()):
+            self.remove_record(record_id, changes)
+        for record in (*edges.get("updated", ()), *edges.get("created", ())):
+            self.set_record(record, changes)
+
+    def apply_snapshot(self, document: dict, changes: Changes) -> None:
+        """Bring the graph to a full document, touching only what differs from it."""
+        self.set_topology(document["topo_type"], document["topo_params"], changes)
+        nodes = {node["id"]: node for node in document["nodes"]}
+        for node_id in self.nodes.keys() - nodes.keys():
+            self.remove_node(node_id, changes)
+        for node_id, node in nodes.items():
+            if self.nodes.get(node_id) != node:
+                self.set_node(node, changes)
+        records = {record["id"]: record for record in document["edges"]}
+        for record_id in self.records.keys() - records.keys():
+            self.remove_record(record_id, changes)
+        for record_id, record in records.items():
+            if self.records.get(record_id) != record:
+                self.set_record(record, changes)
+
+
+def _members(record: dict) -> list[dict]:
+    return bundle_members(record) if is_bundle(record) else [record]
+
+
+@dataclass
+class RuleState:
+    """Violations of one topology at ``version``, by rule id and subject."""
+
+    version: int
+    graph: RuleGraph
+    results: dict[str, dict] = field(default_factory=dict)
+    # Rule checks run by the last full evaluation or catch-up.
+    checked: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    # Set when a catch-up failed part-way; the graph no longer matches ``version``.
+    broken: bool = False
+    _violations: list[dict] | None = field(default=None, repr=False)
+
+    def report(self) -> RuleReport:
+        """The current version, check count and violations, read together."""
+        with self.lock:
+            return RuleReport(self.version, self.checked, self.violations())
+
+    def violations(self) -> list[dict]:
+        """All violations, errors first, then in rule and subject order."""
+        if self._violations is None:
+            ordered = []
+            for item in RULES:
+                found = self.results.get(item.id, {})
+                ordered.extend(found[subject] for subject in sorted(found, key=str))
+            self._violations = sorted(ordered, key=lambda violation: SEVERITY_ORDER[violation["severity"]])
+        return self._violations
+
+
+@dataclass(frozen=True)
+class RuleReport:
+    """Violations of one topology at ``version``, as one consistent reading of a ``RuleState``."""
+
+    version: int
+    checked: int
+    violations: list[dict]
+
+    @property
+    def errors(self) -> int:
+        return sum(violation["severity"] == "error" for violation in self.violations)
+
+
+def _subjects(graph: RuleGraph, scope: str) -> Iterable:
+    if scope == "node":
+        return graph.nodes.keys()
+    if scope == "edge":
+        return graph.edges.keys()
+    if scope == "pair":
+        return graph.pairs.keys()
+    return (None,)
+
+
+def _dirty(item: Rule, graph: RuleGraph, changes: Changes, found: dict) -> Iterable:
+    """The subjects of ``item`` that ``changes`` may have affected; ``found`` holds its current violations."""
+    if changes.topology and "topology" in item.reads:
+        # Subjects removed in the same batch still hold results that need dropping.
+        return {*_subjects(graph, item.scope), *found}
+    dirty: set = set()
+    if item.scope == "node":
+        dirty |= changes.nodes
+        if "edges" in item.reads:
+            dirty |= changes.edge_nodes
+    elif item.scope == "edge":
+        dirty |= changes.edges
+        if "endpoints" in item.reads:
+            for node_id in changes.nodes:
+                dirty |= graph.incident.get(node_id, set())
+    elif item.scope == "pair":
+        dirty |= changes.pairs
+    return dirty
+
+
+def _exists(graph: RuleGraph, scope: str, subject) -> bool:
+    if scope == "node":
+        return subject in graph.nodes
+    if scope == "edge":
+        return subject in graph.edges
+    if scope == "pair":
+        return subject in graph.pairs
+    return True
+
+
+def _violation(item: Rule, graph: RuleGraph, subject, message: str) -> dict:
+    if item.scope == "node":
+        nodes, edges = [subject], []
+    elif item.scope == "edge":
+        edge = graph.edges[subject]
+        nodes, edges = [edge["source"], edge["target"]], [subject]
+    elif item.scope == "pair":
+        nodes, edges = list(subject), sorted(graph.pairs[subject])
+    else:
+        nodes, edges = [], []
+    return {"rule": item.id, "severity": item.severity, "message": message, "nodes": nodes, "edges": edges}
+
+
+def check_rules(state: RuleState, changes: Changes | None = None) -> None:
+    """Re-check the subjects ``changes`` dirtied, or every subject without ``changes``."""
+    graph = state.graph
+    checked = 0
+    with span("rules"):
+        for item in RULES:
+            found = state.results.setdefault(item.id, {})
+            subjects = _subjects(graph, item.scope) if changes is None else _dirty(item, graph, changes, found)
+            for subject in subjects:
+                message = item.check(graph, subject) if _exists(graph, item.scope, subject) else None
+                checked += 1
+                if message is None:
+                    found.pop(subject, None)
+                else:
+                    found[subject] = _violation(item, graph, subject, message)
+    state.checked = checked
+    state._violations = None
+
+
+class RuleEngine:
+    """Rule state of the most recently checked topologies, advanced from revision to revision."""
+
+    def __init__(self, capacity: int = MAX_TRACKED_TOPOLOGIES):
+        self.capacity = capacity
+        self._states: OrderedDict[int, RuleState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, topology_id: int) -> RuleState | None:
+        with self._lock:
+            state = self._states.get(topology_id)
+            if state is not None:
+                self._states.move_to_end(topology_id)
+            return state
+
+    def discard(self, topology_id: int) -> None:
+        with self._lock:
+            self._states.pop(topology_id, None)
+
+    def _drop(self, topology_id: int, state: RuleState) -> None:
+        with self._lock:
+            if self._states.get(topology_id) is state:
+                del self._states[topology_id]
+
+    def _keep(self, topology_id: int, state: RuleState) -> RuleState:
+        with self._lock:
+            current = self._states.get(topology_id)
+            if current is None or current.broken or current.version < state.version:
+                self._states[topology_id] = current = state
+            self._states.move_to_end(topology_id)
+            while len(self._states) > self.capacity:
+                self._states.popitem(last=False)
+            return current
+
+    def evaluate(self, topology_id: int, version: int, document: dict) -> RuleState:
+        """Check every rule against a full stored document (``edges`` as stored, bundles folded)."""
+        graph = RuleGraph(document["topo_type"], document["topo_params"])
+        graph.apply_snapshot(document, Changes())
+        state = RuleState(version, graph)
+        check_rules(state)
+        return self._keep(topology_id, state)
+
+    def advance(self, topology_id: int, state: RuleState, revisions: list) -> RuleState | None:
+        """Apply ``(revision, kind, payload_json)`` rows after ``state.version`` and re-check what they touched.
+
+        Returns ``None`` when the rows do not continue ``state`` without a gap, or
+        when ``state`` is broken.
+        """
+        with state.lock:
+            if state.broken:
+                return None
+            pending = [row for row in revisions if row[0] > state.version]
+            if not pending:
+                return state
+            if [row[0] for row in pending] != list(range(state.version + 1, state.version + 1 + len(pending))):
+                return None
+            changes = Changes()
+            try:
+                with span("decode"):
+                    for _revision, kind, payload_json in pending:
+                        payload = json.loads(payload_json)
+                        if kind == "snapshot":
+                            state.graph.apply_snapshot(payload, changes)
+                        else:
+                            state.graph.apply_delta(payload, changes)
+                check_rules(state, changes)
+            except BaseException:
+                state.broken = True
+                self._drop(topology_id, state)
+                raise
+            state.version = pending[-1][0]
+        return self._keep(topology_id, state)
+
+
+@rule("fat-tree-k", "topology", reads={"topology"})
+def _fat_tree_k(graph: RuleGraph, _subject) -> str | None:
+    """A fat-tree's k is an even integer of at least 2."""
+    if graph.topo_type != "fat-tree":
+        return None
+    k = graph.params.get("k")
+    if type(k) is not int or k < 2 or k % 2:
+        return f"fat-tree k must be an even integer >= 2, got {k!r}"
+    return None
+
+
+@rule("param-bounds", "topology", reads={"topology"})
+def _param_bounds(graph: RuleGraph, _subject) -> str | None:
+    """Count parameters of generated topologies are integers no smaller than the generator allows."""
+    problems = []
+    for name, minimum in PARAM_MINIMUMS.get(graph.topo_type, {}).items():
+        value = graph.params.get(name)
+        if value is not None and (type(value) is not int or value < minimum):
+            problems.append(f"{name} must be an integer >= {minimum}, got {value!r}")
+    return "; ".join(problems) or None
+
+
+@rule("switch-radix", "node", reads={"topology", "edges"})
+def _switch_radix(graph: RuleGraph, node_id: str) -> str | None:
+    """In a fat-tree no switch has more than k links."""
+    k = graph.params.get("k")
+    if graph.topo_type != "fat-tree" or type(k) is not int:
+        return None
+    if (graph.nodes[node_id].get("data") or {}).get("kind") != "switch":
+        return None
+    degree = graph.degree(node_id)
+    return f"switch has {degree} links, more than the fat-tree radix k={k}" if degree > k else None
+
+
+@rule("patch-ports", "node", reads={"edges"})
+def _patch_ports(graph: RuleGraph, node_id: str) -> str | None:
+    """A patch panel has no more links than ports."""
+    data = graph.nodes[node_id].get("data") or {}
+    if data.get("kind") != "patch":
+        return None
+    size = clamp_patch_split(data.get("splitCount"))
+    degree = graph.degree(node_id)
+    return f"patch panel has {degree} links but only {size} ports" if degree > size else None
+
+
+@rule("isolated-node", "node", severity="warning", reads={"edges"})
+def _isolated_node(graph: RuleGraph, node_id: str) -> str | None:
+    """Every node other than a rack has at least one link."""
+    if graph.degree(node_id) or (graph.nodes[node_id].get("data") or {}).get("kind") == "rack":
+        return None
+    return "node has no links"
+
+
+@rule("self-loop", "edge")
+def _self_loop(graph: RuleGraph, edge_id: str) -> str | None:
+    """A link joins two different nodes."""
+    edge = graph.edges[edge_id]
+    return f"link connects {edge['source']} to itself" if edge["source"] == edge["target"] else None
+
+
+@rule("tier-order", "edge", reads={"topology", "endpoints"})
+def _tier_order(graph: RuleGraph, edge_id: str) -> str | None:
+    """In tiered fabrics a link joins two adjacent tiers."""
+    if graph.topo_type not in TIERED_TYPES:
+        return None
+    source, target = graph.endpoints(graph.edges[edge_id])
+    source_tier = (source.get("data") or {}).get("tier")
+    target_tier = (target.get("data") or {}).get("tier")
+    if type(source_tier) is not int or type(target_tier) is not int or abs(source_tier - target_tier) == 1:
+        return None
+    return f"link joins tier {source_tier} to tier {target_tier}; {graph.topo_type} links join adjacent tiers"
+
+
+@rule("server-link", "edge", reads={"endpoints"})
+def _server_link(graph: RuleGraph, edge_id: str) -> str | None:
+    """Servers connect through a switch or patch panel, not directly to each other."""
+    source, target = graph.endpoints(graph.edges[edge_id])
+    if (source.get("data") or {}).get("kind") == "server" == (target.get("data") or {}).get("kind"):
+        return "link connects two servers directly"
+    return None
+
+
+@rule("parallel-links", "pair", severity="warning", reads={"edges"})
+def _parallel_links(graph: RuleGraph, pair: tuple[str, str]) -> str | None:
+    """Two nodes are joined by at most one link."""
+    count = len(graph.pairs[pair])
+    return f"{count} links between {pair[0]} and {pair[1]}" if count > 1 else None
@@ -1,7 +1,9 @@
 from datetime import datetime
 from typing import Any, Literal
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from .validation import check_graph, check_handles
 
 
 class TopologyBase(BaseModel):
@@ -13,16 +15,21 @@ class TopologyBase(BaseModel):
 
 
 class TopologyPayload(TopologyBase):
-    pass
+    @model_validator(mode="after")
+    def _check_graph(self):
+        # One pass over the whole lists instead of a model per node and edge.
+        check_graph(type(self).__name__, self.nodes, self.edges)
+        return self
 
 
-class TopologyCreate(TopologyBase):
+class TopologyCreate(TopologyPayload):
     name: str = Field(default="Untitled")
 
 
 class TopologyResponse(TopologyBase):
     id: int
     updated_at: datetime
+    version: int
 
 
 class TopologySummary(BaseModel):
@@ -31,6 +38,39 @@ class TopologySummary(BaseModel):
     updated_at: datetime
 
 
+class LodGroup(BaseModel):
+    id: str
+    label: str
+    parent: str | None
+    nodes: int
+    edges: int
+    expanded: bool
+
+
+class LodResponse(BaseModel):
+    id: int
+    name: str
+    topo_type: str
+    version: int
+    updated_at: datetime
+    groups: list[LodGroup]
+    nodes: list[Any]
+    edges: list[Any]
+
+
+class ForkRequest(BaseModel):
+    name: str | None = Field(default=None, max_length=200)
+
+
+class RevisionSummary(BaseModel):
+    revision: int
+    kind: Literal["snapshot", "delta"]
+    created_at: datetime
+    nodes: int
+    edges: int
+    bytes: int
+
+
 class Position(BaseModel):
     x: float = 0
     y: float = 0
@@ -58,19 +98,21 @@ class NodeModel(BaseModel):
 class NodeCreate(BaseModel):
     kind: Literal["rack", "switch", "server", "asic", "patch"] = "rack"
     label: str | None = None
-    tier: int | None = None
+    tier: int | None = Field(default=None, ge=1)
     splitCount: int | None = None
     position: Position | None = None
     layout: Literal["tree", "grid"] | None = None
+    group: str | None = None
     id: str | None = None
 
 
 class NodeUpdate(BaseModel):
     label: str | None = None
     kind: Literal["rack", "switch", "server", "asic", "patch"] | None = None
-    tier: int | None = None
+    tier: int | None = Field(default=None, ge=1)
     splitCount: int | None = None
     layout: Literal["tree", "grid"] | None = None
+    group: str | None = None
     position: Position | None = None
 
 
@@ -93,19 +135,117 @@ class EdgeModel(BaseModel):
     targetHandle: str | None = None
 
 
+# A patch panel port number, or "auto" for the lowest free port.
+PortRef = int | Literal["auto"]
+
+
 class EdgeCreate(BaseModel):
     source: str
     target: str
     label: str | None = "link"
     sourceHandle: str | None = None
     targetHandle: str | None = None
+    sourcePort: PortRef | None = None
+    targetPort: PortRef | None = None
     id: str | None = None
 
+    @model_validator(mode="after")
+    def _check_handles(self):
+        check_handles(type(self).__name__, {"sourceHandle": self.sourceHandle, "targetHandle": self.targetHandle})
+        return self
+
 
 class EdgeUpdate(BaseModel):
     label: str | None = None
     sourceHandle: str | None = None
     targetHandle: str | None = None
+    sourcePort: PortRef | None = None
+    targetPort: PortRef | None = None
+
+    @model_validator(mode="after")
+    def _check_handles(self):
+        check_handles(type(self).__name__, {"sourceHandle": self.sourceHandle, "targetHandle": self.targetHandle})
+        return self
+
+
+class PortAllocateRequest(BaseModel):
+    count: int = Field(default=1, ge=1, le=1024)
+    ports: list[int] | None = None
+
+
+class PortFreeRequest(BaseModel):
+    ports: list[int]
+
+
+class PortState(BaseModel):
+    port: int
+    used: bool
+    edge: str | None = None
+
+
+class PortsResponse(BaseModel):
+    node: str
+    version: int
+    size: int
+    used: int
+    free: int
+    next_free: int | None
+    ranges: list[list[int]]
+    ports: list[PortState] = Field(default_factory=list)
+    changed: list[int] = Field(default_factory=list)
+
+
+class DiffSide(BaseModel):
+    id: int
+    version: int
+
+
+class NodeMove(BaseModel):
+    id: str
+    before: dict | None
+    after: dict | None
+
+
+class EntityChange(BaseModel):
+    id: str
+    fields: list[str]
+    before: dict
+    after: dict
+
+
+class EntityDiff(BaseModel):
+    added: list[Any]
+    removed: list[Any]
+    modified: list[EntityChange]
+    # Nodes only: changes to nothing but ``position``.
+    moved: list[NodeMove] | None = None
+
+
+class TopologyDiffResponse(BaseModel):
+    a: DiffSide
+    b: DiffSide
+    summary: dict
+    topology: dict
+    nodes: EntityDiff
+    edges: EntityDiff
+
+
+class RuleViolation(BaseModel):
+    rule: str
+    severity: Literal["error", "warning"]
+    message: str
+    nodes: list[str] = Field(default_factory=list)
+    edges: list[str] = Field(default_factory=list)
+
+
+class ViolationsResponse(BaseModel):
+    id: int
+    version: int
+    errors: int
+    warnings: int
+    # Rule checks the engine ran to reach this version from the state it held.
+    checked: int
+    violations: list[RuleViolation]
 
 
 class GenerateTopologyRequest(BaseModel):
@@ -114,6 +254,42 @@ class GenerateTopologyRequest(BaseModel):
     name: str | None = None
 
 
+class SweepRequest(BaseModel):
+    topo_type: str
+    ranges: dict = Field(default_factory=dict)
+    params: dict = Field(default_factory=dict)
+    exact: bool = False
+
+
+class SweepResponse(BaseModel):
+    topo_type: str
+    columns: list[str]
+    rows: list[list[Any]]
+
+
+class ImportRowErrorModel(BaseModel):
+    row: int
+    error: str
+
+
+class ImportProgress(BaseModel):
+    rows: int
+    nodes: int
+    edges: int
+    errors: int
+
+
+class ImportReport(BaseModel):
+    id: int
+    rows: int
+    nodes_added: int
+    edges_added: int
+    error_count: int
+    errors: list[ImportRowErrorModel]
+    progress: list[ImportProgress]
+    updated_at: datetime
+
+
 class LayoutRequest(BaseModel):
     end_gap: bool = False
 
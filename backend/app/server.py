@@ -0,0 +1,34 @@
+"""Production entry point: ``python -m app.server``.
+
+Runs uvicorn without reload and with several worker processes sharing the
+SQLite database in WAL mode. Configure with ``HOST``, ``PORT``,
+``WEB_CONCURRENCY`` (workers, default: CPU count) and ``LOG_LEVEL``.
+"""
+
+import os
+
+import uvicorn
+
+from .db import engine
+from .migrations import migrate
+
+
+def main() -> None:
+    workers = int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+    # Workers inherit the environment; modules read WEB_CONCURRENCY to pick multi-process defaults.
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    # Migrate once here instead of racing the same ALTERs in every worker.
+    migrate(engine)
+    os.environ["TOPOLOGY_MIGRATE_ON_STARTUP"] = "0"
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=workers,
+        proxy_headers=True,
+        log_level=os.getenv("LOG_LEVEL", "info"),
+    )
+
+
+if __name__ == "__main__":
+    main()
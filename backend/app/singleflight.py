@@ -0,0 +1,75 @@
+"""Single-flight execution of identical concurrent work.
+
+A topology open in several tabs, or an agent fanning out, sends the same
+expensive request several times at once. Keys name the work completely
+(kind, topology id, version and parameters). While a call for a key is
+running, later callers with that key wait for it and share its result or
+exception instead of repeating it. Nothing is kept after the call finishes;
+caching results across time is the response cache's job.
+
+``run`` is for blocking callers on the threadpool, ``run_async`` for
+coroutines on the event loop. The first element of a key is its kind, which
+labels the ``topology_singleflight_*`` metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from typing import TypeVar
+
+from .metrics import MetricsRegistry, registry, span
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    def __init__(self, metrics: MetricsRegistry = registry):
+        self.metrics = metrics
+        self._calls: dict[tuple, Future] = {}
+        self._tasks: dict[tuple, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: tuple, fn: Callable[[], T]) -> T:
+        """Call ``fn``, unless another thread is already running it for ``key``; then wait for that call."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        self.metrics.count_flight(key[0], coalesced=not leader)
+        if not leader:
+            with span("coalesced"):
+                return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def run_async(self, key: tuple, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await ``fn()``, or the call already running for ``key``.
+
+        The call runs as its own task, so a caller that disconnects does not
+        cancel the work for the others. It can outlive the request that
+        started it, so ``fn`` must open its own database session rather than
+        use that request's.
+        """
+        task = self._tasks.get(key)
+        coalesced = task is not None
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._tasks.pop(key) if self._tasks.get(key) is done else None)
+        self.metrics.count_flight(key[0], coalesced=coalesced)
+        if coalesced:
+            with span("coalesced"):
+                return await asyncio.shield(task)
+        return await asyncio.shield(task)
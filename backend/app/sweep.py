@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from math import isqrt
+
+from .topology_generators import generate_by_type
+
+MAX_SWEEP_COMBINATIONS = 20000
+# Exact rows each generate a graph, so ``POST /api/sweep`` takes far fewer of them; larger runs use the CLI.
+MAX_EXACT_SWEEP_COMBINATIONS = 256
+MAX_BFS_NODES = 4096
+SWEEP_COLUMNS = ["nodes", "edges", "diameter", "method", "error"]
+# Types whose closed form covers counts only; the diameter needs a generated graph.
+BFS_DIAMETER_TYPES = {"dragonfly"}
+
+# Numeric generator inputs that can be swept, in the order the generators take them.
+SWEEP_PARAMS = {
+    "leaf-spine": {"spines": 2, "leaves": 4},
+    "fat-tree": {"k": 4},
+    "three-tier": {"core": 2, "aggregation": 4, "access": 6},
+    "expanded-clos": {"tiers": 4, "nodes_per_tier": 4},
+    "core-and-pod": {"cores": 2, "pods": 2, "pod_leaves": 4, "pod_aggs": 2},
+    "torus-2d": {"rows": 3, "cols": 3},
+    "torus-3d": {"x": 3, "y": 3, "z": 3},
+    "dragonfly": {"groups": 3, "routers_per_group": 4},
+    "butterfly": {"stages": 4, "width": 4},
+    "mesh": {"rows": 3, "cols": 3},
+    "ring": {"count": 6},
+    "star": {"count": 6},
+}
+
+
+def _layered_diameter(layers: int, width: int) -> int:
+    # Chain of complete bipartite layers: top-to-bottom is layers - 1 hops,
+    # two nodes in the same layer are two hops apart through a neighbour layer.
+    return max(layers - 1, 2 if width > 1 else 1)
+
+
+def _leaf_spine_counts(params: dict) -> tuple[int, int, int | None]:
+    spines = max(1, int(params["spines"]))
+    leaves = max(1, int(params["leaves"]))
+    diameter = 1 if spines == 1 and leaves == 1 else 2
+    return spines + leaves, spines * leaves, diameter
+
+
+def _fat_tree_counts(params: dict) -> tuple[int, int, int | None]:
+    k = int(params["k"])
+    if k < 2 or k % 2 != 0:
+        raise ValueError("k must be an even integer >= 2")
+    half = k // 2
+    nodes = half * half + k * half * 2
+    edges = k * half * half * 2
+    return nodes, edges, 4
+
+
+def _three_tier_counts(params: dict) -> tuple[int, int, int | None]:
+    core = max(1, int(params["core"]))
+    aggregation = max(1, int(params["aggregation"]))
+    access = max(1, int(params["access"]))
+    return core + aggregation + access, aggregation * (access + core), 2
+
+
+def _expanded_clos_counts(params: dict) -> tuple[int, int, int | None]:
+    tiers = max(2, int(params["tiers"]))
+    per_tier = max(1, int(params["nodes_per_tier"]))
+    return tiers * per_tier, (tiers - 1) * per_tier * per_tier, _layered_diameter(tiers, per_tier)
+
+
+def _core_and_pod_counts(params: dict) -> tuple[int, int, int | None]:
+    cores = max(1, int(params["cores"]))
+    pods = max(1, int(params["pods"]))
+    pod_leaves = max(1, int(params["pod_leaves"]))
+    pod_aggs = max(1, int(params["pod_aggs"]))
+    nodes = cores + pods * (pod_aggs + pod_leaves)
+    edges = pods * pod_aggs * (pod_leaves + cores)
+    return nodes, edges, 4 if pods > 1 else 2
+
+
+def _torus_2d_counts(params: dict) -> tuple[int, int, int | None]:
+    rows = max(2, int(params["rows"]))
+    cols = max(2, int(params["cols"]))
+    return rows * cols, 2 * rows * cols, rows // 2 + cols // 2
+
+
+def _torus_3d_counts(params: dict) -> tuple[int, int, int | None]:
+    x = max(2, int(params["x"]))
+    y = max(2, int(params["y"]))
+    z = max(2, int(params["z"]))
+    return x * y * z, 3 * x * y * z, x // 2 + y // 2 + z // 2
+
+
+def _dragonfly_counts(params: dict) -> tuple[int, int, int | None]:
+    groups = max(2, int(params["groups"]))
+    routers = max(2, int(params["routers_per_group"]))
+    side = isqrt(routers)
+    if side * side < routers:
+        side += 1
+    horizontal = (routers // side) * (side - 1) + max(0, routers % side - 1)
+    vertical = max(0, routers - side)
+    # Global links depend on the group/router wiring pattern, so the diameter
+    # is left to the BFS fallback.
+    return groups * routers, groups * (horizontal + vertical + routers), None
+
+
+def _butterfly_counts(params: dict) -> tuple[int, int, int | None]:
+    stages = max(2, int(params["stages"]))
+    width = max(2, int(params["width"]))
+    return stages * width, (stages - 1) * width * width, _layered_diameter(stages, width)
+
+
+def _mesh_counts(params: dict) -> tuple[int, int, int | None]:
+    rows = max(2, int(params["rows"]))
+    cols = max(2, int(params["cols"]))
+    return rows * cols, rows * (cols - 1) + cols * (rows - 1), rows + cols - 2
+
+
+def _ring_counts(params: dict) -> tuple[int, int, int | None]:
+    count = max(3, int(params["count"]))
+    return count, count, count // 2
+
+
+def _star_counts(params: dict) -> tuple[int, int, int | None]:
+    count = max(3, int(params["count"]))
+    return count, count - 1, 2
+
+
+CLOSED_FORM_COUNTS = {
+    "leaf-spine": _leaf_spine_counts,
+    "fat-tree": _fat_tree_counts,
+    "three-tier": _three_tier_counts,
+    "expanded-clos": _expanded_clos_counts,
+    "core-and-pod": _core_and_pod_counts,
+    "torus-2d": _torus_2d_counts,
+    "torus-3d": _torus_3d_counts,
+    "dragonfly": _dragonfly_counts,
+    "butterfly": _butterfly_counts,
+    "mesh": _mesh_counts,
+    "ring": _ring_counts,
+    "star": _star_counts,
+}
+
+
+def graph_diameter(node_ids: list[str], edges: list[dict]) -> int | None:
+    """Longest shortest path (in hops) over the undirected graph, or None if disconnected."""
+    adjacency: dict[str, set[str]] = {node_id: set() for node_id in node_ids}
+    for edge in edges:
+        source = edge["source"]
+        target = edge["target"]
+        if source == target:
+            continue
+        adjacency.setdefault(source, set()).add(target)
+        adjacency.setdefault(target, set()).add(source)
+
+    diameter = 0
+    for start in adjacency:
+        seen = {start: 0}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            for neighbour in adjacency[current]:
+                if neighbour not in seen:
+                    seen[neighbour] = seen[current] + 1
+                    queue.append(neighbour)
+        if len(seen) < len(adjacency):
+            return None
+        diameter = max(diameter, max(seen.values()))
+    return diameter
+
+
+def evaluate_combination(topo_type: str, params: dict, exact: bool = False) -> list:
+    """Return one table row of ``SWEEP_COLUMNS`` for a single parameter combination."""
+    try:
+        nodes, edges, diameter = CLOSED_FORM_COUNTS[topo_type](params)
+        if diameter is not None and not exact:
+            return [nodes, edges, diameter, "closed-form", None]
+        if nodes > MAX_BFS_NODES:
+            return [nodes, edges, None, "closed-form", None]
+        generated = generate_by_type(topo_type, params)
+        diameter = graph_diameter([node["id"] for node in generated.nodes], generated.edges)
+        return [len(generated.nodes), len(generated.edges), diameter, "generated", None]
+    except ValueError as exc:
+        return [None, None, None, None, str(exc)]
+
+
+def _evaluate_packed(item: tuple[str, dict, bool]) -> list:
+    return evaluate_combination(*item)
+
+
+def expand_range(name: str, spec) -> list[int]:
+    if isinstance(spec, bool):
+        raise ValueError(f"Invalid range for {name}")
+    if isinstance(spec, int):
+        return [spec]
+    if isinstance(spec, list):
+        return [int(value) for value in spec]
+    if isinstance(spec, dict):
+        start = int(spec.get("start", 1))
+        stop = int(spec.get("stop", start))
+        step = int(spec.get("step", 1))
+        if step <= 0:
+            raise ValueError(f"Range step for {name} must be positive")
+        return list(range(start, stop + 1, step))
+    raise ValueError(f"Invalid range for {name}")
+
+
+def run_sweep(
+    topo_type: str,
+    ranges: dict,
+    params: dict | None = None,
+    workers: int | None = None,
+    exact: bool = False,
+    max_combinations: int = MAX_SWEEP_COMBINATIONS,
+) -> dict:
+    if topo_type not in SWEEP_PARAMS:
+        raise ValueError("Unsupported topology type")
+    defaults = SWEEP_PARAMS[topo_type]
+    unknown = sorted(set(ranges) - set(defaults))
+    if unknown:
+        raise ValueError(f"Cannot sweep {', '.join(unknown)} for {topo_type}")
+
+    base = {**defaults, **(params or {})}
+    names = [name for name in defaults if name in ranges]
+    values = [expand_range(name, ranges[name]) for name in names]
+    total = 1
+    for options in values:
+        total *= len(options)
+    if total > max_combinations:
+        raise ValueError(f"Sweep has {total} combinations, limit is {max_combinations}")
+
+    combos = [dict(base, **dict(zip(names, combo))) for combo in product(*values)]
+    work = [(topo_type, combo, exact) for combo in combos]
+    # Closed-form rows cost microseconds; only pay for a process pool when rows
+    # actually have to be generated.
+    needs_generation = exact or topo_type in BFS_DIAMETER_TYPES
+    if workers != 1 and needs_generation and len(work) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_evaluate_packed, work, chunksize=max(1, len(work) // 64)))
+    else:
+        results = [_evaluate_packed(item) for item in work]
+
+    return {
+        "topo_type": topo_type,
+        "columns": names + SWEEP_COLUMNS,
+        "rows": [[combo[name] for name in names] + row for combo, row in zip(combos, results)],
+    }
+
+
+def _parse_cli_range(text: str) -> tuple[str, object]:
+    name, _, spec = text.partition("=")
+    if not spec:
+        raise argparse.ArgumentTypeError(f"Expected name=values, got {text!r}")
+    if ":" in spec:
+        parts = [int(part) for part in spec.split(":")]
+        return name, {"start": parts[0], "stop": parts[1], "step": parts[2] if len(parts) > 2 else 1}
+    return name, [int(part) for part in spec.split(",")]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep topology generator parameters.")
+    parser.add_argument("topo_type", choices=sorted(SWEEP_PARAMS))
+    parser.add_argument(
+        "--range",
+        dest="ranges",
+        action="append",
+        type=_parse_cli_range,
+        default=[],
+        help="name=start:stop[:step] or name=v1,v2,...",
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--exact", action="store_true", help="generate every combination and BFS the diameter")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    args = parser.parse_args(argv)
+
+    try:
+        table = run_sweep(args.topo_type, dict(args.ranges), workers=args.workers, exact=args.exact)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.format == "json":
+        json.dump(table, sys.stdout)
+        sys.stdout.write("\n")
+    else:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(table["columns"])
+        writer.writerows(table["rows"])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
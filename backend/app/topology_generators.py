@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from itertools import product
 
+from .metrics import span
+
 
 @dataclass
 class GeneratedTopology:
@@ -569,3 +571,94 @@ def generate_star(count: int, kind: str, edge_label: str | None = "link") -> Gen
         nodes=nodes,
         edges=edges,
     )
+
+
+@span("generate")
+def generate_by_type(topo_type: str, params: dict) -> GeneratedTopology:
+    params = params or {}
+    edge_label = params.get("edge_label", "link")
+    if topo_type == "leaf-spine":
+        return generate_leaf_spine(
+            params.get("spines", 2),
+            params.get("leaves", 4),
+            params.get("spine_kind", "switch"),
+            params.get("leaf_kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "fat-tree":
+        return generate_fat_tree(
+            params.get("k", 4),
+            params.get("core_kind", "switch"),
+            params.get("agg_kind", "switch"),
+            params.get("edge_kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "three-tier":
+        return generate_three_tier(
+            params.get("core", 2),
+            params.get("aggregation", 4),
+            params.get("access", 6),
+            params.get("core_kind", "switch"),
+            params.get("agg_kind", "switch"),
+            params.get("access_kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "expanded-clos":
+        return generate_expanded_clos(
+            params.get("tiers", 4),
+            params.get("nodes_per_tier", 4),
+            params.get("kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "core-and-pod":
+        return generate_core_and_pod(
+            params.get("cores", 2),
+            params.get("pods", 2),
+            params.get("pod_leaves", 4),
+            params.get("pod_aggs", 2),
+            params.get("core_kind", "switch"),
+            params.get("agg_kind", "switch"),
+            params.get("leaf_kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "torus-2d":
+        return generate_torus_2d(
+            params.get("rows", 3),
+            params.get("cols", 3),
+            params.get("kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "torus-3d":
+        return generate_torus_3d(
+            params.get("x", 3),
+            params.get("y", 3),
+            params.get("z", 3),
+            params.get("kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "dragonfly":
+        return generate_dragonfly(
+            params.get("groups", 3),
+            params.get("routers_per_group", 4),
+            params.get("kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "butterfly":
+        return generate_butterfly(
+            params.get("stages", 4),
+            params.get("width", 4),
+            params.get("kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "mesh":
+        return generate_mesh(
+            params.get("rows", 3),
+            params.get("cols", 3),
+            params.get("kind", "switch"),
+            edge_label,
+        )
+    if topo_type == "ring":
+        return generate_ring(params.get("count", 6), params.get("kind", "switch"), edge_label)
+    if topo_type == "star":
+        return generate_star(params.get("count", 6), params.get("kind", "switch"), edge_label)
+    raise ValueError("Unsupported topology type")
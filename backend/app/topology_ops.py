@@ -1,11 +1,13 @@
 from __future__ import annotations
 
 import json
-from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import datetime
 from math import ceil, sqrt
 from uuid import uuid4
 
+from .bundles import bundle_edges, edge_count, expand_edges
+from .metrics import record_graph, span
 from .models import Topology
 
 DEFAULT_TIER = {
@@ -24,6 +26,17 @@ KIND_LABEL = {
     "patch": "Patch Panel",
 }
 
+EDGE_HANDLES = (
+    "top-out",
+    "bottom-out",
+    "left-out",
+    "right-out",
+    "top-in",
+    "bottom-in",
+    "left-in",
+    "right-in",
+)
+
 NON_TREE_TYPES = {
     "torus-2d",
     "torus-3d",
@@ -41,22 +54,81 @@ DEFAULT_PATCH_SPLIT = 8
 MAX_PATCH_SPLIT = 1024
 
 
-def topology_to_response(topology: Topology) -> dict:
+@dataclass
+class GraphDelta:
+    created_nodes: list[dict] = field(default_factory=list)
+    updated_nodes: list[dict] = field(default_factory=list)
+    deleted_nodes: list[str] = field(default_factory=list)
+    created_edges: list[dict] = field(default_factory=list)
+    updated_edges: list[dict] = field(default_factory=list)
+    deleted_edges: list[str] = field(default_factory=list)
+    # Changed topology-level fields (name, topo_type, topo_params), if any.
+    topology: dict | None = None
+
+    def as_dict(self) -> dict:
+        body = {
+            "created": {"nodes": self.created_nodes, "edges": self.created_edges},
+            "updated": {"nodes": self.updated_nodes, "edges": self.updated_edges},
+            "deleted": {"nodes": self.deleted_nodes, "edges": self.deleted_edges},
+        }
+        if self.topology is not None:
+            body["topology"] = self.topology
+        return body
+
+
+def diff_entities(before: list[dict], after: list[dict]) -> tuple[list[dict], list[dict], list[str]]:
+    previous = {item["id"]: item for item in before}
+    created: list[dict] = []
+    updated: list[dict] = []
+    for item in after:
+        old = previous.pop(item["id"], None)
+        if old is None:
+            created.append(item)
+        elif old is not item and old != item:
+            updated.append(item)
+    return created, updated, list(previous)
+
+
+def diff_graph(
+    before_nodes: list[dict],
+    after_nodes: list[dict],
+    before_edges: list[dict] | None = None,
+    after_edges: list[dict] | None = None,
+) -> GraphDelta:
+    delta = GraphDelta()
+    delta.created_nodes, delta.updated_nodes, delta.deleted_nodes = diff_entities(before_nodes, after_nodes)
+    if before_edges is not None and after_edges is not None:
+        delta.created_edges, delta.updated_edges, delta.deleted_edges = diff_entities(before_edges, after_edges)
+    return delta
+
+
+def topology_to_response(topology: Topology, bundled: bool = False) -> dict:
+    """The response document of a stored topology; ``bundled`` keeps edge bundles folded."""
+    with span("decode"):
+        params = json.loads(topology.topo_params_json)
+        nodes = json.loads(topology.nodes_json)
+        edges = json.loads(topology.edges_json)
+        if not bundled:
+            edges = expand_edges(edges)
+    record_graph(len(nodes), edge_count(edges))
     return {
         "id": topology.id,
         "name": topology.name,
         "topo_type": topology.topo_type,
-        "topo_params": json.loads(topology.topo_params_json),
-        "nodes": json.loads(topology.nodes_json),
-        "edges": normalize_edges(json.loads(topology.edges_json)),
+        "topo_params": params,
+        "nodes": nodes,
+        "edges": normalize_edges(edges),
         "updated_at": topology.updated_at,
+        "version": topology.version,
     }
 
 
 def read_topology_graph(topology: Topology) -> tuple[dict, list[dict], list[dict]]:
-    params = json.loads(topology.topo_params_json)
-    nodes = json.loads(topology.nodes_json)
-    edges = json.loads(topology.edges_json)
+    with span("decode"):
+        params = json.loads(topology.topo_params_json)
+        nodes = json.loads(topology.nodes_json)
+        edges = expand_edges(json.loads(topology.edges_json))
+    record_graph(len(nodes), len(edges))
     return params, nodes, normalize_edges(edges)
 
 
@@ -70,13 +142,17 @@ def write_topology_graph(
 ) -> None:
     if topo_type is not None:
         topology.topo_type = topo_type
-    if topo_params is not None:
-        topology.topo_params_json = json.dumps(topo_params)
-    if nodes is not None:
-        topology.nodes_json = json.dumps(nodes)
     if edges is not None:
-        topology.edges_json = json.dumps(normalize_edges(edges))
+        edges = normalize_edges(edges)
+    with span("encode"):
+        if topo_params is not None:
+            topology.topo_params_json = json.dumps(topo_params)
+        if nodes is not None:
+            topology.nodes_json = json.dumps(nodes)
+        if edges is not None:
+            topology.edges_json = json.dumps(bundle_edges(edges))
     topology.updated_at = datetime.utcnow()
+    topology.version = (topology.version or 0) + 1
 
 
 def is_non_tree_topology(topo_type: str) -> bool:
@@ -98,16 +174,26 @@ def normalize_handle(value: str | None, role: str) -> str:
     return value
 
 
+@span("normalize")
 def normalize_edges(edges: list[dict]) -> list[dict]:
+    """Edges with normalized handles. Edges that are already normalized are shared with the input, not copied."""
     normalized: list[dict] = []
     for edge in edges:
-        next_edge = deepcopy(edge)
-        next_edge["sourceHandle"] = normalize_handle(next_edge.get("sourceHandle"), "source")
-        next_edge["targetHandle"] = normalize_handle(next_edge.get("targetHandle"), "target")
-        normalized.append(next_edge)
+        source_handle = normalize_handle(edge.get("sourceHandle"), "source")
+        target_handle = normalize_handle(edge.get("targetHandle"), "target")
+        if edge.get("sourceHandle") != source_handle or edge.get("targetHandle") != target_handle:
+            edge = {**edge, "sourceHandle": source_handle, "targetHandle": target_handle}
+        normalized.append(edge)
     return normalized
 
 
+def _moved(node: dict, position: dict) -> dict:
+    """``node`` at ``position``: the same object if it is already there, else a shallow copy."""
+    if node.get("position") == position:
+        return node
+    return {**node, "position": position}
+
+
 def _node_label(kind: str, index: int) -> str:
     return f"{KIND_LABEL.get(kind, kind)} {index}"
 
@@ -136,6 +222,7 @@ def build_node(
     split_count: int | None = None,
     position: dict | None = None,
     layout: str | None = None,
+    group: str | None = None,
     node_id: str | None = None,
     topo_type: str = "custom",
 ) -> dict:
@@ -155,6 +242,8 @@ def build_node(
     }
     if kind == "patch":
         next_node["data"]["splitCount"] = clamp_patch_split(split_count)
+    if group:
+        next_node["data"]["group"] = group
     return next_node
 
 
@@ -179,9 +268,10 @@ def build_edge(
     return edge
 
 
+@span("layout")
 def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo_params: dict, end_gap: bool = False) -> list[dict]:
-    nodes = deepcopy(nodes)
     edges = normalize_edges(edges)
+    next_nodes: list[dict] = []
 
     if topo_type in {"torus-2d", "mesh"}:
         spacing_x = topo_params.get("nodeSpacingX") or 180
@@ -195,8 +285,8 @@ def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo
             else:
                 r = 0
                 c = 0
-            node["position"] = {"x": 140 + c * spacing_x, "y": 120 + r * spacing_y}
-        return nodes
+            next_nodes.append(_moved(node, {"x": 140 + c * spacing_x, "y": 120 + r * spacing_y}))
+        return next_nodes
 
     if topo_type == "torus-3d":
         z_count = topo_params.get("z") or 3
@@ -213,8 +303,8 @@ def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo
             else:
                 i = j = k = 0
             layer_x = (k % z_count) * layer_gap
-            node["position"] = {"x": 140 + layer_x + i * spacing_x, "y": 120 + j * spacing_y}
-        return nodes
+            next_nodes.append(_moved(node, {"x": 140 + layer_x + i * spacing_x, "y": 120 + j * spacing_y}))
+        return next_nodes
 
     if topo_type == "dragonfly":
         groups = topo_params.get("groups") or 3
@@ -237,11 +327,12 @@ def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo
             group_col = g % group_cols
             local_col = r % local_cols
             local_row = r // local_cols
-            node["position"] = {
+            position = {
                 "x": 140 + group_col * group_spacing_x + local_col * node_spacing_x,
                 "y": 120 + group_row * group_spacing_y + local_row * node_spacing_y,
             }
-        return nodes
+            next_nodes.append(_moved(node, position))
+        return next_nodes
 
     if topo_type == "butterfly":
         spacing_x = topo_params.get("nodeSpacingX") or 180
@@ -254,8 +345,8 @@ def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo
                 node_index = int(node_part) - 1
             else:
                 stage_index = node_index = 0
-            node["position"] = {"x": 140 + node_index * spacing_x, "y": 120 + stage_index * spacing_y}
-        return nodes
+            next_nodes.append(_moved(node, {"x": 140 + node_index * spacing_x, "y": 120 + stage_index * spacing_y}))
+        return next_nodes
 
     edges_by_source: dict[str, list[str]] = {}
     edges_by_target: dict[str, list[str]] = {}
@@ -264,15 +355,17 @@ def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo
         edges_by_target.setdefault(edge["target"], []).append(edge["source"])
 
     tiers = sorted({_node_tier(node) for node in nodes}, reverse=True)
-    max_in_tier = max(1, *[sum(1 for node in nodes if _node_tier(node) == tier) for tier in tiers])
+    tier_index = {tier: index for index, tier in enumerate(tiers)}
+    groups: dict[int, list[dict]] = {tier: [] for tier in tiers}
+    for node in nodes:
+        groups[_node_tier(node)].append(node)
+    max_in_tier = max(1, *[len(groups[tier]) for tier in tiers])
     layer_gap = topo_params.get("layerGap") or 220
     node_spacing_x = topo_params.get("nodeSpacingX") or 220
 
-    next_nodes: list[dict] = []
-    for node in nodes:
-        tier = _node_tier(node)
-        tier_index = tiers.index(tier)
-        group = [candidate for candidate in nodes if _node_tier(candidate) == tier]
+    # Row of each node within its tier; the first of any duplicate ids wins.
+    row_indexes: dict[tuple[int, str], int] = {}
+    for tier, group in groups.items():
         ordered = sorted(
             group,
             key=lambda candidate: (
@@ -280,26 +373,31 @@ def apply_auto_layout(nodes: list[dict], edges: list[dict], topo_type: str, topo
                 str((candidate.get("data") or {}).get("label") or candidate["id"]),
             ),
         )
-        row_index = next(index for index, candidate in enumerate(ordered) if candidate["id"] == node["id"])
-        offset = (max_in_tier - len(group)) / 2
+        for index, candidate in enumerate(ordered):
+            row_indexes.setdefault((tier, candidate["id"]), index)
+
+    for node in nodes:
+        tier = _node_tier(node)
+        group_size = len(groups[tier])
+        row_index = row_indexes[(tier, node["id"])]
+        offset = (max_in_tier - group_size) / 2
         x = 140 + max(0, row_index + offset) * node_spacing_x
-        if end_gap and row_index == len(group) - 1:
+        if end_gap and row_index == group_size - 1:
             x += node_spacing_x
-        y = 120 + tier_index * layer_gap
-        next_node = deepcopy(node)
-        next_node["position"] = {"x": x, "y": y}
-        next_nodes.append(next_node)
+        y = 120 + tier_index[tier] * layer_gap
+        next_nodes.append(_moved(node, {"x": x, "y": y}))
     return next_nodes
 
 
+@span("layout")
 def arrange_nodes(nodes: list[dict], node_ids: list[str], mode: str) -> list[dict]:
     if len(node_ids) < 2:
-        return deepcopy(nodes)
+        return list(nodes)
 
     selected_set = set(node_ids)
-    selected_nodes = [deepcopy(node) for node in nodes if node["id"] in selected_set]
+    selected_nodes = [node for node in nodes if node["id"] in selected_set]
     if len(selected_nodes) < 2:
-        return deepcopy(nodes)
+        return list(nodes)
 
     def size_of(node: dict) -> tuple[float, float]:
         return (node.get("width") or FALLBACK_NODE_WIDTH, node.get("height") or FALLBACK_NODE_HEIGHT)
@@ -342,10 +440,6 @@ def arrange_nodes(nodes: list[dict], node_ids: list[str], mode: str) -> list[dic
         for index, node in enumerate(ordered):
             next_positions[node["id"]] = {"x": node["position"]["x"], "y": first["position"]["y"] + step * index}
 
-    result: list[dict] = []
-    for node in nodes:
-        next_node = deepcopy(node)
-        if node["id"] in next_positions:
-            next_node["position"] = next_positions[node["id"]]
-        result.append(next_node)
-    return result
+    if not next_positions:
+        return list(nodes)
+    return [_moved(node, next_positions[node["id"]]) if node["id"] in next_positions else node for node in nodes]
@@ -0,0 +1,173 @@
+"""Validation of whole node and edge lists in one linear pass.
+
+``TopologyPayload`` keeps ``nodes`` and ``edges`` as plain lists, because
+validating 100k entities through per-item models (``NodeModel``,
+``EdgeModel``) costs more than the rest of a ``PUT`` together. ``graph_errors``
+checks the same rules with plain dict and set operations:
+
+- node ids are unique non-empty strings, ``data.kind`` is a known kind and
+  ``data.tier`` an integer of at least 1, and ``position`` has numeric ``x``/``y``
+- edge ids are unique non-empty strings, both endpoints are existing nodes,
+  handles are known handles (or omitted), and ports are positive integers
+- edge bundles are checked member by member, as if they had been expanded
+
+Unknown extra keys are allowed on nodes and edges, as with the models.
+"""
+
+from __future__ import annotations
+
+from pydantic_core import InitErrorDetails, PydanticCustomError, ValidationError
+
+from .ports import PORT_KEYS
+from .topology_ops import EDGE_HANDLES, KIND_LABEL, normalize_handle
+
+# Stop collecting after this many; one broken import tends to break every entity the same way.
+MAX_GRAPH_ERRORS = 20
+
+_HANDLE_KEYS = (("sourceHandle", "source"), ("targetHandle", "target"))
+
+
+class _TooManyErrors(Exception):
+    pass
+
+
+def graph_errors(nodes: list, edges: list, limit: int = MAX_GRAPH_ERRORS) -> list[tuple[tuple, str]]:
+    """``(location, message)`` of up to ``limit`` problems in a node and edge list; empty when valid."""
+    errors: list[tuple[tuple, str]] = []
+
+    def error(loc: tuple, message: str) -> None:
+        errors.append((loc, message))
+        if len(errors) >= limit:
+            raise _TooManyErrors
+
+    try:
+        node_ids = _check_nodes(nodes, error)
+        _check_edges(edges, node_ids, error)
+    except _TooManyErrors:
+        pass
+    return errors
+
+
+def _check_nodes(nodes: list, error) -> set:
+    node_ids: set = set()
+    kinds = KIND_LABEL
+    for index, node in enumerate(nodes):
+        if type(node) is not dict:
+            error(("nodes", index), "node must be an object")
+            continue
+        node_id = node.get("id")
+        if type(node_id) is not str or not node_id:
+            error(("nodes", index, "id"), "node id must be a non-empty string")
+        elif node_id in node_ids:
+            error(("nodes", index, "id"), f"duplicate node id '{node_id}'")
+        else:
+            node_ids.add(node_id)
+        data = node.get("data")
+        if type(data) is not dict:
+            error(("nodes", index, "data"), "node data must be an object")
+        else:
+            kind = data.get("kind")
+            if kind not in kinds:
+                error(("nodes", index, "data", "kind"), f"unsupported kind {kind!r}")
+            tier = data.get("tier")
+            if type(tier) is not int or tier < 1:
+                error(("nodes", index, "data", "tier"), "tier must be an integer >= 1")
+        position = node.get("position")
+        if position is not None and (
+            type(position) is not dict
+            or type(position.get("x")) not in (int, float)
+            or type(position.get("y")) not in (int, float)
+        ):
+            error(("nodes", index, "position"), "position must have numeric x and y")
+    return node_ids
+
+
+def _check_handles(edge: dict, loc: tuple, error) -> None:
+    for key, role in _HANDLE_KEYS:
+        handle = edge.get(key)
+        if handle is not None and (type(handle) is not str or normalize_handle(handle, role) not in EDGE_HANDLES):
+            error((*loc, key), f"unknown handle {handle!r}")
+
+
+def _check_edges(edges: list, node_ids: set, error) -> None:
+    edge_ids: set = set()
+    # Stored edges carry normalized handles; anything else takes the slow path through ``_check_handles``.
+    handles = {*EDGE_HANDLES, None}
+    for index, edge in enumerate(edges):
+        if type(edge) is not dict:
+            error(("edges", index), "edge must be an object")
+            continue
+        if edge.get("sourceHandle") not in handles or edge.get("targetHandle") not in handles:
+            _check_handles(edge, ("edges", index), error)
+        if "bundle" in edge:
+            _check_bundle(edge, ("edges", index), node_ids, edge_ids, error)
+            continue
+        edge_id = edge.get("id")
+        if type(edge_id) is not str or not edge_id:
+            error(("edges", index, "id"), "edge id must be a non-empty string")
+        elif edge_id in edge_ids:
+            error(("edges", index, "id"), f"duplicate edge id '{edge_id}'")
+        else:
+            edge_ids.add(edge_id)
+        source = edge.get("source")
+        if type(source) is not str or source not in node_ids:
+            error(("edges", index, "source"), f"unknown source node {source!r}")
+        target = edge.get("target")
+        if type(target) is not str or target not in node_ids:
+            error(("edges", index, "target"), f"unknown target node {target!r}")
+        if "sourcePort" in edge or "targetPort" in edge:
+            for key in PORT_KEYS.values():
+                port = edge.get(key)
+                if port is not None and (type(port) is not int or port < 1):
+                    error(("edges", index, key), "port must be an integer >= 1")
+
+
+def _check_bundle(edge: dict, loc: tuple, node_ids: set, edge_ids: set, error) -> None:
+    bundle = edge["bundle"]
+    if type(bundle) is not dict:
+        error((*loc, "bundle"), "bundle must be an object")
+        return
+    prefix = bundle.get("prefix")
+    if type(prefix) is not str or not prefix:
+        error((*loc, "bundle", "prefix"), "bundle prefix must be a non-empty string")
+        return
+    if bundle.get("major", "source") not in ("source", "target"):
+        error((*loc, "bundle", "major"), "bundle major must be 'source' or 'target'")
+    members = {}
+    for role in ("sources", "targets"):
+        ends = bundle.get(role)
+        if type(ends) is not list or not ends:
+            error((*loc, "bundle", role), f"bundle {role} must be a non-empty list")
+            return
+        for position, endpoint in enumerate(ends):
+            if type(endpoint) is not str or endpoint not in node_ids:
+                error((*loc, "bundle", role, position), f"unknown {role[:-1]} node {endpoint!r}")
+        members[role] = ends
+    for source in members["sources"]:
+        for target in members["targets"]:
+            edge_id = f"{prefix}-{source}-{target}"
+            if edge_id in edge_ids:
+                error((*loc, "bundle"), f"duplicate edge id '{edge_id}'")
+            edge_ids.add(edge_id)
+
+
+def check_graph(title: str, nodes: list, edges: list) -> None:
+    """Raise a ``ValidationError`` listing what ``graph_errors`` finds, as per-item models would."""
+    _raise(title, graph_errors(nodes, edges))
+
+
+def check_handles(title: str, edge: dict) -> None:
+    """Raise a ``ValidationError`` if ``edge`` names a handle that is not one of ``EDGE_HANDLES``."""
+    errors: list[tuple[tuple, str]] = []
+    _check_handles(edge, (), lambda loc, message: errors.append((loc, message)))
+    _raise(title, errors)
+
+
+def _raise(title: str, errors: list[tuple[tuple, str]]) -> None:
+    if errors:
+        # The message goes in as context, so braces in user-supplied ids are not read as a template.
+        details = [
+            InitErrorDetails(type=PydanticCustomError("graph", "{message}", {"message": message}), loc=loc, input=None)
+            for loc, message in errors
+        ]
+        raise ValidationError.from_exception_data(title, details)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from .metrics import span
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.topology.columnar+json"
+COLUMNAR_FORMAT = "topology-columnar/1"
+
+NODE_DATA_COLUMNS = ["label", "kind", "tier", "layout", "splitCount"]
+EDGE_STRING_COLUMNS = ["sourceHandle", "targetHandle", "label"]
+
+
+class _StringTable:
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def add(self, value: str) -> int:
+        position = self.index.get(value)
+        if position is None:
+            position = len(self.values)
+            self.index[value] = position
+            self.values.append(value)
+        return position
+
+
+def wants_columnar(request: Request) -> bool:
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _encode_nodes(nodes: list[dict], strings: _StringTable) -> tuple[dict, dict[str, int]]:
+    columns: dict[str, list] = {"id": [], "type": [], "x": [], "y": [], "tier": [], "splitCount": []}
+    for name in ("label", "kind", "layout"):
+        columns[name] = []
+    extra: list[list] = []
+    rows: dict[str, int] = {}
+
+    for row, node in enumerate(nodes):
+        rows[node["id"]] = row
+        columns["id"].append(strings.add(node["id"]))
+        node_extra = {key: value for key, value in node.items() if key not in {"id", "type", "position", "data"}}
+        data_extra: dict = {}
+
+        node_type = node.get("type")
+        if isinstance(node_type, str):
+            columns["type"].append(strings.add(node_type))
+        else:
+            columns["type"].append(-1)
+            if "type" in node:
+                node_extra["type"] = node_type
+
+        position = node.get("position")
+        # Only plain numeric {x, y} positions fit the columns; anything else, such as a null x, goes to extra.
+        if (
+            isinstance(position, dict)
+            and set(position) == {"x", "y"}
+            and all(type(position[axis]) in (int, float) for axis in ("x", "y"))
+        ):
+            columns["x"].append(position["x"])
+            columns["y"].append(position["y"])
+        else:
+            columns["x"].append(None)
+            columns["y"].append(None)
+            if "position" in node:
+                node_extra["position"] = position
+
+        data = node.get("data")
+        if not isinstance(data, dict):
+            data = {}
+            if "data" in node:
+                node_extra["data"] = node["data"]
+        for name in ("label", "kind", "layout"):
+            value = data.get(name)
+            if isinstance(value, str):
+                columns[name].append(strings.add(value))
+            else:
+                columns[name].append(-1)
+                if name in data:
+                    data_extra[name] = value
+        for name in ("tier", "splitCount"):
+            value = data.get(name)
+            if isinstance(value, int) and not isinstance(value, bool):
+                columns[name].append(value)
+            else:
+                columns[name].append(None)
+                if name in data:
+                    data_extra[name] = value
+        data_extra.update({key: value for key, value in data.items() if key not in NODE_DATA_COLUMNS})
+
+        if "data" not in node:
+            # false marks a node with no data object, as opposed to an empty one.
+            extra.append([row, node_extra or None, False])
+        elif node_extra or data_extra:
+            extra.append([row, node_extra or None, data_extra or None])
+
+    columns["extra"] = extra
+    return columns, rows
+
+
+def _encode_edges(edges: list[dict], strings: _StringTable, node_rows: dict[str, int]) -> dict:
+    columns: dict[str, list] = {"id": [], "source": [], "target": []}
+    for name in EDGE_STRING_COLUMNS:
+        columns[name] = []
+    extra: list[list] = []
+
+    for row, edge in enumerate(edges):
+        edge_extra = {
+            key: value for key, value in edge.items() if key not in {"id", "source", "target", *EDGE_STRING_COLUMNS}
+        }
+        source = edge["source"]
+        target = edge["target"]
+        # Endpoints point at node rows; dangling endpoints fall back to -(string index) - 1.
+        columns["source"].append(node_rows[source] if source in node_rows else -strings.add(source) - 1)
+        columns["target"].append(node_rows[target] if target in node_rows else -strings.add(target) - 1)
+
+        # Generated ids follow "<prefix>-<source>-<target>"; store only the prefix.
+        edge_id = edge["id"]
+        suffix = f"-{source}-{target}"
+        if edge_id.endswith(suffix) and len(edge_id) > len(suffix):
+            columns["id"].append(-strings.add(edge_id[: -len(suffix)]) - 1)
+        else:
+            columns["id"].append(strings.add(edge_id))
+
+        for name in EDGE_STRING_COLUMNS:
+            value = edge.get(name)
+            if isinstance(value, str):
+                columns[name].append(strings.add(value))
+            else:
+                columns[name].append(-1)
+                if name in edge:
+                    edge_extra[name] = value
+        if edge_extra:
+            extra.append([row, edge_extra])
+
+    columns["extra"] = extra
+    return columns
+
+
+def encode_columnar(body: dict) -> dict:
+    """Encode a topology response as columns over an interned string table.
+
+    Node ids, kinds, handles, edge labels and generated edge-id prefixes are
+    stored once and edges reference nodes by row. String columns hold indexes
+    into ``strings`` with -1 for a missing key, numeric columns use null, and a
+    negative edge id is ``-(prefix index) - 1``. Anything that does not fit a
+    column is kept verbatim in the ``extra`` lists so decoding is lossless.
+    """
+    strings = _StringTable()
+    nodes, node_rows = _encode_nodes(body["nodes"], strings)
+    edges = _encode_edges(body["edges"], strings, node_rows)
+    updated_at = body.get("updated_at")
+    return {
+        "format": COLUMNAR_FORMAT,
+        "id": body.get("id"),
+        "name": body.get("name"),
+        "topo_type": body.get("topo_type"),
+        "topo_params": body.get("topo_params"),
+        "updated_at": updated_at.isoformat() if isinstance(updated_at, datetime) else updated_at,
+        "version": body.get("version"),
+        "strings": strings.values,
+        "nodes": nodes,
+        "edges": edges,
+    }
+
+
+def decode_columnar(payload: dict) -> dict:
+    strings = payload["strings"]
+    node_columns = payload["nodes"]
+    edge_columns = payload["edges"]
+
+    nodes: list[dict] = []
+    node_extra = {row: (top, data) for row, top, data in node_columns["extra"]}
+    for row, id_index in enumerate(node_columns["id"]):
+        node: dict = {"id": strings[id_index]}
+        if node_columns["type"][row] >= 0:
+            node["type"] = strings[node_columns["type"][row]]
+        if node_columns["x"][row] is not None:
+            node["position"] = {"x": node_columns["x"][row], "y": node_columns["y"][row]}
+        data: dict = {}
+        for name in ("label", "kind"):
+            if node_columns[name][row] >= 0:
+                data[name] = strings[node_columns[name][row]]
+        if node_columns["tier"][row] is not None:
+            data["tier"] = node_columns["tier"][row]
+        if node_columns["layout"][row] >= 0:
+            data["layout"] = strings[node_columns["layout"][row]]
+        if node_columns["splitCount"][row] is not None:
+            data["splitCount"] = node_columns["splitCount"][row]
+        node["data"] = data
+        if row in node_extra:
+            top, data_extra = node_extra[row]
+            if data_extra:
+                data.update(data_extra)
+            if top:
+                node.update(top)
+            if data_extra is False:
+                del node["data"]
+        nodes.append(node)
+
+    def endpoint(value: int) -> str:
+        return nodes[value]["id"] if value >= 0 else strings[-value - 1]
+
+    edges: list[dict] = []
+    edge_extra = dict((row, extra) for row, extra in edge_columns["extra"])
+    for row, id_value in enumerate(edge_columns["id"]):
+        source = endpoint(edge_columns["source"][row])
+        target = endpoint(edge_columns["target"][row])
+        edge_id = strings[id_value] if id_value >= 0 else f"{strings[-id_value - 1]}-{source}-{target}"
+        edge: dict = {"id": edge_id, "source": source, "target": target}
+        for name in EDGE_STRING_COLUMNS:
+            if edge_columns[name][row] >= 0:
+                edge[name] = strings[edge_columns[name][row]]
+        if row in edge_extra:
+            edge.update(edge_extra[row])
+        edges.append(edge)
+
+    return {
+        "id": payload["id"],
+        "name": payload["name"],
+        "topo_type": payload["topo_type"],
+        "topo_params": payload["topo_params"],
+        "nodes": nodes,
+        "edges": edges,
+        "updated_at": payload["updated_at"],
+        # Payloads encoded before versions were added have none.
+        "version": payload.get("version"),
+    }
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@span("render")
+def encode_topology_body(body: dict, columnar: bool) -> bytes:
+    """Serialize a topology response dict to the bytes of a JSON or columnar response."""
+    if columnar:
+        body = encode_columnar(body)
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False, default=_json_default).encode()
+
+
+def wants_minimal(request: Request) -> bool:
+    prefer = request.headers.get("prefer", "")
+    return "return=minimal" in prefer.replace(" ", "") or request.query_params.get("response") == "delta"
+
+
+def minimal_response(body: dict) -> Response:
+    """JSON response for ``Prefer: return=minimal``: version stamp plus the changed entities only."""
+    return Response(
+        content=encode_topology_body(body, False),
+        media_type="application/json",
+        headers={"Preference-Applied": "return=minimal", "Vary": "Prefer"},
+    )
+
+
+def negotiate_topology(request: Request, body: dict):
+    """Return ``body`` for the default JSON response, or a columnar response if the client asked for it."""
+    if not wants_columnar(request):
+        return body
+    return Response(
+        content=encode_topology_body(body, True),
+        media_type=COLUMNAR_MEDIA_TYPE,
+        headers={"Vary": "Accept"},
+    )
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+from .bundles import bundle_edges, edge_count, expand_edges
+from .metrics import record_graph
+from .models import Topology
+from .schemas import TopologyPayload
+from .topology_ops import normalize_edges
+
+logger = logging.getLogger(__name__)
+
+# Buffered writes live in one process, so multi-worker servers commit every PUT unless told otherwise.
+_SINGLE_WORKER = int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+# Flush a buffered topology at most this long after its first unflushed write (0 disables buffering) ...
+WRITE_BEHIND_MS = int(os.getenv("TOPOLOGY_WRITE_BEHIND_MS", "1000" if _SINGLE_WORKER else "0"))
+# ... or as soon as it has seen no writes for this long.
+WRITE_BEHIND_IDLE_MS = int(os.getenv("TOPOLOGY_WRITE_BEHIND_IDLE_MS", "200"))
+
+
+@dataclass
+class PendingWrite:
+    """The latest unflushed full-document write of one topology."""
+
+    id: int
+    name: str
+    topo_type: str
+    topo_params: dict
+    nodes: list[dict]
+    edges: list[dict]
+    updated_at: datetime
+    version: int
+    # The stored version the buffered writes were made on top of.
+    base_version: int
+    first_at: float
+    last_at: float
+    writes: int = 1
+    # Set while a flush is committing this write.
+    committing: bool = False
+
+    def to_response(self, bundled: bool = False) -> dict:
+        edges = bundle_edges(self.edges) if bundled else expand_edges(self.edges)
+        record_graph(len(self.nodes), edge_count(edges))
+        return {
+            "id": self.id,
+            "name": self.name,
+            "topo_type": self.topo_type,
+            "topo_params": self.topo_params,
+            "nodes": self.nodes,
+            "edges": normalize_edges(edges),
+            "updated_at": self.updated_at,
+            "version": self.version,
+        }
+
+
+class WriteBuffer:
+    """Write-behind buffer that coalesces bursts of ``PUT`` autosaves per topology.
+
+    Each write replaces the buffered document and bumps its version in memory;
+    a background thread commits the latest document once the topology has been
+    idle for ``idle_ms`` or ``max_delay_ms`` after its first unflushed write.
+    Readers see buffered documents through ``get``, and ``close`` flushes
+    everything on shutdown. Code that loads the row to change it calls
+    ``acquire`` first: that commits the buffered document, and ``put`` then
+    waits until the matching ``release`` instead of buffering a document on
+    top of a version that is about to be replaced.
+
+    A buffered document is committed under exactly the version its ``PUT``
+    returned. Only another process can commit the topology in between; then
+    that version may already name a different document, so the buffered write
+    is dropped and counted in ``conflicts``, and the other commit stands. A
+    ``PUT`` that finds such a commit raises ``StaleDataError`` instead of
+    being buffered. This is why the buffer is off for multi-worker servers.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_delay_ms: int = WRITE_BEHIND_MS,
+        idle_ms: int = WRITE_BEHIND_IDLE_MS,
+    ):
+        self.session_factory = session_factory
+        self.max_delay = max_delay_ms / 1000
+        self.idle = min(idle_ms, max_delay_ms) / 1000
+        self.enabled = max_delay_ms > 0
+        self.writes = 0
+        self.commits = 0
+        self.conflicts = 0
+        self._pending: dict[int, PendingWrite] = {}
+        # Requests between ``acquire`` and ``release``, per topology.
+        self._editing: dict[int, int] = {}
+        # Bumped by every ``acquire``, so a ``put`` can tell that one began while it read the stored version.
+        self._edits_started = 0
+        # Guards _pending and _editing.
+        self._lock = threading.Lock()
+        self._edits_done = threading.Condition(self._lock)
+        # Serializes commits, so a returned flush() means the row is durable.
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._closed = False
+
+    def get(self, topology_id: int) -> PendingWrite | None:
+        return self._pending.get(topology_id)
+
+    def pending(self) -> list[PendingWrite]:
+        with self._lock:
+            return list(self._pending.values())
+
+    def put(
+        self,
+        topology_id: int,
+        payload: TopologyPayload,
+        stored_version: Callable[[], int | None],
+    ) -> PendingWrite | None:
+        """Buffer ``payload`` as the next version of the topology; ``None`` if it does not exist.
+
+        Raises ``StaleDataError`` when another process committed the topology
+        after its buffered document was written.
+        """
+        while True:
+            with self._lock:
+                while self._editing.get(topology_id):
+                    self._edits_done.wait()
+                edits_started = self._edits_started
+            # Read outside the lock, so a slow query does not hold up writes to other topologies.
+            stored = stored_version()
+            if stored is None:
+                return None
+            with self._lock:
+                # An edit that began meanwhile commits on top of ``stored``; wait for it and read again.
+                if self._edits_started == edits_started:
+                    return self._buffer(topology_id, payload, stored)
+
+    def _buffer(self, topology_id: int, payload: TopologyPayload, stored: int) -> PendingWrite:
+        now = time.monotonic()
+        previous = self._pending.get(topology_id)
+        if previous is None:
+            version = base_version = stored
+        elif stored == previous.base_version:
+            version, base_version = previous.version, previous.base_version
+        elif stored == previous.version and previous.committing:
+            # ``previous`` has just been committed by a flush that is still finishing.
+            version = base_version = stored
+        else:
+            del self._pending[topology_id]
+            if not previous.committing:
+                # Otherwise the flush committing it counts the conflict.
+                self._conflict(previous, stored)
+            raise StaleDataError(f"Topology {topology_id} was committed elsewhere at version {stored}")
+        pending = PendingWrite(
+            id=topology_id,
+            name=payload.name,
+            topo_type=payload.topo_type,
+            topo_params=payload.topo_params,
+            nodes=payload.nodes,
+            edges=payload.edges,
+            updated_at=datetime.utcnow(),
+            version=version + 1,
+            base_version=base_version,
+            first_at=previous.first_at if previous is not None else now,
+            last_at=now,
+            writes=previous.writes + 1 if previous is not None else 1,
+        )
+        self._pending[topology_id] = pending
+        self.writes += 1
+        self._ensure_thread()
+        return pending
+
+    def acquire(self, topology_id: int) -> bool:
+        """Commit the buffered document of a topology the caller is about to load and change.
+
+        Until ``release``, ``put`` calls for the topology wait, so none is
+        answered with a version the caller's own commit takes. Returns whether
+        anything was committed.
+        """
+        with self._lock:
+            self._editing[topology_id] = self._editing.get(topology_id, 0) + 1
+            self._edits_started += 1
+        try:
+            return self.flush(topology_id)
+        except BaseException:
+            self.release(topology_id)
+            raise
+
+    def release(self, topology_id: int) -> None:
+        with self._lock:
+            remaining = self._editing.pop(topology_id) - 1
+            if remaining:
+                self._editing[topology_id] = remaining
+            else:
+                self._edits_done.notify_all()
+
+    def flush(self, topology_id: int | None = None) -> bool:
+        """Commit buffered writes of one topology (or all of them). Returns whether anything was written."""
+        if topology_id is not None and topology_id not in self._pending:
+            return False
+        with self._flush_lock:
+            with self._lock:
+                if topology_id is None:
+                    batch = list(self._pending.values())
+                else:
+                    batch = [self._pending[topology_id]] if topology_id in self._pending else []
+                for pending in batch:
+                    pending.committing = True
+            for pending in batch:
+                self._commit(pending)
+            return bool(batch)
+
+    def discard(self, topology_id: int) -> None:
+        """Drop buffered writes of a topology that is about to be deleted."""
+        with self._flush_lock, self._lock:
+            self._pending.pop(topology_id, None)
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _commit(self, pending: PendingWrite) -> None:
+        committed = False
+        try:
+            with self.session_factory() as db:
+                topology = db.get(Topology, pending.id)
+                if topology is not None and topology.version != pending.base_version:
+                    self._conflict(pending, topology.version)
+                elif topology is not None:
+                    topology.name = pending.name
+                    topology.topo_type = pending.topo_type
+                    topology.topo_params_json = json.dumps(pending.topo_params)
+                    topology.nodes_json = json.dumps(pending.nodes)
+                    topology.edges_json = json.dumps(bundle_edges(pending.edges))
+                    topology.updated_at = pending.updated_at
+                    # A commit elsewhere between loading and here fails the version check with StaleDataError.
+                    topology.version = pending.version
+                    db.commit()
+                    self.commits += 1
+            committed = True
+        finally:
+            with self._lock:
+                pending.committing = False
+                # A newer write that arrived during the commit stays buffered.
+                if committed and self._pending.get(pending.id) is pending:
+                    del self._pending[pending.id]
+
+    def _conflict(self, pending: PendingWrite, stored: int) -> None:
+        self.conflicts += 1
+        logger.warning(
+            "dropped buffered write of topology %s at version %s: committed elsewhere at version %s",
+            pending.id,
+            pending.version,
+            stored,
+        )
+
+    def _due(self) -> list[int]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                pending.id
+                for pending in self._pending.values()
+                if now - pending.last_at >= self.idle or now - pending.first_at >= self.max_delay
+            ]
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None and not self._closed:
+            self._thread = threading.Thread(target=self._run, name="topology-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        tick = max(self.idle / 2, 0.01)
+        while not self._closed:
+            self._wake.wait(tick)
+            for topology_id in self._due():
+                try:
+                    self.flush(topology_id)
+                except Exception:
+                    # Keep the write buffered and retry on the next tick.
+                    logger.exception("write-behind flush of topology %s failed", topology_id)
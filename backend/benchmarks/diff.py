@@ -0,0 +1,84 @@
+"""Compare ``GET /api/topologies/{a}/diff/{b}`` with downloading both documents and diffing them.
+
+Each case generates a topology, forks it and applies a few edits to the fork
+(moving nodes, relabelling one, adding a node and a link). The endpoint
+decodes only the graph chunks the two do not share. The baseline is what a
+client does today: fetch both full documents and join them by id. The
+response cache is cleared before every request, so both sides pay for
+decoding.
+
+Run from ``backend/``:
+
+    python -m benchmarks.diff
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import warnings
+
+CASES = [
+    ("fat-tree", {"k": 32}),
+    ("torus-3d", {"x": 24, "y": 24, "z": 24}),
+    ("leaf-spine", {"spines": 64, "leaves": 1600}),
+]
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    # app.db reads its settings at import time, so point it at a scratch database first.
+    scratch = tempfile.mkdtemp(prefix="topology-diff-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch}/bench.db"
+    os.environ["TOPOLOGY_WRITE_BEHIND_MS"] = "0"
+    from fastapi.testclient import TestClient
+
+    from app.compression import response_cache
+    from app.diff import compare_entities
+    from app.main import app
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    print(f"{'case':<44}{'nodes':>8}{'edges':>9}{'endpoint ms':>13}{'download+join ms':>18}")
+    with TestClient(app) as client:
+        for topo_type, params in CASES:
+            base = client.post("/api/topologies", json={"name": topo_type}).json()["id"]
+            generated = client.post(
+                f"/api/topologies/{base}/generate", json={"topo_type": topo_type, "params": params}
+            ).json()
+            fork = client.post(f"/api/topologies/{base}/fork", json={}).json()["id"]
+            nodes = generated["nodes"]
+            for node in (nodes[0], nodes[len(nodes) // 2]):
+                client.patch(f"/api/topologies/{fork}/nodes/{node['id']}", json={"position": {"x": 1, "y": 2}})
+            client.patch(f"/api/topologies/{fork}/nodes/{nodes[-1]['id']}", json={"label": "renamed"})
+            client.post(f"/api/topologies/{fork}/nodes", json={"kind": "server", "id": "bench-server"})
+            client.post(f"/api/topologies/{fork}/edges", json={"source": "bench-server", "target": nodes[-1]["id"]})
+
+            def endpoint():
+                response_cache.clear()
+                client.get(f"/api/topologies/{base}/diff/{fork}").raise_for_status()
+
+            def baseline():
+                response_cache.clear()
+                before = client.get(f"/api/topologies/{base}").json()
+                after = client.get(f"/api/topologies/{fork}").json()
+                compare_entities(before["nodes"], after["nodes"], moves=True)
+                compare_entities(before["edges"], after["edges"])
+
+            label = f"{topo_type} {params}"
+            print(
+                f"{label:<44}{len(nodes):>8}{len(generated['edges']):>9}"
+                f"{_best_of(endpoint) * 1000:>13.1f}{_best_of(baseline) * 1000:>18.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Load test: viewer reads through the async request path vs the old sync path.
+
+Starts one single-worker uvicorn server on a scratch database and drives it
+with concurrent keep-alive clients. ``/api/...`` routes are the real async
+endpoints; ``/bench/sync/...`` are sync twins of the same handlers that run on
+the threadpool with a blocking session, as every endpoint did before.
+
+Run from ``backend/``:
+
+    python -m benchmarks.load [--seconds 5] [--concurrency 1,32,128,512]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from app.compression import encoded_body
+from app.crud import list_topologies
+from app.main import app, get_db, get_topology_or_404, topology_versions
+from app.topology_ops import topology_to_response
+from app.wire import encode_topology_body
+
+
+@app.get("/bench/sync/topologies")
+def read_topologies_sync(db: Session = Depends(get_db)):
+    return [{"id": item.id, "name": item.name, "updated_at": item.updated_at} for item in list_topologies(db)]
+
+
+@app.get("/bench/sync/topologies/{topology_id}")
+def read_topology_sync(topology_id: int, request: Request, db: Session = Depends(get_db)):
+    version = topology_versions.get(db, topology_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Topology not found")
+
+    def render() -> bytes:
+        return encode_topology_body(topology_to_response(get_topology_or_404(db, topology_id)), False)
+
+    body, encoding = encoded_body(
+        (topology_id, version, "application/json"), request.headers.get("accept-encoding"), render
+    )
+    headers = {"Content-Encoding": encoding} if encoding != "identity" else {}
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _drive(client: httpx.AsyncClient, path: str, concurrency: int, seconds: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": errors,
+    }
+
+
+async def _run(base_url: str, seconds: float, levels: list[int]) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        created = await client.post("/api/topologies", json={"name": "load"})
+        topology_id = created.json()["id"]
+        await client.post(
+            f"/api/topologies/{topology_id}/generate", json={"topo_type": "fat-tree", "params": {"k": 16}}
+        )
+        rows = []
+        for label, path in [
+            ("list", "/topologies"),
+            ("read", f"/topologies/{topology_id}"),
+        ]:
+            for concurrency in levels:
+                for mode, prefix in [("sync", "/bench/sync"), ("async", "/api")]:
+                    await _drive(client, prefix + path, concurrency, min(seconds, 1.0))  # warm-up
+                    result = await _drive(client, prefix + path, concurrency, seconds)
+                    rows.append({"endpoint": label, "mode": mode, "concurrency": concurrency, **result})
+        return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", default="1,32,128,512")
+    args = parser.parse_args()
+    levels = [int(value) for value in args.concurrency.split(",")]
+
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{scratch}/load.db", "WEB_CONCURRENCY": "1"}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.load:app", "--port", str(port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            for _ in range(100):
+                try:
+                    httpx.get(f"{base_url}/api/health")
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.1)
+            rows = asyncio.run(_run(base_url, args.seconds, levels))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"{'endpoint':<9}{'mode':<7}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for row in rows:
+        print(
+            f"{row['endpoint']:<9}{row['mode']:<7}{row['concurrency']:>6}{row['rps']:>10.0f}"
+            f"{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time ``GET /api/topologies/{id}/render.svg`` cold and from the per-version cache.
+
+Each case generates a topology and requests its overview with every ``lod``.
+The cold time clears the response cache first, so it includes loading the
+graph, the auto-layout of never-positioned nodes and drawing; the cached time
+is a repeat request for the same version.
+
+Run from ``backend/``:
+
+    python -m benchmarks.render
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import warnings
+
+CASES = [
+    ("fat-tree", {"k": 32}),
+    ("torus-3d", {"x": 24, "y": 24, "z": 24}),
+    ("leaf-spine", {"spines": 64, "leaves": 1600}),
+]
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    # app.db reads its settings at import time, so point it at a scratch database first.
+    scratch = tempfile.mkdtemp(prefix="topology-render-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch}/bench.db"
+    os.environ["TOPOLOGY_WRITE_BEHIND_MS"] = "0"
+    from fastapi.testclient import TestClient
+
+    from app.compression import response_cache
+    from app.main import app
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    print(f"{'case':<44}{'lod':>8}{'nodes':>8}{'edges':>9}{'svg KB':>9}{'cold ms':>10}{'cached ms':>11}")
+    with TestClient(app) as client:
+        for topo_type, params in CASES:
+            topology_id = client.post("/api/topologies", json={"name": topo_type}).json()["id"]
+            generated = client.post(
+                f"/api/topologies/{topology_id}/generate", json={"topo_type": topo_type, "params": params}
+            ).json()
+            for lod in ("auto", "full", "groups"):
+                url = f"/api/topologies/{topology_id}/render.svg?lod={lod}"
+
+                def fetch():
+                    response = client.get(url, headers={"Accept-Encoding": "identity"})
+                    response.raise_for_status()
+                    return response
+
+                def cold():
+                    response_cache.clear()
+                    fetch()
+
+                size = len(fetch().content)
+                label = f"{topo_type} {params}"
+                print(
+                    f"{label:<44}{lod:>8}{len(generated['nodes']):>8}{len(generated['edges']):>9}{size / 1024:>9.0f}"
+                    f"{_best_of(cold, 3) * 1000:>10.1f}{_best_of(fetch) * 1000:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
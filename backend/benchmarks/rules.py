@@ -0,0 +1,77 @@
+"""Compare a full rule evaluation with catching up on one edit, on large generated topologies.
+
+For each case the full evaluation builds the rule indexes and checks every
+rule against every subject. Each edit is then applied as a revision delta
+(moving a node, adding a link, retiering a node), and the benchmark times
+re-checking the subjects that edit touched.
+
+Run from ``backend/``:
+
+    python -m benchmarks.rules
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import time
+
+from app.bundles import bundle_edges
+from app.rules import RuleEngine
+from app.topology_generators import generate_by_type
+
+CASES = [
+    ("fat-tree", {"k": 32}),
+    ("torus-3d", {"x": 24, "y": 24, "z": 24}),
+    ("leaf-spine", {"spines": 64, "leaves": 1600}),
+]
+
+
+def _edits(nodes: list[dict]) -> dict[str, dict]:
+    first, last = nodes[0], nodes[-1]
+    moved = {**first, "position": {"x": 10, "y": 10}}
+    retiered = copy.deepcopy(last)
+    retiered["data"]["tier"] += 1
+    link = {
+        "id": "bench-link",
+        "source": first["id"],
+        "target": last["id"],
+        "sourceHandle": "bottom-out",
+        "targetHandle": "top-in",
+    }
+    return {
+        "move node": {"nodes": {"updated": [moved]}},
+        "add link": {"edges": {"created": [link]}},
+        "retier node": {"nodes": {"updated": [retiered]}},
+    }
+
+
+def main() -> None:
+    print(f"{'case':<44}{'nodes':>8}{'edges':>9}{'full ms':>9}{'checks':>9}  edits (ms / checks)")
+    for topo_type, params in CASES:
+        result = generate_by_type(topo_type, params)
+        document = {
+            "topo_type": topo_type,
+            "topo_params": result.params,
+            "nodes": result.nodes,
+            "edges": bundle_edges(result.edges),
+        }
+        engine = RuleEngine()
+        start = time.perf_counter()
+        state = engine.evaluate(1, 1, document)
+        full = time.perf_counter() - start
+        full_checks = state.checked
+        timings = []
+        for label, delta in _edits(result.nodes).items():
+            start = time.perf_counter()
+            state = engine.advance(1, state, [(state.version + 1, "delta", json.dumps(delta))])
+            timings.append(f"{label} {(time.perf_counter() - start) * 1000:.2f}/{state.checked}")
+        label = f"{topo_type} {params}"
+        print(
+            f"{label:<44}{len(result.nodes):>8}{len(result.edges):>9}{full * 1000:>9.0f}{full_checks:>9}"
+            f"  {', '.join(timings)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Startup benchmark: import time of ``app.main`` and time to first byte after a cold start.
+
+Each run starts a fresh interpreter. Import time is measured inside it around
+``import app.main``. For time to first byte a single-worker uvicorn server is
+started on a scratch database holding a few large topologies. The benchmark
+then measures the time from spawning it until ``/api/health`` answers. It
+also times the first and second GET of the most recently updated topology,
+with and without ``TOPOLOGY_WARMUP``.
+
+Run from ``backend/``:
+
+    python -m benchmarks.startup [--runs 5] [--k 24]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import app.main; print(time.perf_counter() - start)"
+ACCEPT_ENCODING = "gzip, deflate, br, zstd"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict, runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True)
+        output.check_returncode()
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def _start(env: dict) -> tuple[subprocess.Popen, str, float]:
+    """Spawn a server and return it with its base URL once ``/api/health`` answers, and how long that took."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"], env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            httpx.get(f"{base_url}/api/health")
+            return server, base_url, time.perf_counter() - started
+        except httpx.TransportError:
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup") from None
+            time.sleep(0.005)
+
+
+def _stop(server: subprocess.Popen) -> None:
+    server.terminate()
+    server.wait()
+
+
+def seed(env: dict, k: int, count: int) -> int:
+    """Create ``count`` fat-tree topologies; returns the id of the last, most recently updated one."""
+    server, base_url, _ = _start(env)
+    try:
+        with httpx.Client(base_url=base_url, timeout=120) as client:
+            for index in range(count):
+                topology_id = client.post("/api/topologies", json={"name": f"startup {index}"}).json()["id"]
+                client.post(
+                    f"/api/topologies/{topology_id}/generate", json={"topo_type": "fat-tree", "params": {"k": k}}
+                ).raise_for_status()
+        return topology_id
+    finally:
+        _stop(server)
+
+
+def measure_first_bytes(env: dict, topology_id: int) -> dict:
+    server, base_url, ready = _start(env)
+    try:
+        timings = {"ready": ready}
+        with httpx.Client(base_url=base_url, timeout=120, headers={"Accept-Encoding": ACCEPT_ENCODING}) as client:
+            for label in ("first", "second"):
+                start = time.perf_counter()
+                with client.stream("GET", f"/api/topologies/{topology_id}") as response:
+                    timings[f"{label}_ttfb"] = time.perf_counter() - start
+                    response.read()
+                    timings[f"{label}_total"] = time.perf_counter() - start
+                    response.raise_for_status()
+        return timings
+    finally:
+        _stop(server)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--k", type=int, default=24, help="fat-tree size of the seeded topologies")
+    parser.add_argument("--topologies", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{scratch}/startup.db",
+            "WEB_CONCURRENCY": "1",
+            "TOPOLOGY_WRITE_BEHIND_MS": "0",
+        }
+        topology_id = seed(env, args.k, args.topologies)
+        imports = measure_import(env, args.runs)
+        print(f"import app.main: best {min(imports) * 1000:.0f} ms, median {statistics.median(imports) * 1000:.0f} ms")
+
+        print(f"{'warm-up':<9}{'ready ms':>10}{'1st ttfb':>10}{'1st total':>11}{'2nd ttfb':>10}{'2nd total':>11}")
+        for warmup in ("0", str(args.topologies)):
+            runs = [measure_first_bytes({**env, "TOPOLOGY_WARMUP": warmup}, topology_id) for _ in range(args.runs)]
+            row = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            print(
+                f"{warmup:<9}{row['ready']:>10.0f}{row['first_ttfb']:>10.1f}{row['first_total']:>11.1f}"
+                f"{row['second_ttfb']:>10.1f}{row['second_total']:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
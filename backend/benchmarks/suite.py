@@ -0,0 +1,369 @@
+"""Benchmark suite: generators, layout, edge normalization and API endpoints over size ladders.
+
+Every case records its best and median wall time and the peak memory allocated while
+it runs (tracemalloc, measured in a separate run so tracing does not skew
+the timings). Results can be saved as a JSON baseline and later runs compared
+against it; a case that got slower or hungrier than the threshold allows
+makes the run exit with status 1.
+
+Run from ``backend/``:
+
+    python -m benchmarks.suite                                  # quick ladder, print results
+    python -m benchmarks.suite --save benchmarks/baseline.json  # record a baseline
+    python -m benchmarks.suite --compare benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.suite --ladder full --filter layout/
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from app.topology_generators import generate_by_type
+from app.topology_ops import apply_auto_layout, arrange_nodes, normalize_edges
+
+# Per-type parameter ladders. "full" extends "quick" with the large sizes.
+LADDERS: dict[str, dict[str, list[dict]]] = {
+    "leaf-spine": {
+        "quick": [{"spines": 8, "leaves": 32}, {"spines": 32, "leaves": 128}, {"spines": 64, "leaves": 512}],
+        "full": [{"spines": 128, "leaves": 1024}, {"spines": 512, "leaves": 2048}],
+    },
+    "fat-tree": {
+        "quick": [{"k": 4}, {"k": 8}, {"k": 16}, {"k": 24}],
+        "full": [{"k": 32}, {"k": 48}, {"k": 64}],
+    },
+    "three-tier": {
+        "quick": [
+            {"core": 2, "aggregation": 4, "access": 6},
+            {"core": 4, "aggregation": 16, "access": 64},
+            {"core": 8, "aggregation": 32, "access": 256},
+        ],
+        "full": [{"core": 16, "aggregation": 64, "access": 1024}],
+    },
+    "expanded-clos": {
+        "quick": [
+            {"tiers": 4, "nodes_per_tier": 4},
+            {"tiers": 6, "nodes_per_tier": 32},
+            {"tiers": 8, "nodes_per_tier": 64},
+        ],
+        "full": [{"tiers": 8, "nodes_per_tier": 256}],
+    },
+    "core-and-pod": {
+        "quick": [
+            {"cores": 2, "pods": 2, "pod_leaves": 4, "pod_aggs": 2},
+            {"cores": 4, "pods": 16, "pod_leaves": 16, "pod_aggs": 4},
+            {"cores": 8, "pods": 64, "pod_leaves": 32, "pod_aggs": 8},
+        ],
+        "full": [{"cores": 16, "pods": 128, "pod_leaves": 64, "pod_aggs": 16}],
+    },
+    "torus-2d": {
+        "quick": [{"rows": 8, "cols": 8}, {"rows": 32, "cols": 32}, {"rows": 64, "cols": 64}],
+        "full": [{"rows": 128, "cols": 128}],
+    },
+    "torus-3d": {
+        "quick": [{"x": 4, "y": 4, "z": 4}, {"x": 8, "y": 8, "z": 8}, {"x": 16, "y": 16, "z": 16}],
+        "full": [{"x": 24, "y": 24, "z": 24}],
+    },
+    "dragonfly": {
+        "quick": [
+            {"groups": 4, "routers_per_group": 4},
+            {"groups": 8, "routers_per_group": 8},
+            {"groups": 16, "routers_per_group": 16},
+        ],
+        "full": [{"groups": 32, "routers_per_group": 32}],
+    },
+    "butterfly": {
+        "quick": [{"stages": 4, "width": 8}, {"stages": 6, "width": 32}, {"stages": 8, "width": 64}],
+        "full": [{"stages": 10, "width": 256}],
+    },
+    "mesh": {
+        "quick": [{"rows": 8, "cols": 8}, {"rows": 32, "cols": 32}, {"rows": 64, "cols": 64}],
+        "full": [{"rows": 128, "cols": 128}],
+    },
+    "ring": {
+        "quick": [{"count": 16}, {"count": 256}, {"count": 1024}],
+        "full": [{"count": 4096}, {"count": 16384}],
+    },
+    "star": {
+        "quick": [{"count": 16}, {"count": 256}, {"count": 1024}],
+        "full": [{"count": 4096}, {"count": 16384}],
+    },
+}
+
+ARRANGE_MODES = ["left", "right", "top", "bottom", "distribute-horizontal", "distribute-vertical"]
+API_LADDER = {"quick": [8, 16, 24], "full": [32, 48]}
+
+# Differences below these floors are noise, whatever the ratio.
+TIME_FLOOR_SECONDS = 0.001
+MEMORY_FLOOR_KIB = 64
+
+
+@dataclass
+class Case:
+    name: str
+    group: str
+    setup: Callable[[], object]
+    run: Callable[[object], object]
+
+
+def _label(params: dict) -> str:
+    return ",".join(f"{key}={value}" for key, value in params.items())
+
+
+def _ladder(steps: dict[str, list], ladder: str) -> list:
+    return steps["quick"] + (steps["full"] if ladder == "full" else [])
+
+
+def _laid_out(topo_type: str, params: dict):
+    generated = generate_by_type(topo_type, params)
+    generated.nodes = apply_auto_layout(generated.nodes, generated.edges, topo_type, generated.params)
+    return generated
+
+
+def library_cases(ladder: str) -> Iterator[Case]:
+    for topo_type, steps in LADDERS.items():
+        for params in _ladder(steps, ladder):
+            label = f"{topo_type}[{_label(params)}]"
+            yield Case(
+                f"generate/{label}",
+                "generate",
+                lambda params=params: params,
+                lambda params, topo_type=topo_type: generate_by_type(topo_type, params),
+            )
+            yield Case(
+                f"layout/{label}",
+                "layout",
+                lambda topo_type=topo_type, params=params: generate_by_type(topo_type, params),
+                lambda generated: apply_auto_layout(
+                    generated.nodes, generated.edges, generated.topo_type, generated.params
+                ),
+            )
+
+    for params in _ladder(LADDERS["leaf-spine"], ladder):
+        yield Case(
+            f"normalize_edges/leaf-spine[{_label(params)}]",
+            "normalize_edges",
+            lambda params=params: generate_by_type("leaf-spine", params).edges,
+            normalize_edges,
+        )
+
+    for k in _ladder(API_LADDER, ladder):
+        for mode in ARRANGE_MODES:
+            yield Case(
+                f"arrange/{mode}/fat-tree[k={k}]",
+                "arrange",
+                lambda k=k: _laid_out("fat-tree", {"k": k}),
+                lambda generated, mode=mode: arrange_nodes(
+                    generated.nodes, [node["id"] for node in generated.nodes], mode
+                ),
+            )
+
+
+def api_cases(ladder: str) -> Iterator[Case]:
+    # app.db reads its settings at import time: use a scratch database, never the real one, and
+    # commit PUTs inline so their cost is measured rather than deferred to a background flush.
+    scratch = tempfile.mkdtemp(prefix="topology-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch}/bench.db"
+    os.environ["TOPOLOGY_WRITE_BEHIND_MS"] = "0"
+    from fastapi.testclient import TestClient
+
+    from app.compression import response_cache
+    from app.db import engine
+    from app.main import app
+    from app.migrations import migrate
+
+    warnings.simplefilter("ignore", DeprecationWarning)
+    # The app migrates from its lifespan, which a TestClient used outside ``with`` never runs.
+    migrate(engine)
+    client = TestClient(app)
+
+    def topology(k: int) -> dict:
+        created = client.post("/api/topologies", json={"name": f"bench k={k}"}).json()
+        generated = client.post(
+            f"/api/topologies/{created['id']}/generate", json={"topo_type": "fat-tree", "params": {"k": k}}
+        )
+        return generated.json()
+
+    def check(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.method} {response.request.url} -> {response.status_code}")
+        return response
+
+    def read_cold(body: dict):
+        response_cache.clear()
+        return check(client.get(f"/api/topologies/{body['id']}"))
+
+    for k in _ladder(API_LADDER, ladder):
+        label = f"fat-tree[k={k}]"
+        requests: list[tuple[str, Callable[[dict], object]]] = [
+            (
+                "POST generate",
+                lambda body: check(
+                    client.post(
+                        f"/api/topologies/{body['id']}/generate",
+                        json={"topo_type": body["topo_type"], "params": body["topo_params"]},
+                    )
+                ),
+            ),
+            ("GET topology (cold)", read_cold),
+            ("GET topology (cached)", lambda body: check(client.get(f"/api/topologies/{body['id']}"))),
+            (
+                "PUT topology",
+                lambda body: check(
+                    client.put(
+                        f"/api/topologies/{body['id']}",
+                        json={key: body[key] for key in ("name", "topo_type", "topo_params", "nodes", "edges")},
+                    )
+                ),
+            ),
+            (
+                "POST node",
+                lambda body: check(client.post(f"/api/topologies/{body['id']}/nodes", json={"kind": "server"})),
+            ),
+            (
+                "POST edge",
+                lambda body: check(
+                    client.post(
+                        f"/api/topologies/{body['id']}/edges",
+                        json={"source": body["nodes"][0]["id"], "target": body["nodes"][-1]["id"]},
+                    )
+                ),
+            ),
+            ("POST layout", lambda body: check(client.post(f"/api/topologies/{body['id']}/layout", json={}))),
+            (
+                "POST arrange",
+                lambda body: check(
+                    client.post(
+                        f"/api/topologies/{body['id']}/arrange",
+                        json={"node_ids": [node["id"] for node in body["nodes"]], "mode": "top"},
+                    )
+                ),
+            ),
+            (
+                "GET export (ndjson)",
+                lambda body: check(client.get(f"/api/topologies/{body['id']}/export?format=ndjson")),
+            ),
+        ]
+        for request_name, run in requests:
+            yield Case(f"api/{request_name}/{label}", "api", lambda k=k: topology(k), run)
+
+
+def measure(case: Case, repeat: int, budget: float) -> dict:
+    """Time up to ``repeat`` runs (stopping early past ``budget`` seconds), then trace memory in one more.
+
+    Regressions are judged on the best run, which is far less sensitive to
+    scheduler noise than the median.
+    """
+    subject = case.setup()
+    timings: list[float] = []
+    spent = 0.0
+    # Like timeit: collector pauses depend on whatever else is alive, not on the code under test.
+    gc.collect()
+    gc.disable()
+    try:
+        while len(timings) < repeat and (not timings or spent < budget):
+            start = time.perf_counter()
+            case.run(subject)
+            elapsed = time.perf_counter() - start
+            timings.append(elapsed)
+            spent += elapsed
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        case.run(subject)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "group": case.group,
+        "seconds": min(timings),
+        "median_seconds": statistics.median(timings),
+        "peak_kib": max(0, peak - baseline) / 1024,
+        "repeats": len(timings),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, floor in (("seconds", TIME_FLOOR_SECONDS), ("peak_kib", MEMORY_FLOOR_KIB)):
+            before, after = previous[metric], current[metric]
+            if after > before * (1 + threshold) and after - before > floor:
+                regressions.append(f"{name}: {metric} {before:.4g} -> {after:.4g} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ladder", choices=["quick", "full"], default="quick")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default: 5)")
+    parser.add_argument("--budget", type=float, default=2.0, help="stop repeating a case after this many seconds")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail on regressions against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown/growth ratio (default: 0.25)")
+    parser.add_argument("--no-api", action="store_true", help="skip the endpoint cases")
+    args = parser.parse_args(argv)
+
+    cases = list(library_cases(args.ladder))
+    if not args.no_api:
+        cases.extend(api_cases(args.ladder))
+    cases = [case for case in cases if args.filter in case.name]
+
+    results: dict[str, dict] = {}
+    for case in cases:
+        results[case.name] = measure(case, args.repeat, args.budget)
+        result = results[case.name]
+        print(f"{case.name:<64}{result['seconds'] * 1000:>12.2f} ms{result['peak_kib']:>14.0f} KiB", flush=True)
+
+    if args.save:
+        document = {
+            "meta": {
+                "created": datetime.now(UTC).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "ladder": args.ladder,
+            },
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2, sort_keys=True)
+            handle.write("\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        missing = len([name for name in results if name not in baseline])
+        print(f"\ncompared {len(results) - missing} cases against {args.compare} ({missing} not in baseline)")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
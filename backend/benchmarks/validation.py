@@ -0,0 +1,65 @@
+"""Compare bulk graph validation with per-item Pydantic models on large payloads.
+
+For each case it times:
+
+- ``graph_errors``: the single pass ``TopologyPayload`` runs, referential integrity included
+- ``TypeAdapter(list[NodeModel])`` plus ``list[EdgeModel]``: per-item models, which check
+  shapes only; ids, endpoints and handles would still need a pass of their own
+- ``TopologyPayload.model_validate_json``: the whole PUT body, JSON parsing included
+
+Run from ``backend/``:
+
+    python -m benchmarks.validation
+"""
+
+from __future__ import annotations
+
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from app.bundles import bundle_edges
+from app.schemas import EdgeModel, NodeModel, TopologyPayload
+from app.topology_generators import generate_by_type
+from app.validation import graph_errors
+
+CASES = [
+    ("fat-tree", {"k": 32}),
+    ("torus-3d", {"x": 24, "y": 24, "z": 24}),
+    ("leaf-spine", {"spines": 64, "leaves": 1600}),
+]
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    nodes_adapter = TypeAdapter(list[NodeModel])
+    edges_adapter = TypeAdapter(list[EdgeModel])
+    print(f"{'case':<34}{'nodes':>8}{'edges':>9}{'bulk ms':>10}{'models ms':>11}{'PUT ms':>9}{'bundled PUT ms':>16}")
+    for topo_type, params in CASES:
+        result = generate_by_type(topo_type, params)
+        nodes, edges = result.nodes, result.edges
+        assert not graph_errors(nodes, edges)
+        body = json.dumps({"topo_type": topo_type, "nodes": nodes, "edges": edges})
+        bundled = json.dumps({"topo_type": topo_type, "nodes": nodes, "edges": bundle_edges(edges)})
+        bulk = _best_of(lambda: graph_errors(nodes, edges))
+        models = _best_of(lambda: (nodes_adapter.validate_python(nodes), edges_adapter.validate_python(edges)))
+        put = _best_of(lambda: TopologyPayload.model_validate_json(body))
+        put_bundled = _best_of(lambda: TopologyPayload.model_validate_json(bundled))
+        label = f"{topo_type} {params}"
+        print(
+            f"{label:<34}{len(nodes):>8}{len(edges):>9}{bulk * 1000:>10.1f}{models * 1000:>11.1f}"
+            f"{put * 1000:>9.1f}{put_bundled * 1000:>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare JSON and columnar topology encodings: payload size and decode time.
+
+Run from ``backend/``:
+
+    python -m benchmarks.wire_format
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import time
+from datetime import datetime
+
+from app.topology_generators import generate_by_type
+from app.topology_ops import normalize_edges
+from app.wire import decode_columnar, encode_columnar
+
+CASES = [
+    ("leaf-spine", {"spines": 16, "leaves": 256}),
+    ("fat-tree", {"k": 32}),
+    ("torus-3d", {"x": 24, "y": 24, "z": 24}),
+    ("leaf-spine", {"spines": 64, "leaves": 1600}),
+]
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_case(topo_type: str, params: dict) -> dict:
+    generated = generate_by_type(topo_type, params)
+    body = {
+        "id": 1,
+        "name": topo_type,
+        "topo_type": generated.topo_type,
+        "topo_params": generated.params,
+        "nodes": generated.nodes,
+        "edges": normalize_edges(generated.edges),
+        "updated_at": datetime(2026, 1, 1).isoformat(),
+        "version": 1,
+    }
+    json_bytes = json.dumps(body).encode()
+    columnar_bytes = json.dumps(encode_columnar(body), separators=(",", ":")).encode()
+    assert decode_columnar(json.loads(columnar_bytes)) == json.loads(json_bytes)
+    return {
+        "case": f"{topo_type} {params}",
+        "edges": len(generated.edges),
+        "json_kb": len(json_bytes) / 1024,
+        "columnar_kb": len(columnar_bytes) / 1024,
+        "json_gzip_kb": len(gzip.compress(json_bytes, 6)) / 1024,
+        "columnar_gzip_kb": len(gzip.compress(columnar_bytes, 6)) / 1024,
+        "json_decode_ms": _best_of(lambda: json.loads(json_bytes)) * 1000,
+        "columnar_decode_ms": _best_of(lambda: decode_columnar(json.loads(columnar_bytes))) * 1000,
+        "columnar_encode_ms": _best_of(lambda: encode_columnar(body)) * 1000,
+    }
+
+
+def main() -> None:
+    columns = [
+        "edges",
+        "json_kb",
+        "columnar_kb",
+        "json_gzip_kb",
+        "columnar_gzip_kb",
+        "json_decode_ms",
+        "columnar_decode_ms",
+        "columnar_encode_ms",
+    ]
+    print(f"{'case':<40}" + "".join(f"{column:>20}" for column in columns))
+    for topo_type, params in CASES:
+        result = run_case(topo_type, params)
+        print(f"{result['case']:<40}" + "".join(f"{result[column]:>20.1f}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import warnings
+
+# app.db reads its settings at import time, so point it at a scratch database first.
+_scratch = tempfile.mkdtemp(prefix="topology-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+# Commit every PUT immediately; tests/test_write_buffer.py builds its own buffers.
+os.environ["TOPOLOGY_WRITE_BEHIND_MS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+warnings.simplefilter("ignore", DeprecationWarning)
+
+
+@pytest.fixture(scope="session")
+def client():
+    # ``with`` runs the app's startup and shutdown.
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def create(client):
+    """Create a topology, optionally generated, and return its response body."""
+
+    def create(name: str = "test", topo_type: str | None = None, **params) -> dict:
+        body = client.post("/api/topologies", json={"name": name}).json()
+        if topo_type is not None:
+            response = client.post(
+                f"/api/topologies/{body['id']}/generate", json={"topo_type": topo_type, "params": params}
+            )
+            assert response.status_code == 200, response.text
+            body = response.json()
+        return body
+
+    return create
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db
+from app.compression import cached_encoded_body, encoded_body
+
+
+def test_async_engine_uses_aiosqlite():
+    assert db.ASYNC_DATABASE_URL == db.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    assert db.async_engine.dialect.driver == "aiosqlite"
+
+
+def test_cached_encoded_body_never_renders():
+    key = ("test-cached-encoded-body", 1)
+    assert cached_encoded_body(key, None) is None
+    encoded_body(key, None, lambda: b"x" * 4096)
+    assert cached_encoded_body(key, None) == (b"x" * 4096, "identity")
+    # A compressed copy has not been made yet, so serving it would need compression.
+    assert cached_encoded_body(key, "gzip") is None
+    encoded_body(key, "gzip", lambda: b"unused")
+    assert cached_encoded_body(key, "gzip")[1] == "gzip"
+
+
+def test_async_crud_round_trip(client):
+    created = client.post("/api/topologies", json={"name": "async"}).json()
+    url = f"/api/topologies/{created['id']}"
+    assert created["version"] == 1
+    assert any(item["id"] == created["id"] for item in client.get("/api/topologies").json())
+    assert client.get(url).json()["name"] == "async"
+    assert client.delete(url).json() == {"status": "deleted"}
+    assert client.get(url).status_code == 404
+    assert client.delete(url).status_code == 404
+
+
+def test_concurrent_reads_alongside_writes(client, create):
+    topology = create("concurrent", "leaf-spine", spines=4, leaves=16)
+    url = f"/api/topologies/{topology['id']}"
+
+    def read(_):
+        response = client.get(url)
+        assert response.status_code == 200
+        return response.json()["version"]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        reads = pool.map(read, range(32))
+        for index in range(4):
+            assert client.patch(f"{url}/nodes/spine-1", json={"label": f"S{index}"}).status_code == 200
+        versions = list(reads)
+    assert set(versions) <= set(range(topology["version"], topology["version"] + 5))
+    assert client.get(url).json()["version"] == topology["version"] + 4
@@ -0,0 +1,38 @@
+import json
+
+from benchmarks import suite
+from benchmarks.suite import MEMORY_FLOOR_KIB, TIME_FLOOR_SECONDS, compare, library_cases, main
+
+
+def _result(seconds: float, peak_kib: float = 0) -> dict:
+    return {"group": "generate", "seconds": seconds, "median_seconds": seconds, "peak_kib": peak_kib, "repeats": 1}
+
+
+def test_compare_ignores_noise_below_the_floors():
+    baseline = {"a": _result(0.010), "b": _result(0.0001, 10), "c": _result(0.010, 1000)}
+    results = {
+        "a": _result(0.020),
+        "b": _result(0.0001 + TIME_FLOOR_SECONDS / 2, 10 + MEMORY_FLOOR_KIB / 2),
+        "c": _result(0.011, 2000),
+        "new": _result(1.0),
+    }
+    regressions = compare(results, baseline, threshold=0.25)
+    assert [line.split(":")[0] for line in regressions] == ["a", "c"]
+    assert "seconds" in regressions[0] and "peak_kib" in regressions[1]
+    assert compare(results, baseline, threshold=2.0) == []
+
+
+def test_suite_saves_and_compares_baselines(tmp_path, capsys, monkeypatch):
+    name = next(case.name for case in library_cases("quick") if case.name.startswith("generate/"))
+    path = tmp_path / "baseline.json"
+    assert main(["--no-api", "--filter", name, "--repeat", "1", "--save", str(path)]) == 0
+    document = json.loads(path.read_text())
+    assert list(document["results"]) == [name]
+    assert document["meta"]["ladder"] == "quick"
+
+    # Pretend the baseline was far faster; the case itself is too quick to clear the usual noise floor.
+    monkeypatch.setattr(suite, "TIME_FLOOR_SECONDS", 0.0)
+    document["results"][name]["seconds"] = 1e-9
+    path.write_text(json.dumps(document))
+    assert main(["--no-api", "--filter", name, "--repeat", "1", "--compare", str(path)]) == 1
+    assert "1 regression(s)" in capsys.readouterr().out
@@ -0,0 +1,42 @@
+from app.bundles import bundle_edges, expand_edges, is_bundle
+from app.topology_generators import generate_by_type
+
+
+def test_bundled_response_expands_to_default(client, create):
+    topology = create("bundles", "leaf-spine", spines=4, leaves=8)
+    url = f"/api/topologies/{topology['id']}"
+    expanded = client.get(url).json()["edges"]
+    bundled = client.get(url, params={"bundles": "true"}).json()["edges"]
+    assert any(is_bundle(edge) for edge in bundled)
+    assert len(bundled) < len(expanded) == 32
+    assert expand_edges(bundled) == expanded
+
+
+def test_editing_a_member_splits_its_bundle(client, create):
+    topology = create("bundles", "leaf-spine", spines=2, leaves=4)
+    url = f"/api/topologies/{topology['id']}"
+    member = topology["edges"][0]
+    response = client.patch(f"{url}/edges/{member['id']}", json={"label": "uplink"})
+    assert response.status_code == 200, response.text
+    edges = client.get(url).json()["edges"]
+    assert len(edges) == 8
+    assert next(edge for edge in edges if edge["id"] == member["id"])["label"] == "uplink"
+    bundled = client.get(url, params={"bundles": "true"}).json()["edges"]
+    assert expand_edges(bundled) == edges
+
+
+def test_put_accepts_bundle_records(client, create):
+    source = create("bundles", "leaf-spine", spines=2, leaves=3)
+    bundled = client.get(f"/api/topologies/{source['id']}", params={"bundles": "true"}).json()
+    target = create("copy")
+    document = {key: bundled[key] for key in ("name", "topo_type", "topo_params", "nodes", "edges")}
+    response = client.put(f"/api/topologies/{target['id']}", json=document)
+    assert response.status_code == 200, response.text
+    assert response.json()["edges"] == source["edges"]
+
+
+def test_bundle_edges_round_trip_every_generator():
+    for topo_type in ("leaf-spine", "fat-tree", "butterfly", "dragonfly", "mesh", "three-tier"):
+        edges = generate_by_type(topo_type, {}).edges
+        assert expand_edges(bundle_edges(edges)) == edges
+    assert len(bundle_edges(generate_by_type("leaf-spine", {"spines": 4, "leaves": 8}).edges)) == 1
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.bundles import bundle_edges
+from app.chunks import _PositionedLeaves, chunk_stats, split_graph
+from app.db import engine
+from app.topology_generators import generate_by_type
+
+
+def _stats() -> dict:
+    with engine.connect() as connection:
+        return chunk_stats(connection)
+
+
+def test_split_graph_reassembles_the_text():
+    nodes = generate_by_type("fat-tree", {"k": 8}).nodes
+    text = json.dumps(nodes)
+    split = split_graph(text)
+    assert len(split.leaves) > 1
+    assert "[" + ", ".join(data for _, data in split.leaves) + "]" == text
+    assert split.size == len(text)
+    assert json.loads(split.listing) == [digest for digest, _ in split.leaves]
+    assert split_graph("[]").leaves == ()
+
+
+def test_leaves_are_put_back_in_list_order():
+    # SQLite may aggregate the positioned leaves in any order.
+    records = "\x1e".join(['2:{"id": 3}', '0:{"id": 1}, {"id": 1.5}', '1:{"id": "a:b"}'])
+    text = _PositionedLeaves().process_result_value(records, None)
+    assert json.loads(text) == [{"id": 1}, {"id": 1.5}, {"id": "a:b"}, {"id": 3}]
+    assert _PositionedLeaves().process_result_value("", None) == "[]"
+
+
+def test_large_graphs_read_back_in_order(client, create):
+    topology = create("ordered", "fat-tree", k=12)
+    assert client.get(f"/api/topologies/{topology['id']}").json()["nodes"] == topology["nodes"]
+
+
+def test_only_sqlite_is_supported():
+    env = {**os.environ, "DATABASE_URL": "postgresql://localhost/topology"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.db"],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "Only SQLite databases are supported" in result.stderr
+
+
+def test_split_graph_counts_bundled_edges():
+    edges = generate_by_type("leaf-spine", {"spines": 4, "leaves": 8}).edges
+    folded = bundle_edges(edges)
+    assert len(folded) < len(edges)
+    assert split_graph(json.dumps(folded)).entities == split_graph(json.dumps(edges)).entities == len(edges)
+
+
+def test_identical_groups_share_chunks():
+    nodes = generate_by_type("fat-tree", {"k": 8}).nodes
+    changed = [*nodes[:-1], {**nodes[-1], "data": {**nodes[-1]["data"], "label": "changed"}}]
+    before = {digest for digest, _ in split_graph(json.dumps(nodes)).leaves}
+    after = {digest for digest, _ in split_graph(json.dumps(changed)).leaves}
+    assert len(after - before) == 1
+
+
+def test_fork_shares_the_graph(client, create):
+    base = create("base", "leaf-spine", spines=2, leaves=4)
+    stored = _stats()
+    fork = client.post(f"/api/topologies/{base['id']}/fork", json={}).json()
+    assert fork["name"] == "base (fork)"
+    forked = _stats()
+    assert (forked["stored_bytes"], forked["leaf_chunks"]) == (stored["stored_bytes"], stored["leaf_chunks"])
+    assert forked["inline_bytes"] > stored["inline_bytes"]
+    copy = client.get(f"/api/topologies/{fork['id']}").json()
+    assert copy["version"] == 1
+    assert (copy["nodes"], copy["edges"]) == (base["nodes"], base["edges"])
+    assert client.post("/api/topologies/999999/fork").status_code == 404
+
+    assert client.delete(f"/api/topologies/{base['id']}").status_code == 200
+    assert client.get(f"/api/topologies/{fork['id']}").json()["nodes"] == base["nodes"]
+
+
+def test_unreferenced_chunks_are_deleted(client, create):
+    stored = _stats()
+    topology = create("scratch", "torus-3d", x=3, y=3, z=4)
+    assert _stats()["leaf_chunks"] > stored["leaf_chunks"]
+    assert client.delete(f"/api/topologies/{topology['id']}").status_code == 200
+    assert _stats() == stored
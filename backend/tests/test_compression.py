@@ -0,0 +1,100 @@
+import gzip
+
+from sqlalchemy import text
+
+from app import main
+from app.compression import ResponseCache, choose_encoding, encoded_body, response_cache
+from app.db import engine
+
+
+def test_choose_encoding_honours_quality():
+    assert choose_encoding(None) == "identity"
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("gzip;q=0") == "identity"
+    assert choose_encoding("*;q=0.5") == "gzip"
+    assert choose_encoding("deflate, identity") == "identity"
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_bytes=10)
+    cache.put(("a",), b"1234", "identity")
+    cache.put(("b",), b"1234", "identity")
+    assert cache.get(("a",)) is not None
+    cache.put(("c",), b"1234", "identity")
+    assert cache.get(("b",)) is None
+    assert cache.size == 8
+    cache.put(("d",), b"x" * 11, "identity")
+    assert cache.get(("d",)) is None
+
+
+def test_encoded_body_renders_once_per_key():
+    calls = []
+
+    def render() -> bytes:
+        calls.append(1)
+        return b"{}" * 2048
+
+    key = ("test-encoded-body", 1)
+    body, encoding = encoded_body(key, "gzip", render)
+    assert encoding == "gzip" and gzip.decompress(body) == b"{}" * 2048
+    assert encoded_body(key, None, render) == (b"{}" * 2048, "identity")
+    assert encoded_body(key, "gzip", render) == (body, "gzip")
+    assert len(calls) == 1
+
+
+def test_topology_get_is_compressed_and_revalidated(client, create):
+    topology = create("compressed", "leaf-spine", spines=4, leaves=16)
+    url = f"/api/topologies/{topology['id']}"
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["version"] == topology["version"]
+    etag = response.headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    client.patch(f"{url}/nodes/spine-1", json={"label": "Renamed"})
+    fresh = client.get(url, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()["version"] == topology["version"] + 1
+    assert fresh.headers["etag"] != etag
+
+
+def test_cached_body_is_served_without_rendering(client, create):
+    topology = create("cached")
+    url = f"/api/topologies/{topology['id']}"
+    first = client.get(url).content
+    key = (topology["id"], topology["version"], "application/json", False, "identity")
+    assert response_cache.get(key) == (first, "identity")
+    response_cache.put(key, b'{"cached": true}', "identity")
+    assert client.get(url).json() == {"cached": True}
+    response_cache.clear()
+    assert client.get(url).content == first
+
+
+def test_small_and_streamed_responses(client, create):
+    small = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    topology = create("streamed", "leaf-spine", spines=4, leaves=16)
+    export = client.get(f"/api/topologies/{topology['id']}/export", headers={"Accept-Encoding": "gzip"})
+    assert export.headers["content-encoding"] == "gzip"
+    assert export.text.startswith("<?xml")
+
+
+def test_body_is_cached_under_the_version_it_was_rendered_from(client, create, monkeypatch):
+    topology = create("cached")
+    url = f"/api/topologies/{topology['id']}"
+    load = main.get_topology_or_404_async
+
+    async def load_after_a_commit(db, topology_id):
+        # Another request commits between the version lookup and the render.
+        with engine.begin() as connection:
+            connection.execute(
+                text("UPDATE topologies SET version = version + 1, name = 'moved' WHERE id = :id"), {"id": topology_id}
+            )
+        return await load(db, topology_id)
+
+    monkeypatch.setattr(main, "get_topology_or_404_async", load_after_a_commit)
+    response_cache.clear()
+    assert client.get(url).json()["name"] == "moved"
+    key = (topology["id"], topology["version"], "application/json", False, "identity")
+    assert response_cache.get(key) is None
+    assert response_cache.get((topology["id"], topology["version"] + 1, *key[2:])) is not None
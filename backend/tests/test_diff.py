@@ -0,0 +1,47 @@
+from app import diff as diff_module
+
+
+def test_diff_of_an_edited_fork(client, create):
+    base = create("base", "leaf-spine", spines=2, leaves=4)
+    fork = client.post(f"/api/topologies/{base['id']}/fork", json={"name": "edited"}).json()["id"]
+    url = f"/api/topologies/{fork}"
+    client.patch(f"{url}/nodes/spine-1", json={"position": {"x": 5, "y": 6}})
+    client.patch(f"{url}/nodes/spine-2", json={"label": "Renamed"})
+    client.delete(f"{url}/nodes/leaf-4")
+    client.post(f"{url}/nodes", json={"kind": "server", "id": "srv"})
+    client.post(f"{url}/edges", json={"source": "srv", "target": "leaf-1", "id": "srv-link"})
+
+    response = client.get(f"/api/topologies/{base['id']}/diff/{fork}")
+    assert response.status_code == 200, response.text
+    assert response.headers["etag"]
+    diff = response.json()
+    assert diff["topology"] == {"name": {"before": "base", "after": "edited"}}
+    assert diff["summary"]["nodes"] == {"added": 1, "removed": 1, "modified": 1, "moved": 1}
+    assert diff["summary"]["edges"] == {"added": 1, "removed": 2, "modified": 0}
+    assert [node["id"] for node in diff["nodes"]["added"]] == ["srv"]
+    assert [node["id"] for node in diff["nodes"]["removed"]] == ["leaf-4"]
+    assert diff["nodes"]["modified"][0]["id"] == "spine-2"
+    assert diff["nodes"]["modified"][0]["fields"] == ["data.label"]
+    assert diff["nodes"]["moved"][0] == {"id": "spine-1", "before": {"x": 0, "y": 0}, "after": {"x": 5.0, "y": 6.0}}
+    assert [edge["id"] for edge in diff["edges"]["added"]] == ["srv-link"]
+
+    same = client.get(f"/api/topologies/{base['id']}/diff/{base['id']}").json()
+    assert same["summary"]["nodes"] == {"added": 0, "removed": 0, "modified": 0, "moved": 0}
+    assert client.get(f"/api/topologies/{base['id']}/diff/999999").status_code == 404
+
+
+def test_streamed_diff_matches_the_cached_one(client, create, monkeypatch):
+    before = create("before", "leaf-spine", spines=2, leaves=4)
+    after = create("after", "fat-tree", k=4)
+    url = f"/api/topologies/{before['id']}/diff/{after['id']}"
+    response = client.get(url)
+    cached = response.json()
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert cached["summary"]["nodes"]["added"] == len(after["nodes"])
+    monkeypatch.setattr(diff_module, "DIFF_STREAM_THRESHOLD", 0)
+    client.patch(f"/api/topologies/{after['id']}/nodes/core-1", json={"label": "Core"})
+    streamed = client.get(url)
+    assert streamed.headers["etag"] != response.headers["etag"]
+    assert "content-length" not in streamed.headers and "content-length" in response.headers
+    assert list(streamed.json()) == list(cached)
+    assert streamed.json()["summary"] == cached["summary"]
@@ -0,0 +1,62 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+GRAPHML = "{http://graphml.graphdrawing.org/xmlns}"
+
+
+def _export(client, topology_id: int, fmt: str):
+    response = client.get(f"/api/topologies/{topology_id}/export", params={"format": fmt})
+    assert response.status_code == 200, response.text
+    return response
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_imports_back(client, create, fmt):
+    source = create("export", "leaf-spine", spines=2, leaves=3)
+    exported = _export(client, source["id"], fmt)
+    url = f"/api/topologies/{create('copy')['id']}"
+    report = client.post(f"{url}/import", params={"format": fmt, "mode": "replace"}, content=exported.text).json()
+    assert report["error_count"] == 0
+    copy = client.get(url).json()
+    for node, original in zip(copy["nodes"], source["nodes"], strict=True):
+        assert (node["id"], node["position"]) == (original["id"], original["position"])
+        assert {key: node["data"][key] for key in original["data"]} == original["data"]
+    assert [(e["source"], e["target"]) for e in copy["edges"]] == [(e["source"], e["target"]) for e in source["edges"]]
+
+
+def test_ndjson_export_leads_with_topology(client, create):
+    source = create("export", "ring", count=3)
+    lines = [json.loads(line) for line in _export(client, source["id"], "ndjson").text.splitlines()]
+    assert lines[0] == {"type": "topology", "name": "export", "topo_type": "ring", "topo_params": source["topo_params"]}
+    assert [line["type"] for line in lines[1:]] == ["node"] * 3 + ["edge"] * 3
+
+
+def test_graphml_export(client, create):
+    source = create("graphml", "leaf-spine", spines=2, leaves=3)
+    response = _export(client, source["id"], "graphml")
+    graph = ET.fromstring(response.content).find(f"{GRAPHML}graph")
+    assert graph.get("id") == f"topology-{source['id']}"
+    nodes = [node.get("id") for node in graph.iter(f"{GRAPHML}node")]
+    assert nodes == [node["id"] for node in source["nodes"]]
+    edges = [(edge.get("source"), edge.get("target")) for edge in graph.iter(f"{GRAPHML}edge")]
+    assert edges == [(edge["source"], edge["target"]) for edge in source["edges"]]
+
+
+def test_dot_export(client, create):
+    source = create("dot", "ring", count=3)
+    text = _export(client, source["id"], "dot").text
+    assert text.startswith('digraph "dot" {')
+    assert text.count(" -> ") == 3
+
+
+def test_exports_are_stable_and_revalidate(client, create):
+    source = create("etag", "ring", count=4)
+    first = _export(client, source["id"], "graphml")
+    assert _export(client, source["id"], "graphml").content == first.content
+    url = f"/api/topologies/{source['id']}/export"
+    again = client.get(url, params={"format": "graphml"}, headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert _export(client, source["id"], "dot").headers["etag"] != first.headers["etag"]
+    assert client.get("/api/topologies/999999/export").status_code == 404
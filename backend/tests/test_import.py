@@ -0,0 +1,131 @@
+import json
+
+from app import importers
+from app.db import SessionLocal
+from app.models import Topology
+
+
+def _import(client, url: str, body: str, fmt: str | None = None, **params) -> dict:
+    if fmt is not None:
+        params["format"] = fmt
+    response = client.post(f"{url}/import", params=params, content=body)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _lines(*rows: dict) -> str:
+    return "\n".join(json.dumps(row) for row in rows)
+
+
+def test_ndjson_import_reports_bad_rows(client, create):
+    url = f"/api/topologies/{create('import')['id']}"
+    body = "\n".join(
+        [
+            '{"id": "a", "kind": "switch", "tier": 2}',
+            '{"id": "b", "type": "custom", "position": {"x": 5, "y": 6}, "data": {"kind": "server", "label": "B"}}',
+            '{"id": "a", "kind": "rack"}',
+            '{"id": "c", "kind": "bogus"}',
+            "not json",
+            "[1, 2]",
+            "",
+            '{"id": "ab", "source": "a", "target": "b"}',
+            '{"id": "ax", "source": "a", "target": "missing"}',
+        ]
+    )
+    report = _import(client, url, body)
+    assert (report["rows"], report["nodes_added"], report["edges_added"], report["error_count"]) == (8, 2, 1, 5)
+    assert [error["row"] for error in report["errors"]] == [3, 4, 5, 6, 9]
+    assert report["errors"][0]["error"] == "Duplicate node id 'a'"
+    assert report["errors"][-1]["error"] == "Unknown node 'missing'"
+
+    topology = client.get(url).json()
+    assert [node["id"] for node in topology["nodes"]] == ["a", "b"]
+    assert topology["nodes"][1]["position"] == {"x": 5.0, "y": 6.0}
+    assert topology["nodes"][1]["data"]["label"] == "B"
+    assert [edge["id"] for edge in topology["edges"]] == ["ab"]
+
+
+def test_bad_handles_and_positions_are_row_errors(client, create):
+    url = f"/api/topologies/{create('import')['id']}"
+    body = "\n".join(
+        [
+            '{"id": "a", "kind": "switch"}',
+            '{"id": "b", "kind": "server", "x": NaN, "y": 1}',
+            '{"id": "c", "kind": "server", "position": {"x": 1, "y": Infinity}}',
+            '{"id": "d", "kind": "server", "x": 1, "y": 2}',
+            '{"id": "ad", "source": "a", "target": "d", "sourceHandle": 1}',
+            '{"id": "da", "source": "d", "target": "a", "targetHandle": "bogus"}',
+            '{"id": "ad2", "source": "a", "target": "d", "sourceHandle": "right", "targetHandle": "left-in"}',
+            "not json",
+        ]
+    )
+    report = _import(client, url, body)
+    assert (report["nodes_added"], report["edges_added"], report["error_count"]) == (2, 1, 5)
+    assert [error["row"] for error in report["errors"]] == [2, 3, 5, 6, 8]
+    assert report["errors"][0]["error"] == "x must be a finite number"
+    assert report["errors"][2]["error"] == "Unknown sourceHandle 1"
+    assert report["progress"][0]["errors"] == 5
+    (edge,) = client.get(url).json()["edges"]
+    assert (edge["sourceHandle"], edge["targetHandle"]) == ("right-out", "left-in")
+
+
+def test_csv_import_infers_row_types(client, create):
+    url = f"/api/topologies/{create('import')['id']}"
+    body = "id,kind,label,source,target\nr1,rack,Rack A,,\nr2,rack,,,\n,,,r1,r2\n"
+    response = client.post(f"{url}/import", content=body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["nodes_added"], report["edges_added"], report["error_count"]) == (2, 1, 0)
+    topology = client.get(url).json()
+    assert [node["data"]["label"] for node in topology["nodes"]] == ["Rack A", "Rack 2"]
+    assert (topology["edges"][0]["source"], topology["edges"][0]["target"]) == ("r1", "r2")
+
+
+def test_csv_rejects_bad_tiers_and_ragged_rows(client, create):
+    url = f"/api/topologies/{create('import')['id']}"
+    body = "id,kind,tier\nr1,rack,0\nr2,rack\nr3,rack,2,extra\nr4,server,\nr5,bogus,1\n"
+    report = _import(client, url, body, "csv")
+    assert (report["rows"], report["nodes_added"], report["error_count"]) == (5, 1, 4)
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4, 6]
+    assert sum(chunk["errors"] for chunk in report["progress"]) == 4
+    assert [(node["id"], node["data"]["tier"]) for node in client.get(url).json()["nodes"]] == [("r4", 1)]
+
+
+def test_append_and_replace(client, create):
+    url = f"/api/topologies/{create('import')['id']}"
+    _import(client, url, _lines({"id": "a"}), "ndjson")
+    report = _import(client, url, _lines({"id": "a"}, {"id": "b"}), "ndjson")
+    assert (report["nodes_added"], report["error_count"]) == (1, 1)
+    report = _import(client, url, _lines({"id": "a"}), "ndjson", mode="replace")
+    assert (report["nodes_added"], report["error_count"]) == (1, 0)
+    assert [node["id"] for node in client.get(url).json()["nodes"]] == ["a"]
+
+
+def test_progress_is_reported_per_chunk(client, create, monkeypatch):
+    monkeypatch.setattr(importers, "IMPORT_CHUNK_ROWS", 2)
+    url = f"/api/topologies/{create('import')['id']}"
+    report = _import(client, url, _lines({"id": "a"}, {"id": "b"}, {"id": "a"}, {"id": "c"}, {"id": "d"}), "ndjson")
+    assert report["progress"] == [
+        {"rows": 2, "nodes": 2, "edges": 0, "errors": 0},
+        {"rows": 4, "nodes": 1, "edges": 0, "errors": 1},
+        {"rows": 5, "nodes": 1, "edges": 0, "errors": 0},
+    ]
+
+
+def test_import_into_missing_topology(client):
+    assert client.post("/api/topologies/999999/import", content="").status_code == 404
+
+
+def test_import_that_leaves_an_invalid_graph_is_rejected(client, create):
+    topology = create("import")
+    url = f"/api/topologies/{topology['id']}"
+    # Stored before the rules were enforced.
+    with SessionLocal() as db:
+        stored = db.get(Topology, topology["id"])
+        stored.edges_json = json.dumps([{"id": "dangling", "source": "x", "target": "y"}])
+        stored.version += 1
+        db.commit()
+    response = client.post(f"{url}/import", content=_lines({"id": "a"}))
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "edges", 0, "source"]
+    assert client.get(url).json()["nodes"] == []
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import main
+from app.crud import get_topology, update_topology
+from app.db import SessionLocal, engine
+from app.invalidation import DataVersionWatch, TopologyVersions
+from app.schemas import TopologyPayload
+
+
+def _bump(topology_id: int) -> None:
+    """Commit a write to the topology from another connection, as another worker would."""
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE topologies SET version = version + 1, name = 'elsewhere' WHERE id = :id"), {"id": topology_id}
+        )
+
+
+def test_sqlite_runs_in_wal_mode():
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+
+def test_data_version_watch_sees_other_connections(create):
+    watch = DataVersionWatch(engine)
+    watch.changed()
+    assert not watch.changed()
+    _bump(create("watched")["id"])
+    assert watch.changed()
+    assert not watch.changed()
+
+
+def test_cached_versions_follow_commits_elsewhere(create):
+    topology = create("versions")
+    versions = TopologyVersions(engine)
+    with SessionLocal() as db:
+        assert versions.get(db, topology["id"]) == topology["version"]
+        _bump(topology["id"])
+        assert versions.get(db, topology["id"]) == topology["version"] + 1
+        assert versions.get(db, 999999) is None
+
+
+def test_get_serves_a_write_from_another_worker(client, create):
+    topology = create("versions")
+    url = f"/api/topologies/{topology['id']}"
+    assert client.get(url).json()["version"] == topology["version"]
+    _bump(topology["id"])
+    fresh = client.get(url).json()
+    assert (fresh["name"], fresh["version"]) == ("elsewhere", topology["version"] + 1)
+
+
+def test_lost_race_is_a_conflict(client, create, monkeypatch):
+    topology = create("race", "ring", count=3)
+    read_graph = main.read_topology_graph
+
+    def read_then_lose_the_race(row):
+        graph = read_graph(row)
+        _bump(row.id)
+        return graph
+
+    monkeypatch.setattr(main, "read_topology_graph", read_then_lose_the_race)
+    response = client.patch(f"/api/topologies/{topology['id']}/nodes/{topology['nodes'][0]['id']}", json={"label": "x"})
+    assert response.status_code == 409
+    monkeypatch.undo()
+    assert client.get(f"/api/topologies/{topology['id']}").json()["name"] == "elsewhere"
+
+
+def test_full_replace_retries_on_top_of_the_newer_row(create):
+    topology = create("retry")
+    payload = TopologyPayload(name="replaced")
+    with SessionLocal() as db:
+        row = get_topology(db, topology["id"])
+        _bump(topology["id"])
+        row = update_topology(db, row, payload)
+        assert (row.name, row.version) == ("replaced", topology["version"] + 2)
+
+    with SessionLocal() as db:
+        row = get_topology(db, topology["id"])
+        _bump(topology["id"])
+        with pytest.raises(StaleDataError):
+            update_topology(db, row, payload, retries=1)
@@ -0,0 +1,48 @@
+def _lod(client, topology_id: int, *expand: str) -> dict:
+    response = client.get(f"/api/topologies/{topology_id}/lod", params={"expand": list(expand)})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_collapsed_fat_tree(client, create):
+    topology = create("lod", "fat-tree", k=4)
+    view = _lod(client, topology["id"])
+    groups = {group["id"]: group for group in view["groups"]}
+    assert set(groups) == {"core", "pod-1", "pod-2", "pod-3", "pod-4"}
+    assert not any(group["expanded"] for group in groups.values())
+    assert (groups["pod-1"]["nodes"], groups["pod-1"]["edges"]) == (4, 4)
+    assert {node["id"] for node in view["nodes"]} == {f"group:{group}" for group in groups}
+    # Every link between a pod and the core is folded into one aggregate edge.
+    counts = {(edge["source"], edge["target"]): edge["data"]["count"] for edge in view["edges"]}
+    assert counts == {("group:core", f"group:pod-{pod}"): 4 for pod in range(1, 5)}
+    assert sum(counts.values()) + 4 * 4 == len(topology["edges"])
+
+
+def test_expanded_groups_show_their_members(client, create):
+    topology = create("lod", "fat-tree", k=4)
+    view = _lod(client, topology["id"], "pod-1", "core")
+    members = {node["id"] for node in topology["nodes"] if node["id"].startswith(("pod-1-", "core-"))}
+    shown = {node["id"] for node in view["nodes"]}
+    assert members < shown
+    assert shown - members == {"group:pod-2", "group:pod-3", "group:pod-4"}
+    assert all(edge["data"]["count"] >= 1 for edge in view["edges"] if edge["id"].startswith("agg:"))
+    assert {group["id"] for group in view["groups"] if group["expanded"]} == {"pod-1", "core"}
+
+
+def test_user_groups_nest(client, create):
+    topology = create("lod")
+    url = f"/api/topologies/{topology['id']}"
+    for node_id, group in (("a", "rack/left"), ("b", "rack/left"), ("c", "rack/right"), ("d", None)):
+        assert client.post(f"{url}/nodes", json={"id": node_id, "kind": "server", "group": group}).status_code == 200
+    assert client.post(f"{url}/edges", json={"source": "a", "target": "c"}).status_code == 200
+
+    assert {node["id"] for node in _lod(client, topology["id"])["nodes"]} == {"group:rack", "d"}
+    # A nested group only opens once its parent does.
+    assert {node["id"] for node in _lod(client, topology["id"], "rack/left")["nodes"]} == {"group:rack", "d"}
+    view = _lod(client, topology["id"], "rack", "rack/left")
+    assert {node["id"] for node in view["nodes"]} == {"a", "b", "group:rack/right", "d"}
+    assert [(edge["source"], edge["target"]) for edge in view["edges"]] == [("a", "group:rack/right")]
+
+
+def test_lod_of_a_missing_topology(client):
+    assert client.get("/api/topologies/999999/lod").status_code == 404
@@ -0,0 +1,57 @@
+import pytest
+
+from app import debug
+from app.memory import MemorySamples, deep_sizeof, graph_footprint
+
+TOKEN = "secret"
+
+
+@pytest.fixture
+def debug_token(monkeypatch):
+    monkeypatch.setattr(debug, "DEBUG_TOKEN", TOKEN)
+    return TOKEN
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    leaf = "x" * 1000
+    assert deep_sizeof([leaf, leaf]) < deep_sizeof([leaf, "y" * 1000])
+    assert deep_sizeof({"a": [1, 2]}) > deep_sizeof({"a": []})
+
+
+def test_graph_footprint():
+    assert graph_footprint([], [])["bytes_per_node"] == 0
+    footprint = graph_footprint([{"id": "a"}, {"id": "b"}], [{"id": "e"}])
+    assert (footprint["nodes"], footprint["edges"]) == (2, 1)
+    assert footprint["bytes_per_node"] > 0 and footprint["estimated_bytes"] > footprint["bytes_per_edge"]
+
+
+def test_samples_keep_the_largest_peak_per_endpoint():
+    samples = MemorySamples(size=2)
+    for peak in (10, 30, 20):
+        samples.add({"method": "GET", "endpoint": "/x", "peak_bytes": peak})
+    report = samples.report()
+    assert report["largest_by_endpoint"]["GET /x"]["peak_bytes"] == 30
+    assert [sample["peak_bytes"] for sample in report["recent"]] == [20, 30]
+
+
+def test_memory_report_requires_the_token(client):
+    assert client.get("/api/debug/memory").status_code == 404
+
+
+def test_traced_request_reports_its_peak(client, create, debug_token):
+    topology = create("traced", "ring", count=6)
+    url = f"/api/topologies/{topology['id']}"
+    assert "x-debug-memory-peak" not in client.get(url).headers
+    response = client.patch(
+        f"{url}/nodes/{topology['nodes'][0]['id']}", json={"label": "x"}, params={"debug_memory": TOKEN}
+    )
+    assert int(response.headers["x-debug-memory-peak"]) > 0
+
+    report = client.get("/api/debug/memory", headers={"X-Debug-Token": TOKEN}).json()
+    assert {"rss_bytes", "peak_rss_bytes"} <= set(report["process"])
+    assert report["caches"]["response_cache"]["entries"] >= 0
+    largest = report["topologies"][0]
+    assert largest["stored_bytes"] >= report["topologies"][-1]["stored_bytes"]
+    assert largest["nodes"] > 0 and largest["estimated_bytes"] >= largest["bytes_per_node"] * largest["nodes"]
+    sample = report["requests"]["recent"][0]
+    assert (sample["method"], sample["status"], sample["nodes"]) == ("PATCH", 200, 6)
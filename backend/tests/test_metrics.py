@@ -0,0 +1,48 @@
+import time
+
+from app.metrics import RequestTiming, span
+
+
+def _stages(header: str) -> dict[str, float]:
+    stages = {}
+    for entry in header.split(", "):
+        name, duration = entry.split(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+def test_nested_stages_are_exclusive():
+    timing = RequestTiming()
+    outer = timing.enter()
+    inner = timing.enter()
+    time.sleep(0.02)
+    timing.exit("inner", inner)
+    timing.exit("outer", outer)
+    assert timing.stages["inner"] >= 0.02
+    assert timing.stages["outer"] < timing.stages["inner"]
+
+
+def test_span_outside_a_request_is_a_no_op():
+    with span("decode"):
+        pass
+
+
+def test_server_timing_names_the_hot_path_stages(client, create):
+    topology = create("timed", "ring", count=8)
+    response = client.patch(f"/api/topologies/{topology['id']}/nodes/{topology['nodes'][0]['id']}", json={"label": "x"})
+    stages = _stages(response.headers["server-timing"])
+    assert {"db", "decode", "encode", "total"} <= set(stages)
+    assert sum(seconds for name, seconds in stages.items() if name != "total") <= stages["total"] + 0.1
+
+
+def test_metrics_endpoint_exposes_histograms_and_graph_sizes(client, create):
+    topology = create("metered", "ring", count=5)
+    client.get(f"/api/topologies/{topology['id']}")
+    response = client.get("/api/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    labels = 'method="POST",endpoint="/api/topologies/{topology_id}/generate"'
+    assert f'topology_request_stage_seconds_bucket{{{labels},stage="generate",le="+Inf"}}' in text
+    assert f'topology_request_stage_seconds_count{{{labels},stage="total"}}' in text
+    assert "# TYPE topology_request_graph_nodes gauge" in text
+    assert f"topology_request_graph_nodes{{{labels}}} 5" in text
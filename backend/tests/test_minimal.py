@@ -0,0 +1,68 @@
+MINIMAL = {"Prefer": "return=minimal"}
+
+
+def _apply(document: dict, delta: dict) -> dict:
+    """Apply a minimal response to a local copy, as a client would."""
+    result = dict(document, version=delta["version"])
+    for kind in ("nodes", "edges"):
+        items = {item["id"]: item for item in document[kind]}
+        for item in delta["updated"][kind]:
+            items[item["id"]] = item
+        for item_id in delta["deleted"][kind]:
+            items.pop(item_id)
+        result[kind] = list(items.values()) + delta["created"][kind]
+    result.update(delta.get("topology") or {})
+    return result
+
+
+def test_minimal_responses_carry_only_the_change(client, create):
+    topology = create("minimal", "leaf-spine", spines=2, leaves=2)
+    url = f"/api/topologies/{topology['id']}"
+
+    moved = client.patch(f"{url}/nodes/spine-1", json={"position": {"x": 3, "y": 4}}, headers=MINIMAL)
+    assert moved.headers["preference-applied"] == "return=minimal"
+    delta = moved.json()
+    assert delta["version"] == topology["version"] + 1
+    assert [node["id"] for node in delta["updated"]["nodes"]] == ["spine-1"]
+    assert delta["created"] == delta["deleted"] == {"nodes": [], "edges": []}
+
+    created = client.post(f"{url}/edges", params={"response": "delta"}, json={"source": "spine-1", "target": "spine-2"})
+    assert [(edge["source"], edge["target"]) for edge in created.json()["created"]["edges"]] == [("spine-1", "spine-2")]
+
+    deleted = client.delete(f"{url}/nodes/leaf-1", headers=MINIMAL).json()
+    assert deleted["deleted"]["nodes"] == ["leaf-1"]
+    assert sorted(deleted["deleted"]["edges"]) == ["e-spine-1-leaf-1", "e-spine-2-leaf-1"]
+
+
+def test_applied_deltas_match_the_full_document(client, create):
+    topology = create("minimal", "leaf-spine", spines=2, leaves=3)
+    url = f"/api/topologies/{topology['id']}"
+    local = client.get(url).json()
+    requests = [
+        ("patch", f"{url}/nodes/leaf-2", {"label": "Leaf B"}),
+        ("post", f"{url}/nodes", {"kind": "server", "id": "srv"}),
+        ("post", f"{url}/edges", {"source": "srv", "target": "leaf-2", "id": "srv-link"}),
+        ("delete", f"{url}/edges/e-spine-1-leaf-3", None),
+        ("post", f"{url}/layout", {}),
+    ]
+    for method, path, body in requests:
+        kwargs = {"json": body} if body is not None else {}
+        response = client.request(method, path, headers=MINIMAL, **kwargs)
+        assert response.status_code == 200, response.text
+        local = _apply(local, response.json())
+    current = client.get(url).json()
+    assert local["version"] == current["version"]
+    assert sorted(local["nodes"], key=lambda node: node["id"]) == sorted(current["nodes"], key=lambda node: node["id"])
+    assert sorted(local["edges"], key=lambda edge: edge["id"]) == sorted(current["edges"], key=lambda edge: edge["id"])
+
+
+def test_generate_reports_topology_fields(client, create):
+    topology = create("minimal")
+    response = client.post(
+        f"/api/topologies/{topology['id']}/generate",
+        json={"topo_type": "ring", "params": {"count": 3}},
+        headers=MINIMAL,
+    )
+    delta = response.json()
+    assert delta["topology"]["topo_type"] == "ring"
+    assert len(delta["created"]["nodes"]) == 3
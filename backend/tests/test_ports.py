@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app import main
+from app.ports import PortMap
+
+
+def test_port_map_ranges_and_allocation():
+    ports = PortMap.of({"id": "p", "data": {"kind": "patch", "splitCount": 8, "ports": {"used": [[1, 2], [5, 5]]}}})
+    assert (ports.used, ports.next_free(), ports.highest_used) == (3, 3, 5)
+    assert ports.allocate(2) == [3, 4]
+    assert ports.ranges() == [[1, 5]]
+    ports.release(2)
+    assert list(ports.iter_ports("free", offset=1)) == [6, 7, 8]
+    assert list(ports.iter_ports("used", offset=1)) == [3, 4, 5]
+    with pytest.raises(ValueError, match="already in use"):
+        ports.reserve(3)
+    with pytest.raises(ValueError, match="out of range"):
+        ports.reserve(9)
+    with pytest.raises(ValueError, match="Only 4 of 8"):
+        ports.allocate(5)
+    node = {"id": "p", "data": {"kind": "patch"}}
+    ports.store(node)
+    assert node["data"]["ports"] == {"used": [[1, 1], [3, 5]]}
+
+
+@pytest.mark.parametrize("used", [[[0, 2]], [[3, 1]], [["1", 2]], [[1]]])
+def test_malformed_ranges_are_rejected(used):
+    with pytest.raises(ValueError, match="malformed"):
+        PortMap.of({"id": "p", "data": {"kind": "patch", "ports": {"used": used}}})
+
+
+@pytest.fixture
+def panel(client, create):
+    url = f"/api/topologies/{create('ports')['id']}"
+    client.post(f"{url}/nodes", json={"kind": "patch", "id": "p1", "splitCount": 16})
+    for server in ("s1", "s2"):
+        client.post(f"{url}/nodes", json={"kind": "server", "id": server})
+    return url
+
+
+def test_allocated_port_can_be_cabled(client, panel):
+    allocated = client.post(f"{panel}/nodes/p1/ports/allocate", json={"count": 2}).json()
+    assert allocated["changed"] == [1, 2]
+    assert (allocated["used"], allocated["next_free"]) == (2, 3)
+
+    response = client.post(f"{panel}/edges", json={"source": "p1", "target": "s1", "sourcePort": 2, "id": "e1"})
+    assert response.status_code == 200, response.text
+    used = client.get(f"{panel}/nodes/p1/ports", params={"state": "used"}).json()
+    assert used["used"] == 2
+    assert used["ports"] == [{"port": 1, "used": True, "edge": None}, {"port": 2, "used": True, "edge": "e1"}]
+
+    taken = client.post(f"{panel}/edges", json={"source": "p1", "target": "s2", "sourcePort": 2})
+    assert taken.status_code == 400
+    assert "e1" in taken.json()["detail"]
+    assert client.patch(f"{panel}/edges/e1", json={"sourcePort": 2}).status_code == 200
+
+
+def test_recabling_releases_the_old_port(client, panel):
+    client.post(f"{panel}/edges", json={"source": "p1", "target": "s1", "sourcePort": 3, "id": "e1"})
+    response = client.patch(f"{panel}/edges/e1", json={"sourcePort": 5})
+    assert response.status_code == 200, response.text
+    assert client.get(f"{panel}/nodes/p1/ports").json()["ranges"] == [[5, 5]]
+
+
+def test_free_only_releases_reserved_ports(client, panel):
+    client.post(f"{panel}/nodes/p1/ports/allocate", json={"ports": [4, 6]})
+    client.post(f"{panel}/edges", json={"source": "p1", "target": "s1", "sourcePort": 4})
+    assert client.post(f"{panel}/nodes/p1/ports/free", json={"ports": [4]}).status_code == 400
+    freed = client.post(f"{panel}/nodes/p1/ports/free", json={"ports": [6]}).json()
+    assert (freed["changed"], freed["ranges"]) == ([6], [[4, 4]])
+    assert client.post(f"{panel}/nodes/p1/ports/allocate", json={"ports": [4]}).status_code == 400
+    assert client.get(f"{panel}/nodes/s1/ports").status_code == 400
+
+
+def test_ports_window(client, panel):
+    client.post(f"{panel}/nodes/p1/ports/allocate", json={"count": 5})
+    window = client.get(f"{panel}/nodes/p1/ports", params={"state": "free", "offset": 2, "limit": 3}).json()
+    assert [port["port"] for port in window["ports"]] == [8, 9, 10]
+    assert (window["size"], window["used"], window["free"]) == (16, 5, 11)
+    assert client.post(f"{panel}/nodes/p1/ports/allocate", json={"count": 12}).status_code == 400
+    assert client.get(f"{panel}/nodes/missing/ports").status_code == 404
+
+
+def test_ports_window_is_built_off_the_event_loop(client, panel, monkeypatch):
+    decode = main.read_topology_graph
+    on_loop = []
+
+    def recording_decode(topology):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return decode(topology)
+
+    monkeypatch.setattr(main, "read_topology_graph", recording_decode)
+    assert client.get(f"{panel}/nodes/p1/ports").status_code == 200
+    assert on_loop == [False]
@@ -0,0 +1,50 @@
+import pytest
+
+from app import debug
+from app.profiling import profile_store
+
+TOKEN = "secret"
+
+
+@pytest.fixture
+def debug_token(monkeypatch, tmp_path):
+    monkeypatch.setattr(debug, "DEBUG_TOKEN", TOKEN)
+    monkeypatch.setattr(profile_store, "directory", tmp_path)
+    monkeypatch.setattr(profile_store, "keep", 2)
+    return TOKEN
+
+
+def test_debug_endpoints_are_off_without_a_token(client, create):
+    assert client.get("/api/debug/profiles").status_code == 404
+    topology = create("unprofiled")
+    response = client.get(f"/api/topologies/{topology['id']}", headers={"X-Debug-Profile": ""})
+    assert "x-debug-profile-id" not in response.headers
+
+
+def test_wrong_token_is_rejected(client, create, debug_token):
+    assert client.get("/api/debug/profiles", headers={"X-Debug-Token": "wrong"}).status_code == 403
+    topology = create("unprofiled")
+    response = client.get(f"/api/topologies/{topology['id']}", headers={"X-Debug-Profile": "wrong"})
+    assert "x-debug-profile-id" not in response.headers
+
+
+def test_opted_in_requests_are_captured_and_pruned(client, create, debug_token):
+    topology = create("profiled", "ring", count=4)
+    url = f"/api/topologies/{topology['id']}"
+    ids = [client.get(url, headers={"X-Debug-Profile": debug_token}).headers["x-debug-profile-id"]]
+    ids.append(client.get(url, params={"debug_profile": debug_token}).headers["x-debug-profile-id"])
+    ids.append(client.get(url, headers={"X-Debug-Profile": debug_token}).headers["x-debug-profile-id"])
+
+    listed = client.get("/api/debug/profiles", headers={"X-Debug-Token": debug_token}).json()
+    assert [entry["id"] for entry in listed] == ids[:0:-1]
+    assert listed[0]["endpoint"] == "/api/topologies/{topology_id}"
+    assert (listed[0]["method"], listed[0]["status"]) == ("GET", 200)
+
+    prof = client.get(f"/api/debug/profiles/{ids[-1]}", params={"debug_token": debug_token})
+    assert prof.status_code == 200 and prof.content
+    text = client.get(
+        f"/api/debug/profiles/{ids[-1]}", params={"debug_token": debug_token, "format": "text", "limit": 5}
+    )
+    assert "function calls" in text.text
+    assert client.get(f"/api/debug/profiles/{ids[0]}", params={"debug_token": debug_token}).status_code == 404
+    assert client.get("/api/debug/profiles/..%2Fsecret", params={"debug_token": debug_token}).status_code == 404
@@ -0,0 +1,86 @@
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+from app import render
+from app.render import render_svg
+from app.topology_generators import generate_by_type
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _body(topo_type: str, **params) -> dict:
+    generated = generate_by_type(topo_type, params)
+    return {
+        "id": 1,
+        "name": "<drawn>",
+        "version": 1,
+        "updated_at": None,
+        "topo_type": topo_type,
+        "topo_params": generated.params,
+        "nodes": generated.nodes,
+        "edges": generated.edges,
+    }
+
+
+def test_render_svg(client, create):
+    topology = create("render", "leaf-spine", spines=2, leaves=4)
+    url = f"/api/topologies/{topology['id']}/render.svg"
+    response = client.get(url, params={"width": 400, "height": 300, "lod": "full"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("image/svg+xml")
+    svg = ET.fromstring(response.content)
+    assert (svg.get("width"), svg.get("height")) == ("400", "300")
+    assert len(svg.findall(f"{SVG}rect")) == 1 + len(topology["nodes"])
+    assert svg.findall(f"{SVG}path")
+    again = client.get(
+        url, params={"width": 400, "height": 300, "lod": "full"}, headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert again.status_code == 304
+    assert client.get(url, params={"width": 1}).status_code == 422
+    assert client.get("/api/topologies/999999/render.svg").status_code == 404
+
+
+def test_groups_are_drawn_collapsed_with_weighted_edges():
+    svg = ET.fromstring(render_svg(_body("fat-tree", k=4), 800, 600, "groups", set(), 12))
+    assert svg.find(f"{SVG}title").text == "<drawn>"
+    groups = [rect for rect in svg.findall(f"{SVG}rect") if rect.get("stroke-dasharray")]
+    assert len(groups) == 5
+    widths = {path.get("stroke-width") for path in svg.findall(f"{SVG}path")}
+    assert len(widths) == 1 and float(widths.pop()) > 1.5
+
+
+def test_dense_drawings_use_tiles_and_edge_bundles(monkeypatch):
+    monkeypatch.setattr(render, "RENDER_MAX_NODES", 10)
+    monkeypatch.setattr(render, "RENDER_MAX_EDGES", 10)
+    body = _body("mesh", rows=8, cols=8)
+    svg = ET.fromstring(render_svg(body, 200, 200, "full", set(), 20))
+    tiles = [rect for rect in svg.findall(f"{SVG}rect") if rect.find(f"{SVG}title") is not None]
+    assert 1 < len(tiles) < len(body["nodes"])
+    assert sum(int(rect.find(f"{SVG}title").text.split()[0]) for rect in tiles) == len(body["nodes"])
+    assert all(path.get("stroke-opacity") == "0.5" for path in svg.findall(f"{SVG}path"))
+
+
+def test_concurrent_renders_share_one_body(client, create):
+    topology = create("shared", "fat-tree", k=4)
+    url = f"/api/topologies/{topology['id']}/render.svg"
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: client.get(url, params={"width": 320}), range(4)))
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.content for response in responses}) == 1
+
+
+def test_edge_counts_of_user_edges_are_not_weights(client, create, monkeypatch):
+    topology = create("render", "ring", count=4)
+    counts = ["2", -1, 0, 2.5, True, None]
+    for edge, count in zip(topology["edges"], counts, strict=False):
+        edge["data"] = {**(edge.get("data") or {}), "count": count}
+    url = f"/api/topologies/{topology['id']}"
+    assert client.put(url, json=topology).status_code == 200
+    response = client.get(f"{url}/render.svg", params={"lod": "full"})
+    assert response.status_code == 200
+    widths = {path.get("stroke-width") for path in ET.fromstring(response.content).findall(f"{SVG}path")}
+    assert len(widths) == 1
+
+    monkeypatch.setattr(render, "RENDER_MAX_EDGES", 1)
+    body = {**_body("ring", count=4), "edges": topology["edges"]}
+    assert ET.fromstring(render_svg(body, 200, 200, "full", set(), 20)).findall(f"{SVG}path")
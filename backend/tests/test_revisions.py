@@ -0,0 +1,57 @@
+from app import revisions
+from app.db import SessionLocal
+
+
+def _edit(client, url: str, step: int) -> dict:
+    if step % 3 == 0:
+        response = client.post(f"{url}/nodes", json={"kind": "server", "id": f"srv-{step}"})
+    elif step % 3 == 1:
+        response = client.patch(f"{url}/nodes/spine-1", json={"position": {"x": step, "y": step * 2}})
+    else:
+        response = client.post(f"{url}/edges", json={"source": f"srv-{step - 2}", "target": "leaf-1"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_every_revision_reads_back(client, create, monkeypatch):
+    monkeypatch.setattr(revisions, "REVISION_SNAPSHOT_INTERVAL", 4)
+    topology = create("revisions", "leaf-spine", spines=2, leaves=4)
+    url = f"/api/topologies/{topology['id']}"
+    documents = {topology["version"]: topology}
+    for step in range(9):
+        document = _edit(client, url, step)
+        documents[document["version"]] = document
+
+    listed = client.get(f"{url}/revisions", params={"limit": 1000}).json()
+    assert [item["revision"] for item in listed] == sorted(documents, reverse=True) + [1]
+    assert {item["kind"] for item in listed} == {"snapshot", "delta"}
+    for item in listed[:-1]:
+        document = documents[item["revision"]]
+        assert (item["nodes"], item["edges"]) == (len(document["nodes"]), len(document["edges"]))
+        at = client.get(url, params={"at": item["revision"]}).json()
+        assert at["version"] == item["revision"]
+        assert (at["nodes"], at["edges"]) == (document["nodes"], document["edges"])
+
+    page = client.get(f"{url}/revisions", params={"limit": 2, "before": listed[0]["revision"]}).json()
+    assert page == listed[1:3]
+    assert client.get(url, params={"at": listed[0]["revision"] + 1}).status_code == 404
+
+
+def test_compaction_keeps_recent_revisions_readable(client, create, monkeypatch):
+    monkeypatch.setattr(revisions, "REVISION_SNAPSHOT_INTERVAL", 4)
+    topology = create("compaction", "leaf-spine", spines=2, leaves=4)
+    url = f"/api/topologies/{topology['id']}"
+    documents = {}
+    for step in range(12):
+        document = _edit(client, url, step)
+        documents[document["version"]] = document
+
+    with SessionLocal() as db:
+        assert revisions.compact_revisions(db, keep=5) > 0
+    latest = max(documents)
+    kept = [item["revision"] for item in client.get(f"{url}/revisions").json()]
+    assert kept[:5] == list(range(latest, latest - 5, -1))
+    for revision in range(latest - 4, latest + 1):
+        at = client.get(url, params={"at": revision}).json()
+        assert at["nodes"] == documents[revision]["nodes"]
+    assert client.get(url, params={"at": 2}).status_code == 404
@@ -0,0 +1,77 @@
+import pytest
+
+from app.rules import RuleEngine
+
+
+def _node(node_id: str, kind: str = "server", tier: int = 1) -> dict:
+    return {"id": node_id, "data": {"kind": kind, "tier": tier}}
+
+
+def _rules(document: dict) -> set[tuple[str, tuple, tuple]]:
+    state = RuleEngine().evaluate(1, 1, document)
+    return {(item["rule"], tuple(item["nodes"]), tuple(item["edges"])) for item in state.violations()}
+
+
+def test_topology_rules():
+    document = {"topo_type": "fat-tree", "topo_params": {"k": 5}, "nodes": [], "edges": []}
+    assert _rules(document) == {("fat-tree-k", (), ())}
+    document = {"topo_type": "ring", "topo_params": {"count": 2}, "nodes": [], "edges": []}
+    assert _rules(document) == {("param-bounds", (), ())}
+
+
+def test_link_rules():
+    nodes = [_node("a"), _node("b"), _node("s", "switch"), _node("lonely", "switch"), _node("rack", "rack")]
+    edges = [
+        {"id": "e1", "source": "a", "target": "b"},
+        {"id": "e2", "source": "s", "target": "s"},
+        {"id": "e3", "source": "a", "target": "s"},
+        {"id": "e4", "source": "s", "target": "a"},
+    ]
+    found = _rules({"topo_type": "custom", "topo_params": {}, "nodes": nodes, "edges": edges})
+    assert found == {
+        ("server-link", ("a", "b"), ("e1",)),
+        ("self-loop", ("s", "s"), ("e2",)),
+        ("isolated-node", ("lonely",), ()),
+        ("parallel-links", ("a", "s"), ("e3", "e4")),
+    }
+
+
+def test_violations_follow_edits(client, create):
+    topology = create("rules", "fat-tree", k=4)
+    url = f"/api/topologies/{topology['id']}"
+    clean = client.get(f"{url}/violations").json()
+    assert (clean["version"], clean["errors"], clean["violations"]) == (topology["version"], 0, [])
+
+    client.post(f"{url}/edges", json={"source": "core-1", "target": "core-2", "id": "core-link"})
+    client.post(f"{url}/edges", json={"source": "core-1", "target": "pod-1-agg-1", "id": "dup"})
+    report = client.get(f"{url}/violations").json()
+    assert report["version"] == topology["version"] + 2
+    assert 0 < report["checked"] < clean["checked"]
+    rules = {(item["rule"], item["severity"]) for item in report["violations"]}
+    assert rules == {("tier-order", "error"), ("switch-radix", "error"), ("parallel-links", "warning")}
+    assert report["violations"][0]["severity"] == "error"
+    warnings = client.get(f"{url}/violations", params={"severity": "warning"}).json()
+    assert [item["rule"] for item in warnings["violations"]] == ["parallel-links"]
+    assert warnings["errors"] == report["errors"]
+
+    client.delete(f"{url}/edges/core-link")
+    client.delete(f"{url}/edges/dup")
+    assert client.get(f"{url}/violations").json()["violations"] == []
+    assert client.get("/api/topologies/999999/violations").status_code == 404
+
+
+def test_failed_catch_up_drops_the_state():
+    engine = RuleEngine()
+    document = {"topo_type": "custom", "topo_params": {}, "nodes": [_node("a"), _node("b")], "edges": []}
+    state = engine.evaluate(7, 1, document)
+    report = state.report()
+    assert (report.version, report.errors, len(report.violations)) == (1, 0, 2)
+    # Revisions must continue the state's version without a gap.
+    assert engine.advance(7, state, [(3, "delta", "{}")]) is None
+
+    with pytest.raises(ValueError):
+        engine.advance(7, state, [(2, "delta", "not json")])
+    assert state.broken
+    assert engine.get(7) is None
+    assert engine.advance(7, state, [(2, "delta", "{}")]) is None
+    assert engine.evaluate(7, 2, document).report().version == 2
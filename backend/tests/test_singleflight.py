@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+from app import main
+from app.compression import response_cache
+from app.metrics import MetricsRegistry
+from app.singleflight import SingleFlight
+
+
+def _flights(metrics: MetricsRegistry, kind: str) -> tuple[str, str]:
+    lines = metrics.render().splitlines()
+    executed = next(line for line in lines if line.startswith(f'topology_singleflight_executed_total{{kind="{kind}"'))
+    coalesced = next(line for line in lines if line.startswith(f'topology_singleflight_coalesced_total{{kind="{kind}"'))
+    return executed.split()[-1], coalesced.split()[-1]
+
+
+def test_concurrent_callers_share_one_call():
+    metrics = MetricsRegistry()
+    flight = SingleFlight(metrics)
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = [pool.submit(flight.run, ("layout", 1), work) for _ in range(4)]
+        while _flights(metrics, "layout") != ("1", "3"):
+            time.sleep(0.001)
+        release.set()
+        shared = {id(future.result()) for future in results}
+    assert (len(calls), len(shared)) == (1, 1)
+    # Nothing is remembered once the call is over.
+    flight.run(("layout", 1), work)
+    assert len(calls) == 2
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight(MetricsRegistry())
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.run, ("generate", 1), fail) for _ in range(3)]
+        time.sleep(0.05)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError, match="boom"):
+                future.result()
+    assert flight.run(("generate", 1), lambda: "recovered") == "recovered"
+
+
+def test_async_callers_share_one_task_and_survive_cancellation():
+    flight = SingleFlight(MetricsRegistry())
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.run_async(("read", 1), work))
+        second = asyncio.ensure_future(flight.run_async(("read", 1), work))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 1
+        assert first.cancelled()
+        assert await flight.run_async(("read", 1), work) == 2
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_identical_layouts_all_succeed(client, create):
+    topology = create("flights", "fat-tree", k=8)
+    url = f"/api/topologies/{topology['id']}/layout"
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda _: client.post(url, json={"end_gap": True}), range(4)))
+    assert [response.status_code for response in responses] == [200] * 4
+
+
+def test_shared_read_outlives_the_caller_that_started_it(client, create, monkeypatch):
+    topology = create("disconnect", "ring", count=6)
+    url = f"/api/topologies/{topology['id']}"
+    load = main.get_topology_or_404_async
+
+    async def slow_load(db, topology_id):
+        await asyncio.sleep(0.1)
+        return await load(db, topology_id)
+
+    monkeypatch.setattr(main, "get_topology_or_404_async", slow_load)
+    response_cache.clear()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            first = asyncio.ensure_future(http.get(url))
+            await asyncio.sleep(0.02)
+            second = asyncio.ensure_future(http.get(url))
+            await asyncio.sleep(0.02)
+            # The first caller goes away while its render is still shared with the second.
+            first.cancel()
+            return await second
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 200, response.text
+    assert response.json()["nodes"] == topology["nodes"]
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app import main
+from app.compression import cached_encoded_body, response_cache
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_import_neither_migrates_nor_loads_rare_modules(tmp_path):
+    script = (
+        "import sys, app.main\n"
+        "lazy = ['app.sweep', 'app.topology_generators', 'app.exporters', 'app.importers', 'pstats']\n"
+        "print(','.join(name for name in lazy if name in sys.modules))\n"
+    )
+    database = tmp_path / "fresh.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+    assert not database.exists() or database.stat().st_size == 0
+
+
+def test_warm_up_fills_the_response_cache(create):
+    topology = create("warm", "ring", count=4)
+    response_cache.clear()
+    key = main.topology_body_key(topology["id"], topology["version"], "application/json", False)
+    assert cached_encoded_body(key, None) is None
+    assert topology["id"] in main.warm_up(3)
+    body, encoding = cached_encoded_body(key, None)
+    assert encoding == "identity" and b'"warm"' in body
+    assert main.warm_up(0) == []
@@ -0,0 +1,59 @@
+import pytest
+
+from app import sweep
+from app.sweep import SWEEP_PARAMS, expand_range, main, run_sweep
+
+
+@pytest.mark.parametrize("topo_type", sorted(SWEEP_PARAMS))
+def test_closed_form_matches_generated_graphs(topo_type):
+    closed = run_sweep(topo_type, {}, workers=1)["rows"][0]
+    exact = run_sweep(topo_type, {}, workers=1, exact=True)["rows"][0]
+    assert exact[3] == "generated"
+    assert closed[:3] == exact[:3]
+
+
+def test_sweep_expands_ranges_in_parameter_order():
+    result = run_sweep("leaf-spine", {"leaves": [4, 8], "spines": {"start": 2, "stop": 4, "step": 2}}, workers=1)
+    assert result["columns"] == ["spines", "leaves", "nodes", "edges", "diameter", "method", "error"]
+    assert [row[:4] for row in result["rows"]] == [[2, 4, 6, 8], [2, 8, 10, 16], [4, 4, 8, 16], [4, 8, 12, 32]]
+
+
+def test_invalid_combinations_become_error_rows():
+    rows = run_sweep("fat-tree", {"k": [3, 4]}, workers=1)["rows"]
+    assert rows[0][1:5] == [None, None, None, None] and rows[0][5]
+    assert rows[1][5] is None
+
+
+def test_expand_range_rejects_bad_specs():
+    assert expand_range("k", 4) == [4]
+    with pytest.raises(ValueError):
+        expand_range("k", True)
+    with pytest.raises(ValueError):
+        expand_range("k", {"start": 1, "stop": 4, "step": 0})
+
+
+def test_sweep_endpoint(client):
+    response = client.post("/api/sweep", json={"topo_type": "ring", "ranges": {"count": [3, 5]}})
+    assert response.status_code == 200, response.text
+    assert [row[:3] for row in response.json()["rows"]] == [[3, 3, 3], [5, 5, 5]]
+    assert client.post("/api/sweep", json={"topo_type": "nope"}).status_code == 400
+    assert client.post("/api/sweep", json={"topo_type": "ring", "ranges": {"k": 4}}).status_code == 400
+    too_many = {"topo_type": "mesh", "ranges": {"rows": {"start": 1, "stop": 200}, "cols": {"start": 1, "stop": 200}}}
+    assert client.post("/api/sweep", json=too_many).status_code == 400
+
+
+def test_exact_sweeps_over_http_are_capped(client, monkeypatch):
+    monkeypatch.setattr(sweep, "MAX_EXACT_SWEEP_COMBINATIONS", 4)
+    ranges = {"count": {"start": 3, "stop": 7}}
+    response = client.post("/api/sweep", json={"topo_type": "ring", "ranges": ranges, "exact": True})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Sweep has 5 combinations, limit is 4"
+    assert client.post("/api/sweep", json={"topo_type": "ring", "ranges": ranges}).status_code == 200
+    assert len(sweep.run_sweep("ring", ranges, workers=1, exact=True)["rows"]) == 5
+
+
+def test_cli_writes_csv(capsys):
+    assert main(["ring", "--range", "count=3,4", "--workers", "1"]) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("count,nodes,edges,diameter")
+    assert len(lines) == 3
@@ -0,0 +1,47 @@
+import copy
+from typing import get_args
+
+import pytest
+
+from app.schemas import ArrangeRequest
+from app.topology_generators import generate_by_type
+from app.topology_ops import apply_auto_layout, arrange_nodes, normalize_edges
+
+TYPES = ["leaf-spine", "fat-tree", "three-tier", "mesh", "ring", "star", "dragonfly", "torus-3d"]
+
+
+@pytest.mark.parametrize("topo_type", TYPES)
+def test_layout_never_mutates_its_input(topo_type):
+    generated = generate_by_type(topo_type, {})
+    nodes, edges = generated.nodes, generated.edges
+    before = copy.deepcopy((nodes, edges))
+    laid_out = apply_auto_layout(nodes, edges, topo_type, generated.params)
+    assert (nodes, edges) == before
+    assert [node["id"] for node in laid_out] == [node["id"] for node in nodes]
+    # A second pass moves nothing, so every node is shared rather than copied.
+    assert all(a is b for a, b in zip(apply_auto_layout(laid_out, edges, topo_type, generated.params), laid_out))
+
+
+def test_normalize_edges_copies_only_changed_edges():
+    edges = [
+        {"id": "a", "source": "x", "target": "y", "sourceHandle": "bottom-out", "targetHandle": "top-in"},
+        {"id": "b", "source": "x", "target": "y", "sourceHandle": "top", "targetHandle": None},
+    ]
+    before = copy.deepcopy(edges)
+    normalized = normalize_edges(edges)
+    assert edges == before
+    assert normalized[0] is edges[0]
+    assert normalized[1] is not edges[1]
+    assert (normalized[1]["sourceHandle"], normalized[1]["targetHandle"]) == ("top-out", "top-in")
+
+
+@pytest.mark.parametrize("mode", get_args(ArrangeRequest.model_fields["mode"].annotation))
+def test_arrange_moves_only_the_selection(mode):
+    nodes = [{"id": f"n{index}", "position": {"x": index * 100.0, "y": index**2 * 10.0}} for index in range(5)]
+    before = copy.deepcopy(nodes)
+    arranged = arrange_nodes(nodes, ["n1", "n2", "n4"], mode)
+    assert nodes == before
+    assert arranged[0] is nodes[0] and arranged[3] is nodes[3]
+    for node, result in zip(nodes, arranged):
+        assert (result is node) == (result["position"] == node["position"])
+    assert arranged != nodes
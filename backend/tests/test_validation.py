@@ -0,0 +1,82 @@
+import pytest
+
+from app.validation import MAX_GRAPH_ERRORS, graph_errors
+
+
+def _node(node_id: str, **data) -> dict:
+    return {"id": node_id, "position": {"x": 0, "y": 0}, "data": {"kind": "server", "tier": 1, **data}}
+
+
+def _edge(edge_id: str, source: str = "a", target: str = "b", **extra) -> dict:
+    return {"id": edge_id, "source": source, "target": target, **extra}
+
+
+def test_valid_graph_has_no_errors():
+    edges = [_edge("e1", sourceHandle="bottom", targetHandle="top-in"), _edge("e2", sourcePort=3)]
+    assert graph_errors([_node("a"), _node("b")], edges) == []
+
+
+@pytest.mark.parametrize(
+    ("nodes", "edges", "expected"),
+    [
+        ([_node("a"), _node("a")], [], (("nodes", 1, "id"), "duplicate node id 'a'")),
+        ([{"id": "", "data": {"kind": "server", "tier": 1}}], [], (("nodes", 0, "id"), "node id must be")),
+        ([_node("a", kind="toaster")], [], (("nodes", 0, "data", "kind"), "unsupported kind 'toaster'")),
+        ([_node("a", tier=0)], [], (("nodes", 0, "data", "tier"), "tier must be an integer >= 1")),
+        ([_node("a", tier=True)], [], (("nodes", 0, "data", "tier"), "tier must be an integer >= 1")),
+        ([{**_node("a"), "position": {"x": "1", "y": 0}}], [], (("nodes", 0, "position"), "position must")),
+        ([_node("a")], [_edge("e1")], (("edges", 0, "target"), "unknown target node 'b'")),
+        ([_node("a"), _node("b")], [_edge("e"), _edge("e")], (("edges", 1, "id"), "duplicate edge id 'e'")),
+        ([_node("a"), _node("b")], [_edge("e", sourceHandle="bogus")], (("edges", 0, "sourceHandle"), "unknown")),
+        ([_node("a"), _node("b")], [_edge("e", targetHandle=1)], (("edges", 0, "targetHandle"), "unknown handle 1")),
+        ([_node("a"), _node("b")], [_edge("e", targetPort=0)], (("edges", 0, "targetPort"), "port must be")),
+        (
+            [_node("a"), _node("b")],
+            [_edge("x-a-b"), {"id": "x", "bundle": {"prefix": "x", "sources": ["a"], "targets": ["b"]}}],
+            (("edges", 1, "bundle"), "duplicate edge id 'x-a-b'"),
+        ),
+    ],
+)
+def test_each_problem_is_located(nodes, edges, expected):
+    errors = graph_errors(nodes, edges)
+    assert len(errors) == 1
+    assert errors[0][0] == expected[0]
+    assert errors[0][1].startswith(expected[1])
+
+
+def test_errors_are_capped():
+    nodes = [_node("a", kind="toaster") for _ in range(MAX_GRAPH_ERRORS * 2)]
+    assert len(graph_errors(nodes, [])) == MAX_GRAPH_ERRORS
+
+
+def test_bad_documents_are_rejected_with_422(client, create):
+    topology = create("validated")
+    document = {"name": "bad", "nodes": [_node("a"), _node("a", tier=0)], "edges": [_edge("e1", target="zz")]}
+    response = client.put(f"/api/topologies/{topology['id']}", json=document)
+    assert response.status_code == 422
+    locations = [error["loc"] for error in response.json()["detail"]]
+    assert ["body", "nodes", 1, "id"] in locations
+    assert ["body", "nodes", 1, "data", "tier"] in locations
+    assert ["body", "edges", 0, "target"] in locations
+    assert client.get(f"/api/topologies/{topology['id']}").json()["name"] == "validated"
+    assert client.post("/api/topologies", json={"name": "bad", "nodes": [_node("a", kind=None)]}).status_code == 422
+
+
+def test_node_and_edge_endpoints_apply_the_same_rules(client, create):
+    topology = create("validated", "ring", count=3)
+    url = f"/api/topologies/{topology['id']}"
+    node_id = topology["nodes"][0]["id"]
+    edge_id = topology["edges"][0]["id"]
+    assert client.post(f"{url}/nodes", json={"kind": "server", "tier": 0}).status_code == 422
+    assert client.patch(f"{url}/nodes/{node_id}", json={"tier": -1}).status_code == 422
+    ends = {"source": topology["nodes"][0]["id"], "target": topology["nodes"][1]["id"]}
+    response = client.post(f"{url}/edges", json={**ends, "sourceHandle": "bogus"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "sourceHandle"]
+    assert client.patch(f"{url}/edges/{edge_id}", json={"targetHandle": 3}).status_code == 422
+    assert client.get(url).json()["version"] == topology["version"]
+
+    created = client.post(f"{url}/edges", json={**ends, "sourceHandle": "right", "targetHandle": "left-in"})
+    assert created.status_code == 200
+    patched = client.patch(f"{url}/edges/{edge_id}", json={"targetHandle": "left"})
+    assert patched.status_code == 200
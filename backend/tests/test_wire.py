@@ -0,0 +1,65 @@
+from app.wire import COLUMNAR_MEDIA_TYPE, decode_columnar, encode_columnar
+
+
+def _body(nodes: list, edges: list) -> dict:
+    return {
+        "id": 1,
+        "name": "wire",
+        "topo_type": "custom",
+        "topo_params": {},
+        "nodes": nodes,
+        "edges": edges,
+        "updated_at": "2026-10-19T00:00:00",
+        "version": 3,
+    }
+
+
+def test_columnar_round_trip_keeps_odd_fields():
+    nodes = [
+        {
+            "id": "a",
+            "type": "custom",
+            "position": {"x": 1, "y": 2.5},
+            "data": {"label": "A", "kind": "rack", "tier": 1},
+        },
+        {"id": "b", "type": 7, "position": {"x": 1, "y": 2, "z": 3}, "data": {"kind": "switch", "tier": "2"}},
+        {"id": "c", "data": {"kind": "server", "tier": 1, "owner": "ops", "layout": None}},
+        {"id": "d", "data": {"kind": "patch", "tier": 1, "splitCount": 48}, "selected": True},
+        {"id": "e"},
+        {"id": "f", "position": {"x": None, "y": 4}},
+        {"id": "g", "position": {"x": "10", "y": True}},
+        {"id": "h", "position": None},
+    ]
+    edges = [
+        {"id": "e-a-b", "source": "a", "target": "b", "label": "link", "sourceHandle": "bottom-out"},
+        {"id": "x", "source": "b", "target": "c", "label": None, "sourcePort": 3},
+        {"id": "dangling", "source": "a", "target": "gone"},
+    ]
+    body = _body(nodes, edges)
+    encoded = encode_columnar(body)
+    assert encoded["nodes"]["x"] == [1, None, None, None, None, None, None, None]
+    assert decode_columnar(encoded) == body
+
+
+def test_columnar_payload_without_a_version_decodes():
+    encoded = encode_columnar(_body([{"id": "a", "data": {"kind": "rack", "tier": 1}}], []))
+    del encoded["version"]
+    assert decode_columnar(encoded)["version"] is None
+
+
+def test_columnar_interns_generated_edge_ids():
+    nodes = [{"id": f"n{index}", "data": {"kind": "rack", "tier": 1}} for index in range(3)]
+    edges = [{"id": f"e-n0-n{index}", "source": "n0", "target": f"n{index}", "label": "link"} for index in (1, 2)]
+    encoded = encode_columnar(_body(nodes, edges))
+    assert encoded["edges"]["id"][0] == encoded["edges"]["id"][1] < 0
+    assert encoded["strings"].count("link") == 1
+
+
+def test_columnar_response_matches_json(client, create):
+    topology = create("columnar", "leaf-spine", spines=2, leaves=4)
+    url = f"/api/topologies/{topology['id']}"
+    response = client.get(url, headers={"Accept": COLUMNAR_MEDIA_TYPE})
+    assert response.headers["content-type"].startswith(COLUMNAR_MEDIA_TYPE)
+    assert decode_columnar(response.json()) == client.get(url).json()
+    patched = client.patch(f"{url}/nodes/spine-1", json={"label": "S"}, headers={"Accept": COLUMNAR_MEDIA_TYPE})
+    assert decode_columnar(patched.json())["nodes"][0]["data"]["label"] == "S"
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app import main
+from app.db import SessionLocal, engine
+from app.write_buffer import WriteBuffer
+
+
+@pytest.fixture
+def write_buffer(monkeypatch):
+    buffer = WriteBuffer(SessionLocal, max_delay_ms=60000, idle_ms=60000)
+    monkeypatch.setattr(main, "write_buffer", buffer)
+    yield buffer
+    buffer.close()
+
+
+def _document(body: dict, name: str) -> dict:
+    return {**{key: body[key] for key in ("topo_type", "topo_params", "nodes", "edges")}, "name": name}
+
+
+def test_buffered_writes_are_coalesced(client, create, write_buffer):
+    topology = create("buffered")
+    url = f"/api/topologies/{topology['id']}"
+    for step in range(3):
+        returned = client.put(url, json=_document(topology, f"step-{step}")).json()
+    assert returned["version"] == topology["version"] + 3
+    assert (write_buffer.writes, write_buffer.commits) == (3, 0)
+    assert client.get(url).json()["name"] == "step-2"
+    assert [item["name"] for item in client.get("/api/topologies").json() if item["id"] == topology["id"]] == ["step-2"]
+
+    assert write_buffer.flush(topology["id"])
+    assert not write_buffer.flush(topology["id"])
+    stored = client.get(url).json()
+    assert (stored["name"], stored["version"]) == ("step-2", returned["version"])
+    assert write_buffer.commits == 1
+
+
+def test_other_operations_flush_first(client, create, write_buffer):
+    topology = create("buffered", "ring", count=3)
+    url = f"/api/topologies/{topology['id']}"
+    document = _document(topology, "renamed")
+    document["nodes"] = document["nodes"][:2]
+    document["edges"] = document["edges"][:1]
+    client.put(url, json=document)
+    patched = client.patch(f"{url}/nodes/{document['nodes'][0]['id']}", json={"label": "First"}).json()
+    assert write_buffer.get(topology["id"]) is None
+    assert (patched["name"], len(patched["nodes"]), patched["nodes"][0]["data"]["label"]) == ("renamed", 2, "First")
+
+    client.put(url, json=document)
+    assert client.delete(url).status_code == 200
+    assert write_buffer.get(topology["id"]) is None
+
+
+def test_idle_writes_are_committed_in_the_background(client, create, monkeypatch):
+    buffer = WriteBuffer(SessionLocal, max_delay_ms=1000, idle_ms=20)
+    monkeypatch.setattr(main, "write_buffer", buffer)
+    try:
+        topology = create("background")
+        client.put(f"/api/topologies/{topology['id']}", json=_document(topology, "later"))
+        deadline = time.monotonic() + 5
+        while buffer.get(topology["id"]) is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert buffer.commits == 1
+    finally:
+        buffer.close()
+
+
+def test_write_buffered_before_a_commit_elsewhere_is_not_committed(client, create, write_buffer):
+    topology = create("buffered")
+    url = f"/api/topologies/{topology['id']}"
+    returned = client.put(url, json=_document(topology, "buffered")).json()
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE topologies SET version = version + 1, name = 'elsewhere' WHERE id = :id"),
+            {"id": topology["id"]},
+        )
+    write_buffer.flush(topology["id"])
+    assert write_buffer.conflicts == 1
+    stored = client.get(url).json()
+    # The version the PUT returned names the other worker's document, never a mix of the two.
+    assert (stored["name"], stored["version"]) == ("elsewhere", returned["version"])
+
+
+def test_write_during_an_edit_is_buffered_on_top_of_it(client, create, write_buffer):
+    topology = create("buffered")
+    url = f"/api/topologies/{topology['id']}"
+    client.put(url, json=_document(topology, "first"))
+    # A request editing the row commits the buffered write and holds new ones back until it ends.
+    assert write_buffer.acquire(topology["id"])
+    responses = []
+    writer = threading.Thread(target=lambda: responses.append(client.put(url, json=_document(topology, "second"))))
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive() and write_buffer.get(topology["id"]) is None
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE topologies SET version = version + 1, name = 'edited' WHERE id = :id"),
+            {"id": topology["id"]},
+        )
+    write_buffer.release(topology["id"])
+    writer.join(5)
+
+    returned = responses[0].json()
+    assert (responses[0].status_code, returned["version"]) == (200, topology["version"] + 3)
+    write_buffer.flush(topology["id"])
+    stored = client.get(url).json()
+    assert (stored["name"], stored["version"], write_buffer.conflicts) == ("second", returned["version"], 0)
+
+
+def test_write_on_top_of_a_commit_elsewhere_is_rejected(client, create, write_buffer):
+    topology = create("buffered")
+    url = f"/api/topologies/{topology['id']}"
+    client.put(url, json=_document(topology, "buffered"))
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE topologies SET version = version + 1, name = 'elsewhere' WHERE id = :id"),
+            {"id": topology["id"]},
+        )
+    assert client.put(url, json=_document(topology, "later")).status_code == 409
+    assert (write_buffer.conflicts, write_buffer.get(topology["id"])) == (1, None)
+    assert client.get(url).json()["name"] == "elsewhere"
+    # Once the client has seen the other commit, its next write is buffered again.
+    assert client.put(url, json=_document(topology, "retried")).json()["version"] == topology["version"] + 2
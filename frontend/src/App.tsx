@@ -52,6 +52,8 @@ import type {
   SidebarSectionId,
 } from "./types";
 
+import { readTopologyResponse, TOPOLOGY_ACCEPT } from "./wire";
+
 // Sidebar components
 import Sidebar from "./components/Sidebar/Sidebar";
 import SidebarSection from "./components/Sidebar/SidebarSection";
@@ -736,8 +738,10 @@ export default function App() {
       autosavePausedRef.current = true;
       setStatus("loading");
       try {
-        const res = await fetch(`/api/topologies/${id}`);
-        const data: TopologyResponse = await res.json();
+        const res = await fetch(`/api/topologies/${id}`, {
+          headers: { Accept: TOPOLOGY_ACCEPT },
+        });
+        const data: TopologyResponse = await readTopologyResponse(res);
         setName(data.name || t("Default"));
         setTopoType(data.topo_type || "custom");
         setTopoParams(data.topo_params || {});
@@ -1200,11 +1204,11 @@ export default function App() {
     try {
       const res = await fetch(`/api/topologies/${activeId}/generate`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", Accept: TOPOLOGY_ACCEPT },
         body: JSON.stringify({ topo_type: topoType, params: topoParams, name }),
       });
       if (!res.ok) throw new Error("Generate failed");
-      const data = await res.json();
+      const data = await readTopologyResponse(res);
       setName(data.name || t("Default"));
       setTopoType(data.topo_type || "custom");
       setTopoParams(data.topo_params || {});
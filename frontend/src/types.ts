@@ -246,6 +246,7 @@ export interface TopologyResponse {
   nodes: AppNode[];
   edges: AppEdge[];
   updated_at: string;
+  version: number;
 }
 
 /**
@@ -0,0 +1,128 @@
+import type { AppEdge, AppNode, TopologyResponse } from "./types";
+
+/**
+ * Media type of the compact columnar topology encoding (see backend/app/wire.py)
+ */
+export const COLUMNAR_MEDIA_TYPE = "application/vnd.topology.columnar+json";
+
+/**
+ * Accept header for topology requests: columnar first, JSON as fallback
+ */
+export const TOPOLOGY_ACCEPT = `${COLUMNAR_MEDIA_TYPE}, application/json;q=0.9`;
+
+type ExtraValue = Record<string, unknown> | null;
+
+interface ColumnarNodes {
+  id: number[];
+  type: number[];
+  x: (number | null)[];
+  y: (number | null)[];
+  label: number[];
+  kind: number[];
+  tier: (number | null)[];
+  layout: number[];
+  splitCount: (number | null)[];
+  extra: [number, ExtraValue, ExtraValue | false][];
+}
+
+interface ColumnarEdges {
+  id: number[];
+  source: number[];
+  target: number[];
+  sourceHandle: number[];
+  targetHandle: number[];
+  label: number[];
+  extra: [number, Record<string, unknown>][];
+}
+
+interface ColumnarTopology {
+  format: string;
+  id: number;
+  name: string;
+  topo_type: TopologyResponse["topo_type"];
+  topo_params: TopologyResponse["topo_params"];
+  updated_at: string;
+  version: number;
+  strings: string[];
+  nodes: ColumnarNodes;
+  edges: ColumnarEdges;
+}
+
+/**
+ * Rebuild a topology document from the columnar encoding
+ */
+export function decodeColumnarTopology(payload: ColumnarTopology): TopologyResponse {
+  const { strings, nodes: nc, edges: ec } = payload;
+  const str = (index: number | undefined): string => strings[index as number] as string;
+
+  const nodeExtra = new Map<number, [ExtraValue, ExtraValue | false]>();
+  for (const [row, top, data] of nc.extra) nodeExtra.set(row, [top, data]);
+
+  const nodes: Record<string, unknown>[] = new Array(nc.id.length);
+  for (let row = 0; row < nc.id.length; row += 1) {
+    const node: Record<string, unknown> = { id: str(nc.id[row]) };
+    if ((nc.type[row] ?? -1) >= 0) node.type = str(nc.type[row]);
+    if (nc.x[row] !== null) node.position = { x: nc.x[row], y: nc.y[row] };
+    const data: Record<string, unknown> = {};
+    if ((nc.label[row] ?? -1) >= 0) data.label = str(nc.label[row]);
+    if ((nc.kind[row] ?? -1) >= 0) data.kind = str(nc.kind[row]);
+    if (nc.tier[row] !== null) data.tier = nc.tier[row];
+    if ((nc.layout[row] ?? -1) >= 0) data.layout = str(nc.layout[row]);
+    if (nc.splitCount[row] !== null) data.splitCount = nc.splitCount[row];
+    node.data = data;
+    const extra = nodeExtra.get(row);
+    if (extra) {
+      const [top, dataExtra] = extra;
+      if (dataExtra) Object.assign(data, dataExtra);
+      if (top) Object.assign(node, top);
+      if (dataExtra === false) delete node.data;
+    }
+    nodes[row] = node;
+  }
+
+  const endpoint = (value: number): string =>
+    value >= 0 ? (nodes[value]?.id as string) : str(-value - 1);
+
+  const edgeExtra = new Map<number, Record<string, unknown>>();
+  for (const [row, extra] of ec.extra) edgeExtra.set(row, extra);
+
+  const edges: Record<string, unknown>[] = new Array(ec.id.length);
+  for (let row = 0; row < ec.id.length; row += 1) {
+    const source = endpoint(ec.source[row] as number);
+    const target = endpoint(ec.target[row] as number);
+    const idValue = ec.id[row] as number;
+    const edge: Record<string, unknown> = {
+      id: idValue >= 0 ? str(idValue) : `${str(-idValue - 1)}-${source}-${target}`,
+      source,
+      target,
+    };
+    if ((ec.sourceHandle[row] ?? -1) >= 0) edge.sourceHandle = str(ec.sourceHandle[row]);
+    if ((ec.targetHandle[row] ?? -1) >= 0) edge.targetHandle = str(ec.targetHandle[row]);
+    if ((ec.label[row] ?? -1) >= 0) edge.label = str(ec.label[row]);
+    const extra = edgeExtra.get(row);
+    if (extra) Object.assign(edge, extra);
+    edges[row] = edge;
+  }
+
+  return {
+    id: payload.id,
+    name: payload.name,
+    topo_type: payload.topo_type,
+    topo_params: payload.topo_params,
+    nodes: nodes as unknown as AppNode[],
+    edges: edges as unknown as AppEdge[],
+    updated_at: payload.updated_at,
+    version: payload.version,
+  };
+}
+
+/**
+ * Read a topology response body in whichever encoding the server chose
+ */
+export async function readTopologyResponse(res: Response): Promise<TopologyResponse> {
+  const contentType = res.headers.get("content-type") || "";
+  const payload = await res.json();
+  return contentType.includes(COLUMNAR_MEDIA_TYPE)
+    ? decodeColumnarTopology(payload as ColumnarTopology)
+    : (payload as TopologyResponse);
+}